@@ -3,22 +3,100 @@ import os
 import asyncio
 from typing import Optional, Dict, List
 
+from ai_cache import AICache
+from utils import DMY_RE, SHEVA_OFFSETS, TIME_RE, YMD_RE
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_TASK_MODEL = os.getenv("OPENAI_TASK_MODEL", "gpt-4o-mini")
 OPENAI_TRANSCRIBE_MODEL = os.getenv("OPENAI_TRANSCRIBE_MODEL", "whisper-1")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))   # timeout/5xx'da qayta urinish (SDK default)
+
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "ai_cache.db")
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", str(7 * 86400)))
+AI_CACHE_MAX_ROWS = int(os.getenv("AI_CACHE_MAX_ROWS", "20000"))
+
+_client = None
+_limiter: Optional[asyncio.Semaphore] = None
+response_cache = AICache(AI_CACHE_PATH, max_rows=AI_CACHE_MAX_ROWS, ttl=AI_CACHE_TTL)
+
+# "2 soatdan keyin", "через час" kabi hozirgi vaqtga nisbiy iboralar — bunday parse natijalari keshlanmaydi
+_NOW_RELATIVE = ("soatdan keyin", "daqiqadan keyin", "minutdan keyin", "hozir", "через", "сейчас",
+                 "сағаттан кейін", "минуттан кейін", "қазір")
+
+# Bugungi kunga nisbiy iboralar (ertaga, juma kuni, keyingi hafta...) — javob kunga bog'liq, kalitga kun qo'shiladi
+_DATE_RELATIVE = tuple(SHEVA_OFFSETS) + (
+    "kecha", "hafta", "dushanba", "seshanba", "chorshanba", "payshanba", "juma", "shanba", "yakshanba",
+    "кеча", "ҳафта", "душанба", "сешанба", "чоршанба", "пайшанба", "жума", "шанба", "якшанба",
+    "вчера", "недел", "понедельник", "вторник", "сред", "четверг", "пятниц", "суббот", "воскресен",
+    "кеше", "апта", "дүйсенбі", "сейсенбі", "сәрсенбі", "бейсенбі", "жұма", "сенбі", "жексенбі",
+)
+
+def parse_cache_bucket(text: str, now_iso: str) -> Optional[str]:
+    """
+    Parse keshi kalitining vaqt qismi: None — keshlanmaydi (hozirga nisbiy), "YYYY-MM-DD" — kunga nisbiy
+    (ertaga, juma, sanasiz "10:00"), "" — vaqtga bog'liq emas (aniq sana yoki muddatsiz), kun bo'yicha bo'linmaydi.
+    """
+    low = (text or "").lower()
+    if any(w in low for w in _NOW_RELATIVE):
+        return None
+    bare_time = TIME_RE.search(low) and not (DMY_RE.search(low) or YMD_RE.search(low))
+    if bare_time or any(w in low for w in _DATE_RELATIVE):
+        return (now_iso or "")[:10]
+    return ""
 
 def ai_available() -> bool:
     return bool(OPENAI_API_KEY)
 
+def get_client():
+    """Yagona AsyncOpenAI klient (keep-alive httpx pool). Startupda bir marta yaratiladi."""
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI
+        http = httpx.AsyncClient(
+            timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS,
+                                max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                                keepalive_expiry=120.0),
+        )
+        # OPENAI_BASE_URL (proxy yoki lokal soxta server) SDK tomonidan muhitdan o'qiladi
+        _client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http, timeout=OPENAI_TIMEOUT,
+                              max_retries=OPENAI_MAX_RETRIES)
+    return _client
+
+async def close_client() -> None:
+    """HTTP klient va javob keshi ulanishini yopadi (shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+    response_cache.close()
+
+def _slots() -> asyncio.Semaphore:
+    global _limiter
+    if _limiter is None:
+        _limiter = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+    return _limiter
+
+async def chat_completion(**kwargs):
+    """chat.completions.create — bir vaqtda OPENAI_MAX_CONCURRENCY tadan ko‘p emas."""
+    async with _slots():
+        return await get_client().chat.completions.create(**kwargs)
+
+async def transcription(file, model: str = OPENAI_TRANSCRIBE_MODEL):
+    async with _slots():
+        return await get_client().audio.transcriptions.create(model=model, file=file)
+
 async def transcribe_voice(file_path: str) -> str:
     """Ovoz -> matn (fallback: bo‘sh)"""
     if not ai_available():
         return ""
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=OPENAI_API_KEY)
         with open(file_path, "rb") as f:
-            tr = client.audio.transcriptions.create(model=OPENAI_TRANSCRIBE_MODEL, file=f)
+            tr = await transcription(f)
         return (tr.text or "").strip()
     except Exception:
         return ""
@@ -27,17 +105,21 @@ async def translate_text(text: str, target_lang_name: str) -> str:
     """Matnni ko‘rsatilgan tilga tarjima (masalan, 'Uzbek', 'Russian', 'Kazakh')."""
     if not ai_available() or not text:
         return text
+    key = response_cache.make_key("translate", OPENAI_TASK_MODEL, text, (target_lang_name,))
+    cached = await response_cache.get(key)
+    if cached is not None:
+        return cached
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=OPENAI_API_KEY)
         sys = f"Translate the user content to {target_lang_name}. Keep meaning; be concise."
-        resp = await asyncio.to_thread(
-            client.chat.completions.create,
+        resp = await chat_completion(
             model=OPENAI_TASK_MODEL,
             messages=[{"role":"system","content":sys},{"role":"user","content":text}],
             temperature=0.2,
         )
-        return (resp.choices[0].message.content or "").strip()
+        out = (resp.choices[0].message.content or "").strip()
+        if out:
+            await response_cache.put(key, out)
+        return out
     except Exception:
         return text
 
@@ -46,16 +128,13 @@ async def pm_assistant_answer(prompt: str, context_hint: str = "") -> str:
     if not ai_available():
         return "AI o‘chirilgan. OPENAI_API_KEY sozlang."
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=OPENAI_API_KEY)
         sys = (
             "Siz Project Manager Assistant’siz. Task va resurslarni tahlil qiling, deadline va yuklama bo‘yicha "
             "tavsiyalar bering, kerak bo‘lsa savollar bering. Javobni aniq, punktli va qisqa yozing."
         )
         if context_hint:
             sys += f"\nContext: {context_hint}"
-        resp = await asyncio.to_thread(
-            client.chat.completions.create,
+        resp = await chat_completion(
             model=OPENAI_TASK_MODEL,
             messages=[{"role":"system","content":sys},{"role":"user","content":prompt}],
             temperature=0.2,
@@ -72,9 +151,13 @@ async def parse_task_from_text(text: str, now_iso: str, known_usernames: List[st
     if not ai_available():
         # Fallback — bot natural parseri bosqichida yakunlanadi
         return {"assignee":"","title":text.strip() or "No title","deadline":"","priority":"Medium"}
+    bucket = parse_cache_bucket(text, now_iso)
+    key = response_cache.make_key("parse", OPENAI_TASK_MODEL, text, known_usernames, bucket or "")
+    if bucket is not None:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            return cached
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=OPENAI_API_KEY)
         sys = (
             "Siz Telegram uchun Task Manager agentisiz. Kirish matnidan vazifa maydonlarini ajrating. "
             "Faqat JSON qaytaring: {\"assignee\":\"@username yoki bo‘sh\",\"title\":\"...\","
@@ -82,14 +165,16 @@ async def parse_task_from_text(text: str, now_iso: str, known_usernames: List[st
             "Agar username ism bilan berilgan bo‘lsa, known_usernames bo‘yicha mos @username ni belgilang."
         )
         user = f"now={now_iso}\nknown_usernames={known_usernames}\ntext={text}"
-        resp = await asyncio.to_thread(
-            client.chat.completions.create,
+        resp = await chat_completion(
             model=OPENAI_TASK_MODEL,
             messages=[{"role":"system","content":sys},{"role":"user","content":user}],
             response_format={"type":"json_object"},
             temperature=0.1,
         )
         raw = (resp.choices[0].message.content or "{}").strip()
-        return json.loads(raw)
+        data = json.loads(raw)
+        if bucket is not None:
+            await response_cache.put(key, data)
+        return data
     except Exception:
         return {"assignee":"","title":text.strip() or "No title","deadline":"","priority":"Medium"}
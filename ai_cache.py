@@ -0,0 +1,127 @@
+# ai_cache.py — AI javoblari keshi: xotiradagi LRU + SQLite (TTL, hajm chegarasi, hit-rate)
+import asyncio, hashlib, json, logging, re, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger("taskbot.ai_cache")
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    """Registr, bo'shliqlar va chetdagi tinish belgilarini bir xillashtiradi."""
+    return _WS_RE.sub(" ", (text or "").strip().lower()).strip(" .,!?;:")
+
+
+class AICache:
+    """
+    Kalit = sha256(kind, model, normallashgan prompt, qo'shimcha kontekst, sana bucket).
+    Qiymatlar JSON ko'rinishida saqlanadi. get/put asinxron: xotira hit'i darhol,
+    SQLite esa alohida thread'da.
+    """
+    def __init__(self, path: str, memory_size: int = 512, max_rows: int = 20000, ttl: float = 7 * 86400):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._mem: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()   # key -> (expires_at, json)
+        self._lock = threading.Lock()
+        self._con: Optional[sqlite3.Connection] = None
+        self._puts = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(kind: str, model: str, prompt: str, context: Iterable[str] = (), bucket: str = "") -> str:
+        h = hashlib.sha256()
+        for part in (kind, model, normalize_prompt(prompt), "\x1f".join(sorted(context)), bucket):
+            h.update(part.encode("utf-8")); h.update(b"\x00")
+        return h.hexdigest()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._con is None:
+            con = sqlite3.connect(self.path, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS ai_cache(
+                    key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_created ON ai_cache(created_at)")
+            con.commit()
+            self._con = con
+        return self._con
+
+    def _remember(self, key: str, raw: str, expires_at: float) -> None:
+        self._mem[key] = (expires_at, raw)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_size:
+            self._mem.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            return self._db().execute("SELECT value, created_at FROM ai_cache WHERE key=? AND created_at>=?",
+                                      (key, time.time() - self.ttl)).fetchone()
+
+    def _store(self, key: str, raw: str) -> None:
+        with self._lock:
+            con = self._db()
+            con.execute("INSERT OR REPLACE INTO ai_cache(key, value, created_at) VALUES(?,?,?)",
+                        (key, raw, time.time()))
+            self._puts += 1
+            if self._puts % 100 == 0:
+                self._evict(con)
+            con.commit()
+
+    def _evict(self, con: sqlite3.Connection) -> None:
+        con.execute("DELETE FROM ai_cache WHERE created_at<?", (time.time() - self.ttl,))
+        con.execute("""
+            DELETE FROM ai_cache WHERE key IN (
+                SELECT key FROM ai_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_rows,))
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Har chaqiruvda yangi obyekt qaytadi (JSON'dan), keshdagi qiymat o'zgarmaydi."""
+        with self._lock:
+            item = self._mem.get(key)
+            if item is not None:
+                if item[0] >= time.time():
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(item[1])
+                del self._mem[key]
+        try:
+            row = await asyncio.to_thread(self._load, key)
+        except sqlite3.Error as e:
+            logger.warning("AI cache read failed: %s", e)
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1; self.disk_hits += 1
+            self._remember(key, row[0], row[1] + self.ttl)
+            return json.loads(row[0])
+
+    async def put(self, key: str, value: Any) -> None:
+        raw = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, raw, time.time() + self.ttl)
+        try:
+            await asyncio.to_thread(self._store, key, raw)
+        except sqlite3.Error as e:
+            logger.warning("AI cache write failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "memory": len(self._mem), "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._con is not None:
+                self._con.close()
+                self._con = None
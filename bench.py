@@ -0,0 +1,1050 @@
+# bench.py — qayta o'lchanadigan benchmarklar: python bench.py <buyruq> [parametrlar]
+#   db-calls — bitta Database chaqiruvi: har safar ulanish ochish (eski yo'l) va doimiy ulanishlar
+#   loop-lag — parallel update'lar paytida event loop kechikishi: sinxron Database va AsyncDatabase
+#   status   — /status ma'lumoti: har xodimga alohida so'rov (N+1, eski yo'l) va ikki so'rov, 10..2000 xodim
+#   openai   — OpenAI chaqiruvi soxta HTTP serverga: har chaqiruvda yangi klient (eski yo'l) va umumiy pool, p50/p99
+#   deadline-startup — N ta ochiq vazifa deadline'i bilan: restartdan keyin rejalashtiruvchi ishga tushish vaqti
+#   deadline-sched   — N ta kutilayotgan deadline: PTB run_once job'lari va DeadlineScheduler heap'i (vaqt, xotira)
+#   bulk     — bitta checklist N xodimga: create_task'lar ketma-ket va create_tasks_bulk (vazifa/s)
+#   names    — NameIndex: sintetik uz/ru/kk ismlar (40% kirill), aniqlik va kechikish; eski LIKE bilan taqqoslash
+#   parser   — parse_task_local: sintetik uz/ru/kk vazifa matnlari, LOCAL_PARSE_THRESHOLD'dan o'tgan ulush, p50/p99
+#   search   — FTS5 /search: N ta vazifada kam/ko'p uchraydigan so'zlar, sahifa, since; LIKE skan va rebuild-fts
+#   pages    — N ta vazifada /status va /mytasks (st:/mt:) birinchi sahifasi: so'rov vaqti, xotira, birinchi xabar
+#   route    — callback_data aralashmasi: eski if/startswith zanjiri va CallbackRouter; reply tugmalari: Regex va dict
+#   archive  — ~5 yillik done vazifalar: archive_tasks vaqti, /status va /mytasks sahifalari arxivdan oldin va keyin
+# Har buyruq vaqtinchalik DB bilan ishlaydi (DATABASE_PATH berilmasa), Telegram/OpenAI'ga so'rov ketmaydi.
+import argparse, asyncio, os, random, sqlite3, sys, tempfile, time, tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from database import AsyncDatabase, Database, dict_factory
+
+MANAGER_ID, EMPLOYEE_BASE = 9_000_000, 8_000_000
+
+
+def seed_tasks(d: Database, tasks: int, employees: int, batch: int = 5000, heavy_share: float = 0.5,
+               done_every: int = 3, deadline: Optional[Callable[[int], str]] = None) -> List[int]:
+    """
+    `employees` ta xodim va `tasks` ta vazifa: `heavy_share` qismi birinchi ("og'ir") xodimda, qolgani teng
+    bo'lingan; har `done_every`-si 'done' (0 — hammasi ochiq), deadline(i) — i-vazifa muddati.
+    Xodimlar id'lari qaytadi (birinchisi — og'ir).
+    """
+    ids = [EMPLOYEE_BASE + i for i in range(employees)]
+    with d._conn():     # bitta tranzaksiya
+        for uid in ids:
+            d.upsert_user(uid, f"u{uid}", f"U{uid}")
+            d.set_user_role(uid, "EMPLOYEE")
+    heavy = int(tasks * heavy_share)
+    owners = [ids[0]] * heavy + [ids[i % len(ids)] for i in range(tasks - heavy)]
+    done: Dict[int, List[int]] = {}     # xodim -> done qilinadigan vazifalar (status'ni faqat ijrochi o'zgartiradi)
+    for start in range(0, tasks, batch):
+        chunk = [{"title": f"Vazifa {start + i}", "assignee": f"u{uid}", "priority": "Medium",
+                  "deadline": deadline(start + i) if deadline else None}
+                 for i, uid in enumerate(owners[start:start + batch])]
+        created = [r["id"] for r in d.create_tasks_bulk(MANAGER_ID, chunk)]
+        for tid, uid in list(zip(created, owners[start:start + batch]))[::done_every] if done_every else ():
+            done.setdefault(uid, []).append(tid)
+    for uid, tids in done.items():
+        for start in range(0, len(tids), batch):
+            d.set_status_bulk(tids[start:start + batch], "done", uid)
+    return ids
+
+
+def measure(fn: Callable[[], Any]) -> Tuple[Any, float, float]:
+    """(natija, ms, tracemalloc eng yuqori KB). Vaqt kuzatuvsiz alohida chaqiruvda o'lchanadi."""
+    t0 = time.perf_counter()
+    out = fn()
+    ms = (time.perf_counter() - t0) * 1000
+    tracemalloc.start()
+    try:
+        fn()
+        return out, ms, tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def per_call_us(fn: Callable[[int], Any], n: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def _fresh_db(name: str) -> Database:
+    path = os.path.join(os.path.dirname(os.environ["DATABASE_PATH"]), name)
+    for f in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(f):
+            os.remove(f)
+    return Database(path)
+
+
+# ---------- db-calls ----------
+class ConnectPerCall(Database):
+    """user-001 gacha bo'lgan _conn(): har chaqiruvda sqlite3.connect → commit → close, PRAGMA'siz."""
+    @contextmanager
+    def _conn(self):
+        con = sqlite3.connect(self.path)
+        con.row_factory = dict_factory
+        try:
+            yield con
+            con.commit()
+        finally:
+            con.close()
+
+    _read = _conn
+
+
+def cmd_db_calls(args) -> int:
+    d = _fresh_db("calls.db")
+    t0 = time.perf_counter()
+    ids = seed_tasks(d, args.tasks, args.users, batch=20_000, heavy_share=0)
+    print(f"seed: {args.users} users / {args.tasks} tasks in {time.perf_counter() - t0:.1f}s")
+    d.close()
+    rnd = random.Random(1)
+    uids = [rnd.choice(ids) for _ in range(args.n)]
+    tids = [rnd.randint(1, args.tasks) for _ in range(args.n)]
+    variants = [("connect-per-call", ConnectPerCall(d.path, user_cache_size=0)),
+                ("persistent", Database(d.path, user_cache_size=0)),
+                ("persistent + UserCache", Database(d.path))]
+    print(f"{'variant':<24} {'get_user us':>12} {'get_task us':>12} {'set_user_language us':>21}")
+    for name, v in variants:
+        v.get_user(uids[0])     # ulanish/kesh isishi
+        r = (per_call_us(lambda i: v.get_user(uids[i]), args.n),
+             per_call_us(lambda i: v.get_task(tids[i]), args.n),
+             per_call_us(lambda i: v.set_user_language(uids[i], "ru" if i % 2 else "uz"), args.n // 5))
+        print(f"{name:<24} {r[0]:>12.1f} {r[1]:>12.1f} {r[2]:>21.1f}")
+        v.close()
+    return 0
+
+
+# ---------- loop-lag ----------
+async def _lag_probe(stop: asyncio.Event, out: List[float], tick: float = 0.001) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(tick)
+        out.append(time.perf_counter() - t0 - tick)
+
+
+async def _simulated_updates(db, uids: List[int], is_async: bool) -> Tuple[float, List[float]]:
+    """Har update: ensure_user + ruxsat + /mytasks + til — handlerlardagi odatiy 4 ta DB chaqiruvi."""
+    async def one(uid: int):
+        calls = [lambda: db.upsert_user(uid, f"u{uid}", f"U{uid}"), lambda: db.user_is_approved(uid),
+                 lambda: db.list_tasks_page(uid, limit=20), lambda: db.set_user_language(uid, "uz")]
+        for call in calls:
+            r = call()
+            if is_async:
+                await r
+        await asyncio.sleep(0)
+
+    stop, lags = asyncio.Event(), []
+    probe = asyncio.create_task(_lag_probe(stop, lags))
+    await asyncio.sleep(0)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(uid) for uid in uids))
+    wall = time.perf_counter() - t0
+    stop.set()
+    await probe
+    return wall, lags
+
+
+def cmd_loop_lag(args) -> int:
+    import loadtest
+    d = _fresh_db("lag.db")
+    t0 = time.perf_counter()
+    ids = seed_tasks(d, args.tasks, args.users, batch=20_000, heavy_share=0)
+    print(f"seed: {args.users} users / {args.tasks} tasks in {time.perf_counter() - t0:.1f}s")
+    d.close()
+    rnd = random.Random(2)
+    uids = [rnd.choice(ids) for _ in range(args.updates)]
+
+    async def run(is_async: bool):
+        base = Database(d.path, user_cache_size=0)
+        db = AsyncDatabase(base) if is_async else base
+        if is_async:
+            await db.start()
+        try:
+            return await _simulated_updates(db, uids, is_async)
+        finally:
+            await db.close() if is_async else base.close()
+
+    print(f"{'variant':<14} {'updates':>8} {'wall ms':>9} {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag max ms':>11}")
+    for name, is_async in (("Database", False), ("AsyncDatabase", True)):
+        wall, lags = asyncio.run(run(is_async))
+        print(f"{name:<14} {len(uids):>8} {wall * 1000:>9.0f} {loadtest.percentile(lags, 50) * 1000:>11.2f} "
+              f"{loadtest.percentile(lags, 99) * 1000:>11.2f} {max(lags) * 1000:>11.1f}")
+    return 0
+
+
+# ---------- status ----------
+def status_overview_n_plus_1(d: Database) -> List[dict]:
+    """user-003 gacha bo'lgan get_status_overview: xodimlar, so'ng har biriga alohida SELECT."""
+    with d._read() as c:
+        cur = c.cursor()
+        cur.execute("SELECT * FROM users WHERE role='EMPLOYEE' AND COALESCE(active,1)=1 ORDER BY lower(username)")
+        out = []
+        for e in cur.fetchall():
+            cur.execute("""SELECT * FROM tasks WHERE assigned_to=? AND status!='archived'
+                           ORDER BY CASE WHEN status='done' THEN 1 ELSE 0 END, created_at DESC""", (e["telegram_id"],))
+            out.append({"employee": e, "tasks": cur.fetchall()})
+        return out
+
+
+def cmd_status(args) -> int:
+    print(f"{'employees':>9} {'tasks':>7} {'N+1 ms':>8} {'queries':>8} {'2-query ms':>11} {'page ms':>8}")
+    for n in args.employees:
+        d = _fresh_db(f"status_{n}.db")
+        seed_tasks(d, n * args.tasks_per_employee, n, heavy_share=0)
+        old, new = status_overview_n_plus_1(d), d.get_status_overview()
+        assert [r["employee"]["telegram_id"] for r in old] == [r["employee"]["telegram_id"] for r in new]
+        assert all({t["id"] for t in a["tasks"]} == {t["id"] for t in b["tasks"]} for a, b in zip(old, new))
+        r = args.repeat
+        t_old = per_call_us(lambda i: status_overview_n_plus_1(d), r) / 1000
+        t_new = per_call_us(lambda i: d.get_status_overview(), r) / 1000
+        t_page = per_call_us(lambda i: d.get_status_page(limit=10, tasks_per_employee=11), r) / 1000
+        print(f"{n:>9} {n * args.tasks_per_employee:>7} {t_old:>8.1f} {n + 1:>8} {t_new:>11.1f} {t_page:>8.2f}")
+        d.close()
+    return 0
+
+
+# ---------- openai ----------
+class StubOpenAI:
+    """
+    OpenAI API o'rnida lokal HTTP/1.1 server (keep-alive): /chat/completions'ga `delay` soniyadan keyin
+    "ok" javobi; xabarda "slow" bo'lsa `slow_delay` kutadi (timeout sinovi). active/peak — bir vaqtdagi so'rovlar.
+    """
+    def __init__(self, delay: float = 0.0, slow_delay: float = 5.0):
+        self.delay = delay
+        self.slow_delay = slow_delay
+        self.active = self.peak = self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.base_url = ""
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.base_url = "http://127.0.0.1:%d/v1" % self._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        import json
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode("latin-1").split("\r\n")[1:]:
+                    if line.lower().startswith("content-length:"):
+                        length = int(line.split(":", 1)[1])
+                body = await reader.readexactly(length) if length else b""
+                self.requests += 1
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+                try:
+                    await asyncio.sleep(self.slow_delay if b"slow" in body else self.delay)
+                finally:
+                    self.active -= 1
+                payload = json.dumps({
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": "stub",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "ok"}}]}).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n" % len(payload) + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def cmd_openai(args) -> int:
+    import loadtest
+    import ai
+    from openai import OpenAI
+
+    async def run():
+        stub = StubOpenAI(delay=args.delay)
+        os.environ["OPENAI_BASE_URL"] = await stub.start()
+        ai.OPENAI_API_KEY = "sk-bench"
+        msgs = [{"role": "user", "content": "salom"}]
+
+        async def per_call():
+            """user-005 gacha: har chaqiruvda yangi sinxron OpenAI() klienti, to_thread ichida."""
+            def call():
+                with OpenAI(api_key="sk-bench") as client:
+                    return client.chat.completions.create(model="stub", messages=msgs)
+            return await asyncio.to_thread(call)
+
+        async def pooled():
+            return await ai.chat_completion(model="stub", messages=msgs)
+
+        print(f"{'client':<14} {'mode':<12} {'calls':>6} {'p50 ms':>8} {'p99 ms':>8} {'wall s':>7} {'peak':>5}")
+        for name, fn in (("per-call", per_call), ("pooled", pooled)):
+            for mode, conc in (("sequential", 1), (f"{args.concurrency} parallel", args.concurrency)):
+                lat: List[float] = []
+
+                async def one():
+                    t0 = time.perf_counter()
+                    await fn()
+                    lat.append(time.perf_counter() - t0)
+
+                await one()     # isitish (import, birinchi ulanish)
+                lat.clear()
+                stub.peak = 0
+                t0 = time.perf_counter()
+                for start in range(0, args.calls, conc):
+                    await asyncio.gather(*(one() for _ in range(min(conc, args.calls - start))))
+                wall = time.perf_counter() - t0
+                print(f"{name:<14} {mode:<12} {len(lat):>6} {loadtest.percentile(lat, 50) * 1000:>8.1f} "
+                      f"{loadtest.percentile(lat, 99) * 1000:>8.1f} {wall:>7.2f} {stub.peak:>5}")
+        print(f"peak — serverdagi bir vaqtdagi so'rovlar (OPENAI_MAX_CONCURRENCY={ai.OPENAI_MAX_CONCURRENCY})")
+        await ai.close_client()
+        await stub.stop()
+
+    asyncio.run(run())
+    return 0
+
+
+# ---------- deadline-startup ----------
+def cmd_deadline_startup(args) -> int:
+    from datetime import datetime, timedelta
+    from config import Config
+    from deadlines import DeadlineScheduler
+    tz = Config.TIMEZONE
+    now = datetime.now(tz).replace(microsecond=0)
+    fmt = lambda dt: dt.strftime("%Y-%m-%d %H:%M:%S")
+    rnd = random.Random(3)
+    spread = [fmt(now + timedelta(seconds=rnd.randint(600, args.days * 86400))) for _ in range(args.tasks)]
+    d = _fresh_db("deadlines.db")
+    t0 = time.perf_counter()
+    seed_tasks(d, args.tasks, args.employees, batch=10_000, heavy_share=0, done_every=0, deadline=spread.__getitem__)
+    for start in range(0, args.tasks, 10_000):
+        d.schedule_deadline_pings_bulk(list(range(start + 1, min(start + 10_000, args.tasks) + 1)), fmt(now))
+    print(f"seed: {args.tasks} open tasks with deadlines over {args.days} days in {time.perf_counter() - t0:.1f}s")
+
+    def scan_open_tasks():
+        with d._read() as c:
+            return c.execute("SELECT id, deadline FROM tasks WHERE status IN ('new','accepted') "
+                             "AND deadline IS NOT NULL").fetchall()
+
+    grace = timedelta(hours=Config.DEADLINE_GRACE_HOURS)
+    rows = [
+        ("tasks scan (re-scan on restart)", scan_open_tasks),
+        ("all pending pings (range query)", lambda: d.list_pending_deadline_pings(fmt(now - grace))),
+        ("scheduler window (1 h)", lambda: d.list_pending_deadline_pings(fmt(now), fmt(now + timedelta(hours=1)))),
+    ]
+    print(f"{'load':<34} {'rows':>8} {'ms':>9} {'peak KB':>10}")
+    for name, fn in rows:
+        out, ms, kb = measure(fn)
+        print(f"{name:<34} {len(out):>8} {ms:>9.1f} {kb:>10.0f}")
+
+    async def startup():
+        db = AsyncDatabase(d)
+        await db.start()
+
+        async def fire(app, batch):
+            await db.mark_deadline_pings_sent([(r["task_id"], r["kind"]) for r in batch])
+
+        s = DeadlineScheduler(db.list_pending_deadline_pings, db.list_due_deadline_pings, fire, tz,
+                              grace=grace.total_seconds())
+        t = time.perf_counter()
+        await s.start(None)
+        while not s._window_end:
+            await asyncio.sleep(0.001)
+        ms = (time.perf_counter() - t) * 1000
+        await s.stop()
+        await db.close()
+        return ms, s.pending
+
+    ms, pending = asyncio.run(startup())
+    print(f"DeadlineScheduler.start → ready: {ms:.1f} ms, {pending} fire times in memory")
+    d.close()
+    return 0
+
+
+# ---------- deadline-sched ----------
+def cmd_deadline_sched(args) -> int:
+    from datetime import datetime, timedelta
+    from config import Config
+    from deadlines import DeadlineScheduler
+    from telegram.ext import ApplicationBuilder
+    tz = Config.TIMEZONE
+
+    async def noop(ctx):
+        pass
+
+    def ptb(whens: List[datetime], dedupe: bool):
+        """user-011 gacha: har vazifaga run_once job, dedupe — get_jobs_by_name bilan eskisini o'chirish."""
+        jq = ApplicationBuilder().token(os.environ["TELEGRAM_BOT_TOKEN"]).build().job_queue
+        jq.scheduler.start(paused=True)
+        for i, w in enumerate(whens):
+            if dedupe:
+                for j in jq.get_jobs_by_name(f"deadline_{i}"):
+                    j.schedule_removal()
+            jq.run_once(noop, when=w, name=f"deadline_{i}")
+        return jq
+
+    def heap(fire_ats: List[str]):
+        s = DeadlineScheduler(None, None, None, tz)
+        s._window_end = float("inf")      # hammasi oynada — eng yomon holat (odatda faqat 1 soatlik)
+        s.notify(fire_ats)
+        return s
+
+    async def run(n: int):
+        rnd = random.Random(4)
+        now = datetime.now(tz)
+        whens = [now + timedelta(seconds=rnd.randint(3600, 30 * 86400)) for _ in range(n)]
+        fire_ats = [w.strftime("%Y-%m-%d %H:%M:%S") for w in whens]
+        variants = [("heap", lambda: heap(fire_ats), True)]
+        variants.append(("PTB run_once", lambda: ptb(whens, False), n <= args.ptb_max))
+        variants.append(("PTB run_once + dedupe", lambda: ptb(whens, True), n <= args.dedupe_max))
+        for name, fn, enabled in variants:
+            if not enabled:
+                print(f"{n:>9} {name:<22} {'-':>14} {'-':>10}  (skipped, see --ptb-max/--dedupe-max)")
+                continue
+            _, ms, kb = measure(fn)
+            print(f"{n:>9} {name:<22} {ms * 1000 / n:>14.2f} {kb * 1024 / n:>10.0f}")
+
+    print(f"{'pending':>9} {'variant':<22} {'us/schedule':>14} {'B/deadline':>10}")
+    for n in args.levels:
+        asyncio.run(run(n))
+    return 0
+
+
+# ---------- bulk ----------
+def cmd_bulk(args) -> int:
+    now, deadline = "2025-01-01 09:00:00", "2025-01-02 22:00:00"
+
+    def single(d: Database, names: List[str]):
+        """user-017 gacha /task: har ijrochiga create_task + get_user_by_username + eslatmalar."""
+        for n in names:
+            tid = d.create_task("Yopish", "Yopish", MANAGER_ID, n, deadline, "High")
+            d.get_user_by_username(n)
+            d.schedule_deadline_pings(tid, now)
+
+    def bulk(d: Database, names: List[str]):
+        rows = d.create_tasks_bulk(MANAGER_ID, [{"title": "Yopish", "assignee": "@" + n, "deadline": deadline,
+                                                 "priority": "High"} for n in names])
+        d.schedule_deadline_pings_bulk([r["id"] for r in rows], now)
+
+    print(f"{'path':<10} {'checklists':>10} {'tasks/s':>9} {'ms/checklist':>13}")
+    for name, fn in (("single", single), ("bulk", bulk)):
+        d = _fresh_db(f"bulk_{name}.db")
+        ids = seed_tasks(d, 0, args.assignees)
+        names = [f"u{uid}" for uid in ids]
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            fn(d, names)
+        dt = time.perf_counter() - t0
+        total = args.assignees * args.repeat
+        assert d.check_daily_stats() == [] and len(d.list_tasks_for_user(ids[0])) == args.repeat
+        print(f"{name:<10} {args.repeat:>10} {total / dt:>9,.0f} {dt / args.repeat * 1000:>13.1f}")
+        d.close()
+    return 0
+
+
+# ---------- names ----------
+FIRST = ["Alisher", "Jamshid", "Otabek", "Sardor", "Dilshod", "Bobur", "Jasur", "Ulug'bek", "O'tkir", "Sherzod",
+         "Nodira", "Dilnoza", "Gulnora", "Malika", "Shahnoza", "Zarina", "Madina", "Aziz", "Rustam", "Farrux",
+         "G'ayrat", "Xurshid", "Bekzod", "Sanjar", "Asel", "Aruzhan", "Nursultan", "Yerlan", "Galym", "Dana",
+         "Ivan", "Sergey", "Yevgeniy", "Olga", "Natalya", "Dmitriy", "Timur", "Kamola", "Feruza", "Shoxrux",
+         "Abdulla", "Muhammadali", "Islom", "Lola", "Nilufar", "Javohir", "Behruz", "Komil", "Qodir", "Hasan"]
+FEMALE = {"Nodira", "Dilnoza", "Gulnora", "Malika", "Shahnoza", "Zarina", "Madina", "Asel", "Aruzhan", "Dana",
+          "Olga", "Natalya", "Kamola", "Feruza", "Lola", "Nilufar"}
+SURNAMES = ["Karimov", "Qodirov", "Xasanov", "Toshmatov", "Rahimov", "Yusupov", "Aliyev", "Valiyev", "Nazarov",
+            "Ergashev", "Sobirov", "Normatov", "Abdullayev", "Jo'rayev", "Xolmatov", "To'xtayev", "Nurlanov",
+            "Seitov", "Ivanov", "Petrov", "Smirnov", "Kuznetsov", "Mirzayev", "Umarov", "Sultonov", "Ismoilov",
+            "Tursunov", "Saidov", "Ahmedov", "Boboyev"]
+LAT2CYR = [("sh", "ш"), ("ch", "ч"), ("yo", "ё"), ("yu", "ю"), ("ya", "я"), ("o'", "ў"), ("g'", "ғ"), ("ye", "е"),
+           ("a", "а"), ("b", "б"), ("d", "д"), ("e", "е"), ("f", "ф"), ("g", "г"), ("h", "ҳ"), ("i", "и"),
+           ("j", "ж"), ("k", "к"), ("l", "л"), ("m", "м"), ("n", "н"), ("o", "о"), ("p", "п"), ("q", "қ"),
+           ("r", "р"), ("s", "с"), ("t", "т"), ("u", "у"), ("v", "в"), ("x", "х"), ("y", "й"), ("z", "з")]
+
+
+def to_cyrillic(name: str) -> str:
+    """O'zbek lotin → kirill (sintetik korpus uchun, to'liq imlo qoidalarisiz)."""
+    w, out, i = name.lower(), [], 0
+    while i < len(w):
+        for a, b in LAT2CYR:
+            if w.startswith(a, i):
+                out.append(b)
+                i += len(a)
+                break
+        else:
+            out.append(w[i])
+            i += 1
+    return " ".join(x.capitalize() for x in "".join(out).split())
+
+
+def synthetic_names(n: int, rnd: random.Random) -> dict:
+    """uid -> (full_name, username|None): 40% kirillda, 10% otasining ismi bilan, yarmida username."""
+    from name_index import fold
+    users = {}
+    for uid in range(1, n + 1):
+        f, last = rnd.choice(FIRST), rnd.choice(SURNAMES)
+        if f in FEMALE and last.endswith(("ov", "ev")):
+            last += "a"
+        name = f"{f} {last}" + (f" {rnd.choice(FIRST)}ovich" if rnd.random() < 0.1 else "")
+        users[uid] = (to_cyrillic(name) if rnd.random() < 0.4 else name,
+                      f"{fold(f)}_{uid}" if rnd.random() < 0.5 else None)
+    return users
+
+
+def name_queries(rnd: random.Random) -> dict:
+    def typo(w: str) -> str:
+        i, op = rnd.randrange(1, len(w) - 1), rnd.random()
+        if op < 0.4:
+            return w[:i] + w[i + 1:]
+        if op < 0.7:
+            return w[:i] + w[i + 1] + w[i] + w[i + 2:]
+        return w[:i] + rnd.choice("aeiou") + w[i + 1:]
+    return {
+        "exact": lambda n: n,
+        "other script": lambda n: to_cyrillic(n) if n.isascii() else None,
+        "typos": lambda n: " ".join(typo(w) if len(w) > 4 and rnd.random() < 0.6 else w for w in n.split()),
+        "word order": lambda n: " ".join(reversed(n.split())),
+        "prefixes": lambda n: " ".join(w[:max(4, len(w) - 2)] for w in n.split()),
+    }
+
+
+def cmd_names(args) -> int:
+    import loadtest
+    from collections import Counter
+    from name_index import NameIndex, fold
+    rnd = random.Random(7)
+    users = synthetic_names(args.users, rnd)
+
+    def build() -> NameIndex:
+        i = NameIndex()
+        i.add_many((u, n, un) for u, (n, un) in users.items())
+        return i
+
+    idx, ms, kb = measure(build)
+    print(f"{args.users} users: build {ms / 1000:.1f}s, {kb / 1024:.0f} MB")
+    # Maqsad — to'liq ismi yagona bo'lgan foydalanuvchi (aks holda "to'g'ri javob" noaniq)
+    counts = Counter(fold(n) for n, _ in users.values())
+    unique = [u for u, (n, _) in users.items() if counts[fold(n)] == 1]
+    like = sqlite3.connect(":memory:")
+    like.execute("CREATE TABLE users(telegram_id INTEGER PRIMARY KEY, full_name TEXT)")
+    like.executemany("INSERT INTO users VALUES(?,?)", ((u, n) for u, (n, _) in users.items()))
+
+    print(f"{'kind':<13} {'n':>5} {'top1':>7} {'top5':>7} {'p50 ms':>7} {'p99 ms':>7}   "
+          f"{'LIKE top1':>9} {'LIKE p50 ms':>11}")
+    for kind, make in name_queries(rnd).items():
+        ok1 = ok5 = like_ok = 0
+        times, like_times, qs = [], [], []
+        for u in rnd.sample(unique, min(args.queries, len(unique))):
+            q = make(users[u][0])
+            if q:
+                qs.append((u, q))
+        for u, q in qs:
+            t0 = time.perf_counter()
+            ids = [x for x, _ in idx.search(q, 5)]
+            times.append(time.perf_counter() - t0)
+            ok1 += ids[:1] == [u]
+            ok5 += u in ids
+        for u, q in qs[:args.like_queries]:
+            t0 = time.perf_counter()
+            row = like.execute("SELECT telegram_id FROM users WHERE lower(full_name) LIKE lower(?) "
+                               "ORDER BY length(full_name) LIMIT 1", (f"%{q}%",)).fetchone()
+            like_times.append(time.perf_counter() - t0)
+            like_ok += bool(row) and row[0] == u
+        n, nl = len(qs), min(len(qs), args.like_queries)
+        print(f"{kind:<13} {n:>5} {ok1 / n:>7.1%} {ok5 / n:>7.1%} {loadtest.percentile(times, 50) * 1000:>7.2f} "
+              f"{loadtest.percentile(times, 99) * 1000:>7.2f}   {like_ok / nl:>9.1%} "
+              f"{loadtest.percentile(like_times, 50) * 1000:>11.2f}")
+    t0 = time.perf_counter()
+    for i in range(1000):
+        idx.add(args.users + i + 1, f"Yangi Xodim{i}", None)
+    print(f"incremental add: {(time.perf_counter() - t0) * 1000:.1f} us/user")
+    return 0
+
+
+# ---------- parser ----------
+# Menejer yozadigan vazifalar: sarlavha, ustuvorlik so'zi, nisbiy kun — tillar bo'yicha (uz lotin/kirill, ru, kk)
+PARSE_LANGS = {
+    "uz": (("kassa hisobotini topshirish", "oshxonani tozalash", "ombordagi mahsulotlarni sanash", "zalni tayyorlash",
+            "muzlatkich haroratini tekshirish", "yangi menyuni chop etish", "idishlarni yuvish", "pechni tozalash",
+            "yetkazib beruvchiga qo'ng'iroq qilish", "stollarni joylashtirish"),
+           ("shoshilinch", "muhim", "muhim emas", "zudlik bilan"), ("ertaga", "indin", "bugun")),
+    "uz-cyr": (("касса ҳисоботини топшириш", "ошхонани тозалаш", "омбордаги маҳсулотларни санаш", "зални тайёрлаш",
+                "идишларни ювиш", "печни тозалаш"), (), ("эртага", "индин", "бугун")),
+    "ru": (("убрать кухню", "пересчитать склад", "сдать кассовый отчёт", "подготовить зал к банкету",
+            "проверить температуру холодильника", "заказать овощи", "помыть посуду", "распечатать новое меню"),
+           ("срочно", "важно", "не срочно", "немедленно"), ("завтра", "послезавтра", "сегодня")),
+    "kk": (("тоңазытқышты тазалау", "асхананы жинау", "қойманы санау", "кассалық есепті тапсыру", "залды дайындау"),
+           ("жедел", "маңызды", "асықпай"), ("ертең", "бүрсігүні", "бүгін")),
+}
+# Lokal parser tushunmaydigan muddatlar — bunday matn LLM'ga ketishi kerak
+VAGUE_DEADLINES = ("juma kuni", "hafta oxirigacha", "2 soatdan keyin", "до пятницы", "через час", "кешке дейін")
+
+
+def parser_corpus(n: int, rnd: random.Random, now, known: List[str]) -> list:
+    """[(kind, matn, kutilgan {assignee,title,deadline,priority} | None)]: None — to'g'ri javobni lokal aniqlab bo'lmaydi."""
+    from datetime import timedelta
+    from task_parser import PRIORITY_WORDS
+    from utils import SHEVA_OFFSETS
+    word_pr = {w: pr for pr, ws in PRIORITY_WORDS.items() for w in ws}
+    out = []
+    for _ in range(n):
+        lang = rnd.choices(list(PARSE_LANGS), (45, 15, 25, 15))[0]
+        titles, prio_words, rel_days = PARSE_LANGS[lang]
+        title = rnd.choice(titles)
+        exp = {"assignee": "", "title": title, "deadline": "", "priority": "Medium"}
+        parts, kind = [], lang
+
+        r = rnd.random()
+        if r < 0.55:
+            u = rnd.choice(known); parts.append("@" + u); exp["assignee"] = "@" + u
+        elif r < 0.65:
+            u = rnd.choice(known); parts.append(u); exp["assignee"] = "@" + u
+        elif r < 0.75:
+            parts.append(f"@guest{rnd.randrange(1000)}"); kind = "unknown @"; exp = None
+        elif r < 0.85:
+            parts.append(rnd.choice(FIRST)); kind = "plain name"; exp = None    # ism → LLM/NameIndex
+        else:
+            kind = "no assignee"
+        quoted = lang == "uz" and rnd.random() < 0.3
+        parts.append(f'"{title}"' if quoted else title)
+
+        hh, mm = rnd.randrange(8, 23), rnd.choice((0, 15, 30, 45))
+        r = rnd.random()
+        if r < 0.3:
+            day = now + timedelta(days=rnd.randrange(1, 30))
+            parts.append(f"{hh:02d}:{mm:02d} {day:%d.%m.%Y}")
+            dl = day.replace(hour=hh, minute=mm, second=0, microsecond=0)
+        elif r < 0.6:
+            w = rnd.choice(rel_days); parts.append(f"{w} {hh:02d}:{mm:02d}")
+            dl = (now + timedelta(days=SHEVA_OFFSETS[w])).replace(hour=hh, minute=mm, second=0, microsecond=0)
+        elif r < 0.75:
+            w = rnd.choice(rel_days); parts.append(w)
+            dl = (now + timedelta(days=SHEVA_OFFSETS[w])).replace(hour=18, minute=0, second=0, microsecond=0)
+        elif r < 0.85:
+            parts.append(rnd.choice(VAGUE_DEADLINES)); dl = None
+            if exp: kind, exp = "vague deadline", None
+        else:
+            dl = None
+        if exp and dl:
+            exp["deadline"] = f"{dl:%Y-%m-%d %H:%M:%S}"
+        if prio_words and rnd.random() < 0.4:
+            w = rnd.choice(prio_words); parts.append(w)
+            if exp: exp["priority"] = word_pr[w]
+        elif lang == "uz" and rnd.random() < 0.15:
+            pr = rnd.choice(("Low", "High", "Urgent")); parts.append(f"[{pr}]")
+            if exp: exp["priority"] = pr
+        out.append((kind, " ".join(parts), exp))
+    return out
+
+
+def cmd_parser(args) -> int:
+    import loadtest
+    from collections import defaultdict
+    from datetime import datetime
+    from config import Config
+    from task_parser import parse_task_local
+    rnd = random.Random(11)
+    now = datetime(2025, 9, 20, 8, 0, tzinfo=Config.TIMEZONE)
+    known = [f"{u.lower()}_{i}" for i, u in enumerate(FIRST)]
+    corpus = parser_corpus(args.inputs, rnd, now, known)
+    th = Config.LOCAL_PARSE_THRESHOLD
+
+    stats = defaultdict(lambda: {"n": 0, "local": 0, "right": 0, "wrong": 0, "t": []})
+    for kind, text, exp in corpus:
+        t0 = time.perf_counter()
+        r = parse_task_local(text, now, known)
+        dt = time.perf_counter() - t0
+        for k in (kind, "all"):
+            s = stats[k]; s["n"] += 1; s["t"].append(dt)
+            if r["confidence"] >= th:
+                s["local"] += 1
+                got = {f: r[f] for f in ("assignee", "title", "deadline", "priority")}
+                s["right" if got == exp else "wrong"] += 1
+
+    print(f"{len(corpus)} inputs, LOCAL_PARSE_THRESHOLD={th}")
+    print(f"{'kind':<15} {'n':>6} {'local':>7} {'correct':>8} {'wrong':>6} {'p50 us':>7} {'p99 us':>7}")
+    for kind, s in sorted(stats.items(), key=lambda kv: (kv[0] == "all", kv[0])):
+        print(f"{kind:<15} {s['n']:>6} {s['local'] / s['n']:>7.1%} "
+              f"{(s['right'] / s['local'] if s['local'] else 0):>8.1%} {s['wrong']:>6} "
+              f"{loadtest.percentile(s['t'], 50) * 1e6:>7.1f} {loadtest.percentile(s['t'], 99) * 1e6:>7.1f}")
+    print("local — LLM'siz hal qilingan ulush; correct — ular ichida to'rtala maydon ham to'g'ri")
+    return 0
+
+
+# ---------- search ----------
+SEARCH_WORDS = ("muzlatkich harorat tozalash kassa oshxona idish ombor mahsulot yetkazib berish zal stol "
+                "buyurtma menyu sotuv hisob pech non go'sht sabzavot").split()
+
+
+def cmd_search(args) -> int:
+    rnd = random.Random(5)
+    d = _fresh_db("search.db")
+    seed_tasks(d, 0, 200)
+    t0 = time.perf_counter()
+    for start in range(0, args.tasks, 5000):
+        d.create_tasks_bulk(MANAGER_ID, [
+            {"title": " ".join(rnd.sample(SEARCH_WORDS, 3)),
+             "description": " ".join(rnd.choices(SEARCH_WORDS, k=8)) + f" z{rnd.randrange(10 * args.tasks)}",
+             "assignee": f"@u{EMPLOYEE_BASE + rnd.randrange(200)}"} for _ in range(min(5000, args.tasks - start))])
+    dt = time.perf_counter() - t0
+    rare = d.get_task(args.tasks // 2)["description"].split()[-1]     # ~1 ta vazifada uchraydi
+    print(f"seed: {args.tasks} tasks (FTS triggerlari bilan) in {dt:.1f}s — {args.tasks / dt:,.0f} tasks/s")
+
+    def like(word: str):
+        with d._read() as c:
+            return c.execute("SELECT id FROM tasks WHERE title LIKE ? OR description LIKE ? ORDER BY id DESC "
+                             "LIMIT 10", (f"%{word}%", f"%{word}%")).fetchall()
+
+    first = d.search_tasks("muzlatkich", 10)
+    rows = [
+        (f"rare term ({rare})", lambda: d.search_tasks(rare, 10)),
+        ("common term (muzlatkich)", lambda: d.search_tasks("muzlatkich", 10)),
+        ("two common terms, prefix", lambda: d.search_tasks("muzlat harorat", 10)),
+        ("common term, page 2", lambda: d.search_tasks("muzlatkich", 10, first[2])),
+        ("common term, since 7 days", lambda: d.search_tasks("kassa", 10, since=time.strftime(
+            "%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - 7 * 86400)))),
+        (f"LIKE '%{rare}%' (full scan)", lambda: like(rare)),
+    ]
+    print(f"{'query':<30} {'rows':>5} {'p50 ms':>8} {'max ms':>8}")
+    for name, fn in rows:
+        fn()
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            out = fn()
+            times.append((time.perf_counter() - t0) * 1000)
+        n = len(out[0]) if isinstance(out, tuple) else len(out)
+        times.sort()
+        print(f"{name:<30} {n:>5} {times[len(times) // 2]:>8.2f} {times[-1]:>8.2f}")
+    t0 = time.perf_counter()
+    r = d.rebuild_fts()
+    print(f"rebuild-fts: {time.perf_counter() - t0:.1f}s {r}")
+    d.close()
+    return 0
+
+
+# ---------- pages ----------
+async def _first_message_ms(updates: List[dict]) -> List[float]:
+    """Bot handlerlari orqali: update → birinchi sendMessage (soxta Bot API) gacha ms."""
+    import bot, loadtest
+    from telegram import Update
+    req = loadtest._fake_request_cls()(0)
+    first: List[float] = []
+    do_request = req.do_request
+
+    async def timed(url, method, request_data=None, **kw):
+        if url.endswith("/sendMessage") and not first:
+            first.append(time.perf_counter())
+        return await do_request(url, method, request_data, **kw)
+
+    req.do_request = timed
+    app = bot.build_application(req)
+    await app.initialize()
+    await bot.on_start(app)
+    await app.start()
+    out = []
+    try:
+        for raw in updates:
+            first.clear()
+            t0 = time.perf_counter()
+            await app.process_update(Update.de_json(raw, app.bot))
+            out.append((first[0] - t0) * 1000 if first else float("nan"))
+    finally:
+        await app.stop()
+        await app.shutdown()
+        await bot.on_stop(app)
+    return out
+
+
+def cmd_pages(args) -> int:
+    import loadtest
+    d = Database(os.environ["DATABASE_PATH"])
+    t0 = time.perf_counter()
+    ids = seed_tasks(d, args.tasks, args.employees)
+    print(f"seed: {args.tasks} tasks / {args.employees} employees in {time.perf_counter() - t0:.1f}s")
+    heavy = ids[0]
+    rows = [
+        ("mt: list_tasks_page", lambda: d.list_tasks_page(heavy, limit=20)),
+        ("    list_tasks_for_user (to'liq)", lambda: d.list_tasks_for_user(heavy)),
+        ("st: get_status_page", lambda: d.get_status_page(limit=10, tasks_per_employee=11)),
+        ("    get_status_overview (to'liq)", lambda: d.get_status_overview()),
+    ]
+    print(f"{'query':<34} {'rows':>7} {'ms':>9} {'peak KB':>10}")
+    for name, fn in rows:
+        fn()    # sovuq kesh emas, barqaror reja
+        out, ms, kb = measure(fn)
+        n = len(out[0]) if isinstance(out, tuple) else len(out)
+        print(f"{name:<34} {n:>7} {ms:>9.1f} {kb:>10.0f}")
+    d.close()
+    ms = asyncio.run(_first_message_ms([
+        {"update_id": 1, "message": loadtest._message(MANAGER_ID, 1, "/status")},
+        {"update_id": 2, "message": loadtest._message(heavy, 2, "/mytasks")},
+    ]))
+    print(f"birinchi xabar: /status {ms[0]:.1f} ms, /mytasks {ms[1]:.1f} ms")
+    return 0
+
+
+# ---------- route ----------
+# 1feec91'gacha bot.on_callback: if/startswith zanjiri (tartib va argument ajratish o'sha koddagidek)
+def legacy_page_cb(data: str) -> dict:
+    if data.startswith("sr:"):
+        _, d, cur = data.split(":", 2)
+        cursor = tuple(int(x) for x in cur.split("|"))
+    elif data.startswith("st:"):
+        _, d, cur = data.split(":", 2)
+        uname, tid = cur.rsplit("|", 1)
+        cursor = (uname, int(tid))
+    else:
+        _, _, d, cur = data.split(":", 3)
+        flag, created_at, tid = cur.split("|")
+        cursor = (int(flag), created_at, int(tid))
+    return {"after": cursor} if d == "n" else {"before": cursor}
+
+
+def legacy_callback(data: str):
+    if data == "u:language": return "language", ()
+    if data.startswith("lang:"): return "set_lang", (data.split(":", 1)[1],)
+    if data.startswith("st:"): return "status", (legacy_page_cb(data),)
+    if data.startswith("mt:"): return "mytasks", (data.startswith("mt:h:"), legacy_page_cb(data))
+    if data.startswith("sr:"): return "search", (legacy_page_cb(data),)
+    if data == "m:employees": return "employees", ()
+    if data == "emp:list": return "emp_list", ()
+    if data == "emp:add": return "emp_add", ()
+    if data == "emp:remove": return "emp_remove", ()
+    if data == "m:invites": return "invites", ()
+    if data.startswith("inv:approve_user:"): return "inv_approve", (int(data.split(":")[-1]),)
+    if data.startswith("inv:reject_user:"): return "inv_reject", (int(data.split(":")[-1]),)
+    if data == "e:mytasks": return "e_mytasks", ()
+    if data == "e:report": return "e_report", ()
+    if data == "m:assign": return "assign", ()
+    if data == "m:status": return "m_status", ()
+    if data == "m:reports": return "m_reports", ()
+    if data.startswith("task:acc:"): return "task_acc", (int(data.split(":")[-1]),)
+    if data.startswith("task:rej:"): return "task_rej", (int(data.split(":")[-1]),)
+    if data.startswith("task:done:"): return "task_done", (int(data.split(":")[-1]),)
+    if data.startswith("user:approve:"): return "user_approve", (int(data.split(":")[-1]),)
+    if data.startswith("user:reject:"): return "user_reject", (int(data.split(":")[-1]),)
+    if data == "back:home": return "home", ()
+    return None
+
+
+# 1feec91'gacha reply tugmalari: to'qqizta MessageHandler(filters.Regex(any_btn(...))) ketma-ket tekshirilardi
+LEGACY_BUTTONS = ("btn_assign", "btn_status", "btn_reports", "btn_employees", "btn_requests", "btn_change_lang",
+                  "btn_my_tasks", "btn_send_report", "btn_refresh")
+
+
+def callback_mix(n: int, rnd: random.Random) -> list:
+    """[(tur, callback_data)]: vazifa tugmalari ko'p, sahifalash va menyu kamroq, eski/noto'g'ri tugmalar oz."""
+    kinds = [
+        ("task:done:<id>", 30, lambda: f"task:done:{rnd.randrange(1, 10**6)}"),
+        ("task:acc:<id>", 20, lambda: f"task:acc:{rnd.randrange(1, 10**6)}"),
+        ("mt:a:n:<cursor>", 12, lambda: f"mt:a:n:{rnd.randrange(2)}|2025-09-{rnd.randrange(1, 29):02d} 10:00:00|"
+                                        f"{rnd.randrange(1, 10**6)}"),
+        ("st:n:<cursor>", 8, lambda: f"st:n:user{rnd.randrange(1000)}|{rnd.randrange(1, 10**7)}"),
+        ("sr:n:<cursor>", 4, lambda: f"sr:n:{rnd.randrange(10**6)}|{rnd.randrange(100)}"),
+        ("menu (m:/e:)", 12, lambda: rnd.choice(("m:status", "m:assign", "m:reports", "e:mytasks", "e:report"))),
+        ("back:home", 6, lambda: "back:home"),
+        ("user:approve:<id>", 4, lambda: f"user:approve:{rnd.randrange(1, 10**7)}"),
+        ("lang:<code>", 2, lambda: rnd.choice(("lang:uz", "lang:ru", "lang:kk"))),
+        ("unrouted (noop)", 2, lambda: "noop"),
+    ]
+    weights = [w for _, w, _ in kinds]
+    out = []
+    for _ in range(n):
+        name, _, make = rnd.choices(kinds, weights)[0]
+        out.append((name, make()))
+    return out
+
+
+def cmd_route(args) -> int:
+    import re
+    from collections import defaultdict
+    import bot
+    from languages import variants
+    rnd = random.Random(3)
+
+    def timed(fns, items) -> list:
+        """Har fn uchun {tur: (n, bitta chaqiruv us)}: raundlar navbatma-navbat, --repeat raunddan eng yaxshisi."""
+        by_kind = defaultdict(list)
+        for kind, data in items:
+            by_kind[kind].append(data)
+        best = [dict.fromkeys(by_kind, float("inf")) for _ in fns]
+        for _ in range(args.repeat):
+            for kind, datas in by_kind.items():
+                for i, fn in enumerate(fns):
+                    t0 = time.perf_counter()
+                    for d in datas:
+                        fn(d)
+                    best[i][kind] = min(best[i][kind], (time.perf_counter() - t0) / len(datas))
+        return [{k: (len(by_kind[k]), us * 1e6) for k, us in b.items()} for b in best]
+
+    def table(title: str, old_name: str, old: dict, new: dict) -> None:
+        print(f"{title:<20} {'n':>6} {old_name + ' us':>13} {'new us':>8}")
+        for kind, (n, us) in sorted(old.items(), key=lambda kv: -kv[1][0]):
+            print(f"{kind:<20} {n:>6} {us:>13.2f} {new[kind][1]:>8.2f}")
+        tot = sum(n for n, _ in old.values())
+        print(f"{'weighted mean':<20} {tot:>6} {sum(n * us for n, us in old.values()) / tot:>13.2f} "
+              f"{sum(n * us for n, us in new.values()) / tot:>8.2f}")
+
+    items = callback_mix(args.callbacks, rnd)
+    for _, data in items:   # ikkala yo'l ham bir xil ma'lumotni taniydi (yoki ikkalasi ham tanimaydi)
+        assert (legacy_callback(data) is None) == (bot.callbacks.resolve(data) is None), data
+    table("callback_data", "if-chain", *timed((legacy_callback, bot.callbacks.resolve), items))
+    print()
+
+    # Reply tugmalari: Regex chain (birinchi mos kelgan handler) va BUTTON_ACTIONS dict
+    regexes = [re.compile(rf"^(?:{'|'.join(re.escape(v) for v in sorted(variants(k), key=len, reverse=True))})$")
+               for k in LEGACY_BUTTONS]
+    first = lambda text: next((rx for rx in regexes if rx.search(text)), None)
+    texts = [(f"button {k[4:]}", rnd.choice(variants(k))) for k in LEGACY_BUTTONS for _ in range(50)]
+    texts += [("free text", "oshxonani tozalash ertaga 10:00")] * 200
+    table("reply text", "regex", *timed((first, bot.BUTTON_ACTIONS.get), texts))
+    return 0
+
+
+def cmd_archive(args) -> int:
+    d = Database(os.environ["DATABASE_PATH"])
+    n = int(args.years * 365 * args.per_day)
+    t0 = time.perf_counter()
+    ids = seed_tasks(d, n, args.employees, heavy_share=0.1, done_every=1)
+    # Tarixni years yilga yoyish: id tartibida eskidan yangiga, oxirgi --open-days kundagilari ochiq
+    span = int(args.years * 365 * 86400)
+    with d._conn() as c:
+        c.execute("UPDATE tasks SET created_at = datetime('now', printf('-%d seconds', (? - id) * ? / ?))",
+                  (n, span, n))
+        c.execute("UPDATE tasks SET completed_at = datetime(created_at, '+1 day')")
+        c.execute("UPDATE tasks SET status='new', completed_at=NULL WHERE created_at > datetime('now', ?)",
+                  (f"-{args.open_days} days",))
+        c.execute("ANALYZE")
+    print(f"seed: {n} tasks over {args.years} years / {args.employees} employees "
+          f"in {time.perf_counter() - t0:.1f}s")
+    heavy = ids[0]
+
+    def page10():
+        nxt, rows = None, []
+        for _ in range(10):
+            rows, _prev, nxt = d.list_tasks_page(heavy, after=nxt, limit=20)
+            if nxt is None:
+                break
+        return rows
+
+    rows = [
+        ("st: get_status_page", lambda: d.get_status_page(limit=10, tasks_per_employee=11)),
+        ("mt: list_tasks_page", lambda: d.list_tasks_page(heavy, limit=20)),
+        ("mt: 1..10 sahifa", page10),
+        ("mt: tarix (include_archived)", lambda: d.list_tasks_page(heavy, limit=20, include_archived=True)),
+    ]
+
+    def run(label: str) -> None:
+        with d._read() as c:
+            live, arch = (c.execute(f"SELECT COUNT(*) AS n FROM {t}").fetchone()["n"] for t in ("tasks", "tasks_archive"))
+        print(f"{label}: tasks {live}, tasks_archive {arch}")
+        print(f"  {'query':<30} {'rows':>6} {'ms':>8} {'peak KB':>9}")
+        for name, fn in rows:
+            fn()
+            out, ms, kb = measure(fn)
+            k = len(out[0]) if isinstance(out, tuple) else len(out)
+            print(f"  {name:<30} {k:>6} {ms:>8.2f} {kb:>9.0f}")
+
+    run("before")
+    t0, moved, batches = time.perf_counter(), 0, 0
+    while True:
+        k = d.archive_tasks(args.days, args.batch)
+        if not k:
+            break
+        moved, batches = moved + k, batches + 1
+    s = time.perf_counter() - t0
+    print(f"archive_tasks({args.days} days): {moved} moved in {batches} batches, {s:.1f}s "
+          f"({moved / s if s else 0:.0f} tasks/s)")
+    with d._conn() as c:
+        c.execute("ANALYZE")
+    run("after")
+    d.close()
+    return 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="bench.py")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("db-calls", help="har chaqiruvda ulanish ochish va doimiy ulanishlar: bitta chaqiruv vaqti")
+    p.add_argument("--users", type=int, default=10_000)
+    p.add_argument("--tasks", type=int, default=500_000)
+    p.add_argument("-n", type=int, default=5000, help="har metodga chaqiruvlar soni")
+    p.set_defaults(fn=cmd_db_calls)
+    p = sub.add_parser("loop-lag", help="parallel update'lar paytida event loop kechikishi (sinxron va async DB)")
+    p.add_argument("--users", type=int, default=10_000)
+    p.add_argument("--tasks", type=int, default=500_000)
+    p.add_argument("--updates", type=int, default=400, help="bir vaqtda yuborilgan sintetik update'lar")
+    p.set_defaults(fn=cmd_loop_lag)
+    p = sub.add_parser("status", help="/status ma'lumoti: N+1 va ikki so'rov, xodimlar soni bo'yicha")
+    p.add_argument("--employees", type=int, nargs="+", default=[10, 100, 500, 2000])
+    p.add_argument("--tasks-per-employee", type=int, default=10)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(fn=cmd_status)
+    p = sub.add_parser("openai", help="OpenAI klienti soxta serverga: har chaqiruvda yangi klient va umumiy pool")
+    p.add_argument("--calls", type=int, default=200)
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--delay", type=float, default=0.02, help="soxta server javob kechikishi (s)")
+    p.set_defaults(fn=cmd_openai)
+    p = sub.add_parser("deadline-startup", help="N ta ochiq vazifa: deadline eslatmalarini restartda yuklash")
+    p.add_argument("--tasks", type=int, default=100_000)
+    p.add_argument("--employees", type=int, default=500)
+    p.add_argument("--days", type=int, default=30, help="deadline'lar shu kunlar ichida tarqaladi")
+    p.set_defaults(fn=cmd_deadline_startup)
+    p = sub.add_parser("deadline-sched", help="PTB run_once job'lari va DeadlineScheduler heap'i: vaqt va xotira")
+    p.add_argument("--levels", type=int, nargs="+", default=[2_000, 10_000, 100_000, 1_000_000])
+    p.add_argument("--ptb-max", type=int, default=100_000, help="PTB run_once shu sondan ko'pga o'lchanmaydi")
+    p.add_argument("--dedupe-max", type=int, default=2_000, help="get_jobs_by_name dedupe (kvadratik) chegarasi")
+    p.set_defaults(fn=cmd_deadline_sched)
+    p = sub.add_parser("bulk", help="bitta checklist ko'p xodimga: ketma-ket create_task va create_tasks_bulk")
+    p.add_argument("--assignees", type=int, default=40)
+    p.add_argument("--repeat", type=int, default=30, help="nechta checklist")
+    p.set_defaults(fn=cmd_bulk)
+    p = sub.add_parser("names", help="NameIndex: sintetik ismlar korpusida aniqlik va kechikish, LIKE bilan taqqoslash")
+    p.add_argument("--users", type=int, default=100_000)
+    p.add_argument("--queries", type=int, default=500, help="har so'rov turiga")
+    p.add_argument("--like-queries", type=int, default=50, help="eski LIKE so'rovi (to'liq skan) uchun")
+    p.set_defaults(fn=cmd_names)
+    p = sub.add_parser("parser", help="parse_task_local: sintetik korpusda lokal hal qilinish ulushi va kechikish")
+    p.add_argument("--inputs", type=int, default=20_000)
+    p.set_defaults(fn=cmd_parser)
+    p = sub.add_parser("search", help="FTS5 /search: so'rov vaqtlari, LIKE skan bilan taqqoslash, rebuild-fts")
+    p.add_argument("--tasks", type=int, default=200_000)
+    p.add_argument("--repeat", type=int, default=30)
+    p.set_defaults(fn=cmd_search)
+    p = sub.add_parser("pages", help="/status va /mytasks birinchi sahifasi katta DB'da")
+    p.add_argument("--tasks", type=int, default=50_000)
+    p.add_argument("--employees", type=int, default=500)
+    p.set_defaults(fn=cmd_pages)
+    p = sub.add_parser("route", help="callback_data va reply tugmalari: eski if/regex zanjiri va CallbackRouter/dict")
+    p.add_argument("--callbacks", type=int, default=20_000)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(fn=cmd_route)
+    p = sub.add_parser("archive", help="bir necha yillik done vazifalar: archive_tasks'dan oldin va keyin sahifalar")
+    p.add_argument("--years", type=float, default=5)
+    p.add_argument("--per-day", type=int, default=100, help="kuniga yaratiladigan vazifalar")
+    p.add_argument("--employees", type=int, default=200)
+    p.add_argument("--open-days", type=int, default=7, help="oxirgi shu kundagi vazifalar ochiq qoladi")
+    p.add_argument("--days", type=int, default=90, help="archive_tasks older_than_days (ARCHIVE_AFTER_DAYS)")
+    p.add_argument("--batch", type=int, default=500, help="ARCHIVE_BATCH_SIZE")
+    p.set_defaults(fn=cmd_archive)
+    args = ap.parse_args(argv)
+
+    tmp = None
+    if not os.getenv("DATABASE_PATH"):
+        tmp = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_PATH"] = os.path.join(tmp.name, "bench.db")
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "1:bench")
+    os.environ["OPENAI_API_KEY"] = ""
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["MANAGER_IDS"] = str(MANAGER_ID)
+    try:
+        return args.fn(args)
+    finally:
+        if tmp:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
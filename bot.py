@@ -1,8 +1,8 @@
 # bot.py — PTB v21.6, TASKBOTAI (pending → approve oqimi bilan)
-import asyncio, logging, os, re, sqlite3
-from datetime import datetime, time
+import asyncio, functools, json, logging, os, re, signal
+from datetime import datetime, time, timedelta, timezone
 from zoneinfo import ZoneInfo
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from telegram import (
     Update, InlineKeyboardMarkup, InlineKeyboardButton,
@@ -10,13 +10,25 @@ from telegram import (
 )
 from telegram.constants import ParseMode
 from telegram.ext import (
-    Application, CallbackQueryHandler, CommandHandler,
-    MessageHandler, ContextTypes, filters,
+    Application, CallbackQueryHandler, CommandHandler, Defaults,
+    MessageHandler, ContextTypes, TypeHandler, filters,
 )
+from telegram.request import BaseRequest
 
 from config import Config
-from database import Database
-from languages import T
+from database import AsyncDatabase, Database
+from languages import LANGS, T, text as L, variants
+from roles import EMPLOYEE, MANAGER, Principal, RoleResolver
+from router import CallbackRouter
+from states import ConversationStore, State
+from updates import PerUserUpdateProcessor, UpdateRecorder
+import webhook
+import ai
+from task_parser import parse_deadline, parse_task_local, split_task_command
+from voice import VoiceJob, VoicePipeline
+from broadcast import Broadcaster
+from deadlines import DeadlineScheduler
+from utils import chunk_lines
 
 # ---------- Logging ----------
 LOG_LEVEL = getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO)
@@ -24,7 +36,8 @@ logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s | %(levelname)s | %(nam
 logger = logging.getLogger("taskbot")
 
 # ---------- Globals ----------
-db = Database(Config.DATABASE_PATH)
+db = AsyncDatabase(Database(Config.DATABASE_PATH, Config.USER_CACHE_SIZE, Config.USER_CACHE_TTL,
+                            online_migrations=Config.DB_ONLINE_MIGRATIONS))
 TZ: ZoneInfo = Config.TIMEZONE
 
 def _to_time(s: str, default: str) -> time:
@@ -38,104 +51,96 @@ def _to_time(s: str, default: str) -> time:
 MORNING_TIME = _to_time(Config.MORNING_REMINDER, "09:00")
 EVENING_TIME = _to_time(Config.EVENING_REMINDER, "18:00")
 REPORT_TIME  = _to_time(Config.DAILY_REPORT_TIME, "18:00")
-
-# ---------- Multilang helpers ----------
-def LM(lang: str, key: str, defaults: dict, **kwargs) -> str:
-    """
-    Multi-language safe lookup:
-    1) Try languages.py (T)
-    2) Fallback to provided defaults dict {'uz':..., 'ru':..., 'kk':...}
-    """
-    s = T(lang, key, **kwargs)
-    if s != key:
-        return s
-    base = defaults.get(lang) or defaults.get("uz") or ""
-    try:
-        return base.format(**kwargs)
-    except Exception:
-        return base
-
-# Button labels (3 tilda ishlash uchun defaults)
-LBL = {
-    "assign": {"uz":"📝 Vazifa berish", "ru":"📝 Назначить", "kk":"📝 Тапсырма беру"},
-    "status": {"uz":"📊 Holat", "ru":"📊 Статус", "kk":"📊 Күй"},
-    "reports": {"uz":"🧾 Hisobotlar", "ru":"🧾 Отчёты", "kk":"🧾 Есептер"},
-    "employees": {"uz":"👤 Hodimlar", "ru":"👤 Сотрудники", "kk":"👤 Қызметкерлер"},
-    "invites": {"uz":"📨 So‘rovlar", "ru":"📨 Запросы", "kk":"📨 Сұраулар"},
-    "lang": {"uz":"🌐 Til", "ru":"🌐 Язык", "kk":"🌐 Тіл"},
-    "mytasks": {"uz":"✅ Mening vazifalarim", "ru":"✅ Мои задачи", "kk":"✅ Менің тапсырмаларым"},
-    "sendrep": {"uz":"🧾 Hisobot yuborish", "ru":"🧾 Отчёт", "kk":"🧾 Есеп"},
-    "back": {"uz":"◀️ Orqaga", "ru":"◀️ Назад", "kk":"◀️ Артқа"},
-    "refresh": {"uz":"🔄 Statusni tekshirish", "ru":"🔄 Проверить статус", "kk":"🔄 Статусты тексеру"},
-}
-
-# Pending flow texts
-TXT_PENDING_INFO = {
-    "uz": "🕒 So‘rovingiz *admin tasdig‘ida*. Tasdiqlangach, panel ochiladi.",
-    "ru": "🕒 Ваша заявка *ожидает одобрения*. После одобрения панель откроется.",
-    "kk": "🕒 Сұрауыңыз *мақұлдауды күтуде*. Мақұлданған соң панель ашылады.",
-}
-TXT_NEW_REQ = {
-    "uz": "🆕 Yangi so‘rov: @{username} — {full_name}\nID: {uid}",
-    "ru": "🆕 Новый запрос: @{username} — {full_name}\nID: {uid}",
-    "kk": "🆕 Жаңа сұрау: @{username} — {full_name}\nID: {uid}",
-}
-TXT_APPROVED_USER = {
-    "uz": "✅ Siz tasdiqlandingiz! Endi paneldan foydalanishingiz mumkin.",
-    "ru": "✅ Вас одобрили! Теперь вы можете пользоваться панелью.",
-    "kk": "✅ Сіз мақұлдандыңыз! Енді панельді қолдана аласыз.",
-}
-TXT_REJECTED_USER = {
-    "uz": "❌ So‘rov rad etildi.\nSabab: {reason}",
-    "ru": "❌ Заявка отклонена.\nПричина: {reason}",
-    "kk": "❌ Сұрау қайтарылды.\nСебебі: {reason}",
-}
-BTN_APPROVE = {"uz":"✅ Qabul qilish","ru":"✅ Принять","kk":"✅ Қабылдау"}
-BTN_REJECT  = {"uz":"❌ Rad etish","ru":"❌ Отклонить","kk":"❌ Қайтару"}
-
-# Regex helpers: handlerlar uch tildagi tugma matnlarini tanisin
-def any_btn(*keys: str) -> str:
-    all_vals = []
-    for k in keys:
-        vals = list(LBL[k].values())
-        all_vals.extend(vals)
-    pat = "|".join(re.escape(v) for v in sorted(set(all_vals), key=len, reverse=True))
-    return rf"^(?:{pat})$"
+ARCHIVE_TIME = _to_time(Config.ARCHIVE_TIME, "03:30")
 
 # ---------- Roles ----------
+roles = RoleResolver(Config.MANAGER_IDS, Config.MANAGER_USERNAMES)
+
 def is_manager(user) -> bool:
-    if not user: return False
-    tid = user.id
-    ids = {int(x) for x in (Config.MANAGER_IDS or "").split(",") if x.strip().isdigit()}
-    unames = {u.strip().lower() for u in (Config.MANAGER_USERNAMES or "").split(",") if u.strip()}
-    return (tid in ids) or ((user.username or "").lower() in unames)
+    return roles.is_manager(user)
 
 # ---------- Keyboards ----------
 def kb_inline(rows: List[List[tuple]]) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([[InlineKeyboardButton(txt, callback_data=cd) for (txt, cd) in row] for row in rows])
 
+def page_nav_kb(lang: str, prefix: str, prev: Optional[tuple], nxt: Optional[tuple]) -> Optional[InlineKeyboardMarkup]:
+    """Keyset sahifa tugmalari: callback_data = "<prefix>:p|n:<kursor maydonlari '|' bilan>" (≤64 bayt)."""
+    row = [(T(lang, key), f"{prefix}:{d}:" + "|".join(map(str, cur)))
+           for key, d, cur in (("btn_page_prev", "p", prev), ("btn_page_next", "n", nxt)) if cur]
+    return kb_inline([row]) if row else None
+
+# Kursor dekoderlari (CallbackRouter converter'lari): xato format — ValueError, marshrut mos kelmaydi
+def decode_status_cursor(s: str) -> tuple:
+    uname, tid = s.rsplit("|", 1)
+    return uname, int(tid)
+
+def decode_task_cursor(s: str) -> tuple:
+    flag, created_at, tid = s.split("|")
+    return int(flag), created_at, int(tid)
+
+def decode_int_cursor(s: str) -> tuple:
+    return tuple(int(x) for x in s.split("|"))
+
+def page_kw(d: str, cursor: tuple) -> dict:
+    """"n" — keyingi sahifa (after=), "p" — oldingi (before=)."""
+    return {"after": cursor} if d == "n" else {"before": cursor}
+
+async def send_chunked(update: Update, lines, reply_markup=None) -> None:
+    """Qatorlarni ≤4096 belgili xabarlarga bo'lib yuborish; reply_markup oxirgi xabarga."""
+    chunks = chunk_lines(lines)
+    text = next(chunks, None)
+    for nxt in chunks:
+        await update.effective_chat.send_message(text, parse_mode=ParseMode.MARKDOWN)
+        text = nxt
+    if text is not None:
+        await update.effective_chat.send_message(text, parse_mode=ParseMode.MARKDOWN, reply_markup=reply_markup)
+
+def per_lang(build):
+    """Klaviatura har til uchun import paytida bir marta quriladi (PTB obyektlari o'zgarmas — ulashish xavfsiz)."""
+    cache = {lang: build(lang) for lang in LANGS}
+    default = cache[Config.DEFAULT_LANG if Config.DEFAULT_LANG in cache else LANGS[0]]
+    return functools.wraps(build)(lambda lang: cache.get(lang, default))
+
+@per_lang
 def manager_home_kb(lang: str) -> ReplyKeyboardMarkup:
     rows = [
-        [KeyboardButton(LM(lang, "btn_assign", LBL["assign"])), KeyboardButton(LM(lang, "btn_status", LBL["status"]))],
-        [KeyboardButton(LM(lang, "btn_reports", LBL["reports"])), KeyboardButton(LM(lang, "btn_employees", LBL["employees"]))],
-        [KeyboardButton(LM(lang, "btn_requests", LBL["invites"])), KeyboardButton(LM(lang, "btn_change_lang", LBL["lang"]))],
+        [KeyboardButton(L(lang, "btn_assign")), KeyboardButton(L(lang, "btn_status"))],
+        [KeyboardButton(L(lang, "btn_reports")), KeyboardButton(L(lang, "btn_employees"))],
+        [KeyboardButton(L(lang, "btn_requests")), KeyboardButton(L(lang, "btn_change_lang"))],
     ]
     return ReplyKeyboardMarkup(rows, resize_keyboard=True)
 
+@per_lang
 def employee_home_kb(lang: str) -> ReplyKeyboardMarkup:
     rows = [
-        [KeyboardButton(LM(lang, "btn_my_tasks", LBL["mytasks"])), KeyboardButton(LM(lang, "btn_send_report", LBL["sendrep"]))],
-        [KeyboardButton(LM(lang, "btn_change_lang", LBL["lang"]))],
+        [KeyboardButton(L(lang, "btn_my_tasks")), KeyboardButton(L(lang, "btn_send_report"))],
+        [KeyboardButton(L(lang, "btn_change_lang"))],
     ]
     return ReplyKeyboardMarkup(rows, resize_keyboard=True)
 
+@per_lang
 def employee_pending_kb(lang: str) -> ReplyKeyboardMarkup:
     rows = [
-        [KeyboardButton(LM(lang, "btn_refresh", LBL["refresh"]))],
-        [KeyboardButton(LM(lang, "btn_change_lang", LBL["lang"]))],
+        [KeyboardButton(L(lang, "btn_refresh"))],
+        [KeyboardButton(L(lang, "btn_change_lang"))],
     ]
     return ReplyKeyboardMarkup(rows, resize_keyboard=True)
 
+@per_lang
+def language_kb(lang: str) -> InlineKeyboardMarkup:
+    return kb_inline([
+        [("🇺🇿 O‘zbek", "lang:uz"), ("🇷🇺 Русский", "lang:ru"), ("🇰🇿 Қазақша", "lang:kk")],
+        [(L(lang, "btn_back"), "back:home")]
+    ])
+
+@per_lang
+def employees_menu_kb(lang: str) -> InlineKeyboardMarkup:
+    return kb_inline([
+        [(L(lang,"btn_emp_list"), "emp:list")],
+        [(L(lang,"btn_emp_add"), "emp:add"), (L(lang,"btn_emp_remove"), "emp:remove")],
+        [(L(lang, "btn_back"), "back:home")]
+    ])
+
 # ---------- Tiny utils ----------
 def normalize_dt(dt: datetime) -> str:
     return dt.strftime("%Y-%m-%d %H:%M:%S")
@@ -167,31 +172,59 @@ def parse_deadline_hhmm_dmy(text: str, base: datetime) -> Optional[str]:
     today = base.date()
     return normalize_dt(datetime(today.year, today.month, today.day, hh, mm, tzinfo=TZ))
 
-def parse_assignee(token: str) -> Optional[str]:
+async def parse_assignee(token: str) -> Optional[str]:
     token = (token or "").strip()
     if not token: return None
     if token.startswith("@"): return token
-    u = db.resolve_assignee(token)
+    u = await db.resolve_assignee(token)
     if u and u.get("username"): return "@" + u["username"]
     return None
 
+async def ask_assignee(bot, chat_id: int, lang: str, task_id: int, hint: str):
+    """Ijrochi ishonchli aniqlanmadi (resolve_assignee → None): o'xshash ismlar bo'lsa menejer tanlaydi."""
+    hint = (hint or "").strip(" ,.:;")
+    if not hint or hint[0] in "@\"«“": return
+    cands = await db.suggest_assignees(hint, limit=4)
+    if not cands: return
+    rows = [[(f"{u.get('full_name') or '-'} (@{u.get('username') or '-'})", f"task:asg:{task_id}:{u['telegram_id']}")]
+            for u in cands]
+    await bot.send_message(chat_id, T(lang, "assignee_confirm", name=hint, task_id=task_id), reply_markup=kb_inline(rows))
+
+async def notify_assigned(bot, emp: dict, task_id: int, title: str, deadline: str, priority: str):
+    btns = kb_inline([
+        [("✅ Qabul qilish", f"task:acc:{task_id}"), ("❌ Rad qilish", f"task:rej:{task_id}")],
+        [("☑️ Bajardim", f"task:done:{task_id}")]
+    ])
+    try:
+        await bot.send_message(emp["telegram_id"],
+            T(emp.get("language","uz"), "task_assigned", title=title, deadline=deadline or "-", priority=priority),
+            reply_markup=btns)
+    except Exception as e:
+        logger.warning("Notify employee failed: %s", e)
+
 # ---------- AI agent (optional) ----------
 OPENAI_API_KEY = Config.OPENAI_API_KEY
 OPENAI_TASK_MODEL = Config.OPENAI_TASK_MODEL
 
+PARSE_STATS = {"local": 0, "cached": 0, "llm": 0}
+
 async def ai_parse_task(text: str, now_iso: str, known_usernames: List[str]) -> dict:
-    nat = parse_deadline_hhmm_dmy(text, datetime.now(TZ))
-    if not OPENAI_API_KEY:
-        return {
-            "assignee": parse_assignee(text.split()[0] if text.split() else "") or "",
-            "title": text.strip() or "No title",
-            "deadline": nat or "",
-            "priority": "Medium",
-        }
+    local = parse_task_local(text, datetime.now(TZ), known_usernames)
+    if not local["assignee"]:
+        local["assignee"] = await parse_assignee(text.split()[0] if text.split() else "") or ""
+    # Aniq strukturali matn (/task grammatikasi, sana, @user) — LLM chaqirilmaydi
+    if not OPENAI_API_KEY or local["confidence"] >= Config.LOCAL_PARSE_THRESHOLD:
+        PARSE_STATS["local"] += 1
+        return local
+    bucket = ai.parse_cache_bucket(text, now_iso)
+    key = ai.response_cache.make_key("bot_parse", OPENAI_TASK_MODEL, text, known_usernames, bucket or "")
+    data = await ai.response_cache.get(key) if bucket is not None else None
+    if data is not None:
+        PARSE_STATS["cached"] += 1
+    else:
+        PARSE_STATS["llm"] += 1
     try:
-        from openai import OpenAI
         import json
-        client = OpenAI(api_key=OPENAI_API_KEY)
         sys = (
             "Siz Telegram uchun Task Agent. Kirishdan vazifa strukturasi chiqaring. "
             "Natijani JSON qaytaring: {\"assignee\":\"@username|name|null\",\"title\":\"...\","
@@ -200,109 +233,123 @@ async def ai_parse_task(text: str, now_iso: str, known_usernames: List[str]) ->
             "HH:MM DD.MM.YYYY ko‘rsatilsa, shuni oling; aks holda bugungi HH:MM bilan normalizatsiya qiling."
         )
         prompt = f"now={now_iso}\nknown_users={known_usernames}\ntext={text}"
-        resp = await asyncio.to_thread(
-            client.chat.completions.create,
-            model=OPENAI_TASK_MODEL,
-            messages=[{"role":"system","content":sys},{"role":"user","content":prompt}],
-            response_format={"type":"json_object"},
-            temperature=0.2,
-        )
-        raw = resp.choices[0].message.content
-        try:
-            data = json.loads(raw)
-        except Exception:
-            data = {}
+        if data is None:
+            resp = await ai.chat_completion(
+                model=OPENAI_TASK_MODEL,
+                messages=[{"role":"system","content":sys},{"role":"user","content":prompt}],
+                response_format={"type":"json_object"},
+                temperature=0.2,
+            )
+            raw = resp.choices[0].message.content
+            try:
+                data = json.loads(raw)
+            except Exception:
+                data = {}
+            if data and bucket is not None:
+                await ai.response_cache.put(key, data)
         asg = data.get("assignee") or ""
         if asg and not asg.startswith("@") and asg in known_usernames:
             asg = "@" + asg
         pr = (data.get("priority") or "Medium").title()
         out = {
-            "assignee": asg,
-            "title": data.get("title") or (text.strip() or "No title"),
-            "deadline": data.get("deadline") or (parse_deadline_hhmm_dmy(text, datetime.now(TZ)) or ""),
-            "priority": pr if pr in {"Low","Medium","High","Urgent"} else "Medium",
+            "assignee": asg or local["assignee"],
+            "title": data.get("title") or local["title"],
+            "deadline": data.get("deadline") or local["deadline"],
+            "priority": pr if pr in {"Low","Medium","High","Urgent"} else local["priority"],
         }
         return out
     except Exception as e:
         logger.warning("AI parse failed: %s", e)
-        return {
-            "assignee": parse_assignee(text.split()[0] if text.split() else "") or "",
-            "title": text.strip() or "No title",
-            "deadline": nat or "",
-            "priority": "Medium",
-        }
+        return local
 
-# ---------- Core: ensure_user ----------
-async def ensure_user(update: Update, context: ContextTypes.DEFAULT_TYPE) -> dict:
+# ---------- Core: principal / ensure_user ----------
+async def resolve_principal(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Principal:
+    """
+    Rol, til va tasdiq holati — bitta update uchun bir marta: natija context'da turadi,
+    handlerlar zanjiri (text_router → cmd_start ...) qayta so'ramaydi.
+    """
     tg = update.effective_user
-    if not tg: return {}
-    user = db.upsert_user(tg.id, tg.username, f"{tg.first_name or ''} {tg.last_name or ''}".strip())
-    # auto-assign role for configured managers
-    if not user.get("role"):
-        role = "MANAGER" if is_manager(tg) else "EMPLOYEE"
-        db.set_user_role(tg.id, role)
-        user["role"] = role
-    return user
+    cached = getattr(context, "_principal", None)
+    if cached is not None and tg and cached.user_id == tg.id:
+        return cached
+    if not tg:
+        return Principal(0, "", Config.DEFAULT_LANG, False, {})
+    user = await db.upsert_user(tg.id, tg.username, f"{tg.first_name or ''} {tg.last_name or ''}".strip())
+    manager = roles.is_manager(tg)
+    # DB'dagi rol config bilan mos bo'lsin: yangi foydalanuvchi yoki keyin MANAGER_IDS'ga qo'shilgan
+    if not user.get("role") or (manager and user["role"] != MANAGER):
+        user["role"] = MANAGER if manager else EMPLOYEE
+        await db.set_user_role(tg.id, user["role"])
+    approved = manager or await db.user_is_approved(tg.id)
+    p = Principal(tg.id, MANAGER if manager else EMPLOYEE, user.get("language") or Config.DEFAULT_LANG, approved, user)
+    if context is not None:
+        context._principal = p
+    return p
+
+async def ensure_user(update: Update, context: ContextTypes.DEFAULT_TYPE) -> dict:
+    return (await resolve_principal(update, context)).user
+
+async def reload_roles() -> tuple:
+    """SIGHUP va /reload: config'ni qayta o'qish, DB bilan sinxronlash."""
+    roles.load_config()
+    await db.sync_manager_roles(roles.config_ids, roles.config_usernames)
+    roles.set_db_managers(m["telegram_id"] for m in await db.list_managers())
+    counts = roles.counts()
+    logger.info("Roles reloaded: %d manager ids, %d usernames, %d from DB", *counts)
+    return counts
 
 # ---------- Start / Language ----------
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg = update.effective_user
-    u = await ensure_user(update, context)
-    lang = u.get("language", Config.DEFAULT_LANG)
+    p = await resolve_principal(update, context)
+    u, lang = p.user, p.lang
+    # /start — foydalanuvchi qaytgan bo'lsa, bloklangan ro'yxatdan chiqaramiz
+    await db.unmark_chat_blocked(tg.id)
 
     # Employee pending gating (managerlarga so'rov jo'natish)
-    if not is_manager(tg) and not db.user_is_approved(tg.id):
-        created, req_id = db.ensure_pending_request(tg.id, tg.username, u.get("full_name"))
+    if not p.approved:
+        created, req_id = await db.ensure_pending_request(tg.id, tg.username, u.get("full_name"))
         # Faqat yangi request yaratilganda adminlarga xabar:
         if created:
-            for m in db.list_managers():
-                try:
-                    txt = LM(m.get("language","uz"), "new_request_text", TXT_NEW_REQ,
-                             username=u.get("username") or "-", full_name=u.get("full_name") or "-", uid=tg.id)
-                    kb = kb_inline([
-                        [(LM(m.get("language","uz"), "btn_approve", BTN_APPROVE), f"user:approve:{tg.id}"),
-                         (LM(m.get("language","uz"), "btn_reject", BTN_REJECT), f"user:reject:{tg.id}")]
-                    ])
-                    await context.bot.send_message(m["telegram_id"], txt, reply_markup=kb)
-                except Exception as e:
-                    logger.warning("Notify manager failed: %s", e)
+            msgs = []
+            for m in await db.list_managers():
+                m_lang = m.get("language","uz")
+                txt = T(m_lang, "new_request_text",
+                         username=u.get("username") or "-", full_name=u.get("full_name") or "-", uid=tg.id)
+                kb = kb_inline([
+                    [(T(m_lang, "btn_approve"), f"user:approve:{tg.id}"),
+                     (T(m_lang, "btn_reject"), f"user:reject:{tg.id}")]
+                ])
+                msgs.append((m["telegram_id"], txt, {"reply_markup": kb}))
+            in_background(update, context, broadcaster.send(context.bot, msgs, "new_request"))
 
         # Foydalanuvchiga pending ekran:
         await update.effective_chat.send_message(
-            LM(lang, "pending_info", TXT_PENDING_INFO),
+            T(lang, "pending_info"),
             parse_mode=ParseMode.MARKDOWN,
             reply_markup=employee_pending_kb(lang)
         )
         return
 
     # Approved / Manager — panelni ko‘rsatamiz
-    text = T(lang, "welcome_manager") if is_manager(tg) else T(lang, "welcome_employee")
-    kb = manager_home_kb(lang) if is_manager(tg) else employee_home_kb(lang)
+    text = T(lang, "welcome_manager") if p.is_manager else T(lang, "welcome_employee")
+    kb = manager_home_kb(lang) if p.is_manager else employee_home_kb(lang)
     await update.effective_chat.send_message(text, reply_markup=kb, parse_mode=ParseMode.HTML)
 
 async def cmd_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
     u = await ensure_user(update, context)
     lang = u.get("language", Config.DEFAULT_LANG)
-    kb = kb_inline([
-        [("🇺🇿 O‘zbek", "lang:uz"), ("🇷🇺 Русский", "lang:ru"), ("🇰🇿 Қазақша", "lang:kk")],
-        [(LM(lang,"btn_back", LBL["back"]), "back:home")]
-    ])
-    await update.effective_chat.send_message(T(lang, "choose_language"), reply_markup=kb)
+    await update.effective_chat.send_message(T(lang, "choose_language"), reply_markup=language_kb(lang))
 
 async def on_cb_language(update: Update, context: ContextTypes.DEFAULT_TYPE, code: str):
     tg = update.effective_user
-    db.set_user_language(tg.id, code)
+    await db.set_user_language(tg.id, code)
     text = T(code, "language_set", lang=code)
-    kb = manager_home_kb(code) if is_manager(tg) else (employee_home_kb(code) if db.user_is_approved(tg.id) else employee_pending_kb(code))
+    p = await resolve_principal(update, context)
+    kb = manager_home_kb(code) if p.is_manager else (employee_home_kb(code) if p.approved else employee_pending_kb(code))
     await update.effective_chat.send_message(text, reply_markup=kb)
 
 # ---------- Employees (Manager only) ----------
-def employees_menu_kb(lang: str) -> InlineKeyboardMarkup:
-    return kb_inline([
-        [(T(lang,"btn_emp_list") or "📋 Ro‘yxat", "emp:list")],
-        [(T(lang,"btn_emp_add") or "➕ Qo‘shish", "emp:add"), (T(lang,"btn_emp_remove") or "🗑️ O‘chirish", "emp:remove")],
-        [(LM(lang,"btn_back", LBL["back"]), "back:home")]
-    ])
 
 async def cb_employees_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, lang: str):
     if not is_manager(update.effective_user):
@@ -312,7 +359,7 @@ async def cb_employees_menu(update: Update, context: ContextTypes.DEFAULT_TYPE,
 async def cb_emp_list(update: Update, context: ContextTypes.DEFAULT_TYPE, lang: str):
     if not is_manager(update.effective_user):
         return await update.effective_chat.send_message(T(lang,"only_manager"))
-    emps = db.list_employees()
+    emps = await db.list_employees()
     if not emps:
         return await update.effective_chat.send_message(T(lang,"employees_empty"), reply_markup=employees_menu_kb(lang))
     lines = [T(lang,"employees_list_header")]
@@ -323,141 +370,134 @@ async def cb_emp_list(update: Update, context: ContextTypes.DEFAULT_TYPE, lang:
 async def ask_emp_add(update: Update, context: ContextTypes.DEFAULT_TYPE, lang: str):
     if not is_manager(update.effective_user):
         return await update.effective_chat.send_message(T(lang,"only_manager"))
-    context.user_data["awaiting_emp_add_username"] = True
+    conversations.set(update.effective_user.id, State.EMP_ADD)
     await update.effective_chat.send_message(T(lang,"emp_add_hint"), reply_markup=employees_menu_kb(lang))
 
 async def ask_emp_remove(update: Update, context: ContextTypes.DEFAULT_TYPE, lang: str):
     if not is_manager(update.effective_user):
         return await update.effective_chat.send_message(T(lang,"only_manager"))
-    context.user_data["awaiting_emp_remove"] = True
+    conversations.set(update.effective_user.id, State.EMP_REMOVE)
     await update.effective_chat.send_message(T(lang,"emp_remove_hint"), reply_markup=employees_menu_kb(lang))
 
 # ---------- Text Router ----------
 async def text_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    tg = update.effective_user
-    u = db.get_user(tg.id) or {}
-    lang = u.get("language", Config.DEFAULT_LANG)
+    """Matn: avval tugma (bitta dict qidiruv, holat oqimlaridan ustun), keyin foydalanuvchining suhbat holati."""
+    p = await resolve_principal(update, context)
     text = (update.message.text or "").strip()
+    action = BUTTON_ACTIONS.get(text)
+    if action is not None:
+        return await action(update, context, p)
 
     # If pending (and not manager), faqat refresh/lang ishlasin
-    if not is_manager(tg) and not db.user_is_approved(tg.id):
-        if text == LM(lang, "btn_refresh", LBL["refresh"]) or text.lower() in {"/refresh","refresh"}:
+    if not p.approved:
+        if text.lower() in {"/refresh","refresh"}:
             return await cmd_start(update, context)
-        if text == LM(lang, "btn_change_lang", LBL["lang"]) or text.lower() in {"/language","/lang"}:
+        if text.lower() in {"/language","/lang"}:
             return await cmd_language(update, context)
         # boshqa hamma narsa bloklanadi
         return await update.effective_chat.send_message(
-            LM(lang, "pending_info", TXT_PENDING_INFO),
+            T(p.lang, "pending_info"),
             parse_mode=ParseMode.MARKDOWN,
-            reply_markup=employee_pending_kb(lang)
+            reply_markup=employee_pending_kb(p.lang)
         )
 
-    # employees add/remove
-    if context.user_data.pop("awaiting_emp_add_username", False):
-        if not text.startswith("@"):
-            return await update.effective_chat.send_message(T(lang,"enter_username_error"), reply_markup=employees_menu_kb(lang))
-        context.user_data["new_emp_username"] = text.lstrip("@")
-        ok, link = db.create_invite_for(context.user_data.pop("new_emp_username"), full_name=None)
-        if ok:
-            await update.effective_chat.send_message(T(lang,"invite_created", username=text.lstrip("@"), link=link),
-                                                     reply_markup=employees_menu_kb(lang))
-        else:
-            await update.effective_chat.send_message("Invite yaratib bo‘lmadi.", reply_markup=employees_menu_kb(lang))
-        return
+    conv = conversations.pop(p.user_id)
+    if conv is not None:
+        return await STATE_FLOWS[conv.state](update, context, p, text, conv.payload)
 
-    if context.user_data.pop("awaiting_emp_remove", False):
-        username = text.lstrip("@")
-        ok = db.remove_employee_by_username(username)
-        await update.effective_chat.send_message(
-            T(lang, "emp_removed" if ok else "emp_remove_fail", username=username),
-            reply_markup=employees_menu_kb(lang)
-        )
-        return
+async def flow_emp_add(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, text: str, _):
+    lang = p.lang
+    if not text.startswith("@"):
+        return await update.effective_chat.send_message(T(lang,"enter_username_error"), reply_markup=employees_menu_kb(lang))
+    ok, link = await db.create_invite_for(text.lstrip("@"), full_name=None)
+    if ok:
+        await update.effective_chat.send_message(T(lang,"invite_created", username=text.lstrip("@"), link=link),
+                                                 reply_markup=employees_menu_kb(lang))
+    else:
+        await update.effective_chat.send_message("Invite yaratib bo‘lmadi.", reply_markup=employees_menu_kb(lang))
+
+async def flow_emp_remove(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, text: str, _):
+    username = text.lstrip("@")
+    ok = await db.remove_employee_by_username(username)
+    await update.effective_chat.send_message(
+        T(p.lang, "emp_removed" if ok else "emp_remove_fail", username=username),
+        reply_markup=employees_menu_kb(p.lang)
+    )
 
-    # task reject reason
-    if context.user_data.get("awaiting_task_reject_reason"):
-        task_id = context.user_data.pop("awaiting_task_reject_reason")
-        reason = text
-        try:
-            db.set_task_status(task_id, "rejected", by=tg.id, reason=reason)
-            await update.effective_chat.send_message("❌ Vazifa rad qilindi.", reply_markup=employee_home_kb(lang))
-        except Exception as ex:
-            logger.exception("Task reject failed: %s", ex)
-            await update.effective_chat.send_message("Rad etishda xatolik.", reply_markup=employee_home_kb(lang))
-        return
+async def flow_task_reject(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, reason: str, task_id: int):
+    try:
+        await db.set_task_status(task_id, "rejected", by=p.user_id, reason=reason)
+        await update.effective_chat.send_message("❌ Vazifa rad qilindi.", reply_markup=employee_home_kb(p.lang))
+    except Exception as ex:
+        logger.exception("Task reject failed: %s", ex)
+        await update.effective_chat.send_message("Rad etishda xatolik.", reply_markup=employee_home_kb(p.lang))
+
+async def flow_task_done(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, report: str, task_id: int):
+    """task_id=0 — vazifasiz umumiy kunlik hisobot (cb_employee_report)."""
+    lang = p.lang
+    try:
+        ok = await db.mark_task_done_with_report(task_id, p.user_id, report)
+        if ok:
+            if task_id:
+                in_background(update, context, notify_managers_task_done(context.bot, p.user, lang, task_id))
+            await update.effective_chat.send_message(T(lang,"done_ok" if task_id else "report_saved", task_id=task_id),
+                                                     reply_markup=employee_home_kb(lang))
+        else:
+            await update.effective_chat.send_message(T(lang,"done_fail", task_id=task_id), reply_markup=employee_home_kb(lang))
+    except Exception as ex:
+        logger.exception("Task done failed: %s", ex)
+        await update.effective_chat.send_message("Xatolik sodir bo‘ldi.", reply_markup=employee_home_kb(lang))
 
-    # task done report
-    if context.user_data.get("awaiting_task_done_report"):
-        task_id = context.user_data.pop("awaiting_task_done_report")
-        report = text
+async def flow_user_reject(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, reason: str, uid: int):
+    try:
+        await db.reject_pending_user(uid, reason)
+        # notify user
         try:
-            ok = db.mark_task_done_with_report(task_id, tg.id, report)
-            if ok:
-                for m in db.list_managers():
-                    try:
-                        await context.bot.send_message(m["telegram_id"], T(lang,"task_done_notify_manager", username=u.get('username') or '-', task_id=task_id))
-                    except Exception:
-                        pass
-                await update.effective_chat.send_message(T(lang,"done_ok", task_id=task_id), reply_markup=employee_home_kb(lang))
-            else:
-                await update.effective_chat.send_message(T(lang,"done_fail", task_id=task_id), reply_markup=employee_home_kb(lang))
-        except Exception as ex:
-            logger.exception("Task done failed: %s", ex)
-            await update.effective_chat.send_message("Xatolik sodir bo‘ldi.", reply_markup=employee_home_kb(lang))
-        return
+            u_lang = (await db.get_user(uid) or {}).get("language","uz")
+            await context.bot.send_message(uid, T(u_lang, "rejected_user", reason=reason))
+        except Exception:
+            pass
+        await update.effective_chat.send_message("❌ Rejected.", reply_markup=manager_home_kb(p.lang))
+    except Exception as e:
+        logger.exception("Reject user failed: %s", e)
+        await update.effective_chat.send_message("Xatolik.", reply_markup=manager_home_kb(p.lang))
+
+async def flow_task_wizard(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, text: str, _):
+    tg, lang = update.effective_user, p.lang
+    now = datetime.now(TZ).strftime("%Y-%m-%d %H:%M")
+    known = [u.get("username") for u in await db.list_employees() if u.get("username")]
+    parsed = await ai_parse_task(text, now, known)
+    if not parsed.get("deadline"):
+        parsed["deadline"] = parse_deadline_hhmm_dmy(text, datetime.now(TZ)) or ""
+    assigned_to = parsed.get("assignee") or await parse_assignee(text.split()[0] if text.split() else "") or ""
+    task_id = await db.create_task(
+        title=parsed.get("title") or "(no title)",
+        description=parsed.get("title") or "(no title)",
+        created_by=tg.id,
+        assigned_to_username=assigned_to.lstrip("@") if assigned_to else "",
+        deadline=parsed.get("deadline"),
+        priority=parsed.get("priority") or "Medium",
+    )
+    # notify employee
+    emp = await db.get_user_by_username(assigned_to.lstrip("@")) if assigned_to else None
+    if emp:
+        await notify_assigned(context.bot, emp, task_id, parsed.get("title"), parsed.get("deadline"), parsed.get("priority"))
 
-    # user reject reason (admin flow)
-    if context.user_data.get("awaiting_user_reject_reason_for"):
-        uid = context.user_data.pop("awaiting_user_reject_reason_for")
-        reason = text
-        try:
-            db.reject_pending_user(uid, reason)
-            # notify user
-            try:
-                u_lang = (db.get_user(uid) or {}).get("language","uz")
-                await context.bot.send_message(uid, LM(u_lang, "rejected_user", TXT_REJECTED_USER, reason=reason))
-            except Exception:
-                pass
-            await update.effective_chat.send_message("❌ Rejected.", reply_markup=manager_home_kb(lang))
-        except Exception as e:
-            logger.exception("Reject user failed: %s", e)
-            await update.effective_chat.send_message("Xatolik.", reply_markup=manager_home_kb(lang))
-        return
+    await update.effective_chat.send_message(T(lang,"task_created", task_id=task_id),
+                                             reply_markup=manager_home_kb(lang))
+    if not emp:
+        await ask_assignee(context.bot, update.effective_chat.id, lang, task_id, text.split()[0] if text.split() else "")
+    await schedule_task_deadline(context.application, task_id)
 
-    # task wizard (natural)
-    if context.user_data.pop("tw_wait_nl", False):
-        now = datetime.now(TZ).strftime("%Y-%m-%d %H:%M")
-        known = [u.get("username") for u in db.list_employees() if u.get("username")]
-        parsed = await ai_parse_task(text, now, known)
-        if not parsed.get("deadline"):
-            parsed["deadline"] = parse_deadline_hhmm_dmy(text, datetime.now(TZ)) or ""
-        assigned_to = parsed.get("assignee") or parse_assignee(text.split()[0] if text.split() else "") or ""
-        task_id = db.create_task(
-            title=parsed.get("title") or "(no title)",
-            description=parsed.get("title") or "(no title)",
-            created_by=tg.id,
-            assigned_to_username=assigned_to.lstrip("@") if assigned_to else "",
-            deadline=parsed.get("deadline"),
-            priority=parsed.get("priority") or "Medium",
-        )
-        # notify employee
-        emp = db.get_user_by_username(assigned_to.lstrip("@")) if assigned_to else None
-        if emp:
-            btns = kb_inline([
-                [("✅ Qabul qilish", f"task:acc:{task_id}"), ("❌ Rad qilish", f"task:rej:{task_id}")],
-                [("☑️ Bajardim", f"task:done:{task_id}")]
-            ])
-            try:
-                await context.bot.send_message(emp["telegram_id"],
-                    T(emp.get("language","uz"), "task_assigned", title=parsed.get("title"), deadline=parsed.get("deadline") or "-", priority=parsed.get("priority")),
-                    reply_markup=btns)
-            except Exception as e:
-                logger.warning("Notify employee failed: %s", e)
-
-        await update.effective_chat.send_message(T(lang,"task_created", task_id=task_id),
-                                                 reply_markup=manager_home_kb(lang))
-        await schedule_task_deadline(context.application, task_id)
-        return
+# Suhbat holati → flow(update, context, p, text, payload); holat states.ConversationStore'da (restart'dan keyin ham)
+STATE_FLOWS = {
+    State.EMP_ADD: flow_emp_add,
+    State.EMP_REMOVE: flow_emp_remove,
+    State.TASK_REJECT: flow_task_reject,
+    State.TASK_DONE: flow_task_done,
+    State.USER_REJECT: flow_user_reject,
+    State.TASK_WIZARD: flow_task_wizard,
+}
 
 # ---------- Slash commands ----------
 async def cmd_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -468,40 +508,20 @@ async def cmd_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return await update.effective_chat.send_message(T(lang,"only_manager"))
     parts = update.message.text.split(maxsplit=1)
     if len(parts) == 1:
-        context.user_data["tw_wait_nl"] = True
+        conversations.set(tg.id, State.TASK_WIZARD)
         return await update.effective_chat.send_message(T(lang,"assign_task_prompt"))
-    payload = parts[1].strip()
-    # parse: /task @user "title" 10:00 24.09.2025 [High]
-    assigned = ""
-    title = ""
-    priority = "Medium"
-
-    if payload.startswith("@"):
-        toks = payload.split(maxsplit=1)
-        assigned = toks[0]; payload = toks[1] if len(toks) > 1 else ""
-
-    if '"' in payload:
-        try:
-            i = payload.index('"'); j = payload.index('"', i+1)
-            title = payload[i+1:j].strip()
-            payload = (payload[:i] + payload[j+1:]).strip()
-        except ValueError:
-            title = payload; payload = ""
-    else:
-        title = payload; payload = ""
-
-    if "[" in payload and "]" in payload:
-        pr = payload[payload.index("[")+1:payload.index("]")].strip().title()
-        if pr in {"Low","Medium","High","Urgent"}: priority = pr
-        payload = (payload[:payload.index("[")] + payload[payload.index("]")+1:]).strip()
-
-    deadline = parse_deadline_hhmm_dmy(payload, datetime.now(TZ)) or ""
+    # parse: /task @user "title" 10:00 24.09.2025 [High]  (ertaga/indin ham qabul qilinadi)
+    assigned, title, priority, payload = split_task_command(parts[1])
+    deadline = parse_deadline(payload, datetime.now(TZ))
 
     if not assigned:
         maybe = parts[1].split()[0] if parts[1].split() else ""
-        assigned = parse_assignee(maybe) or ""
+        assigned = await parse_assignee(maybe) or ""
+    handles = list(dict.fromkeys(h.lower() for h in assigned.split()))
+    if len(handles) > 1:
+        return await create_tasks_for_many(update, context, lang, handles, title, deadline, priority)
 
-    task_id = db.create_task(
+    task_id = await db.create_task(
         title=(title or "(no title)"),
         description=(title or "(no title)"),
         created_by=tg.id,
@@ -509,29 +529,48 @@ async def cmd_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
         deadline=deadline,
         priority=priority,
     )
-    emp = db.get_user_by_username(assigned.lstrip("@")) if assigned else None
+    emp = await db.get_user_by_username(assigned.lstrip("@")) if assigned else None
     if emp:
-        btns = kb_inline([
-            [("✅ Qabul qilish", f"task:acc:{task_id}"), ("❌ Rad qilish", f"task:rej:{task_id}")],
-            [("☑️ Bajardim", f"task:done:{task_id}")]
-        ])
-        try:
-            await context.bot.send_message(emp["telegram_id"],
-                T(emp.get("language","uz"), "task_assigned", title=title, deadline=deadline or "-", priority=priority),
-                reply_markup=btns)
-        except Exception as e:
-            logger.warning("Notify employee failed: %s", e)
+        await notify_assigned(context.bot, emp, task_id, title, deadline, priority)
 
     await update.effective_chat.send_message(T(lang,"task_created", task_id=task_id), reply_markup=manager_home_kb(lang))
+    if not emp:
+        await ask_assignee(context.bot, update.effective_chat.id, lang, task_id, parts[1].split()[0])
     await schedule_task_deadline(context.application, task_id)
 
-async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def create_tasks_for_many(update: Update, context: ContextTypes.DEFAULT_TYPE, lang: str,
+                                handles: List[str], title: str, deadline: str, priority: str):
+    """/task @a @b @c "..." — bitta tranzaksiyada N ta vazifa, xabarlar broadcaster orqali."""
+    rows = await db.create_tasks_bulk(update.effective_user.id, [
+        {"title": title or "(no title)", "description": title or "(no title)", "assignee": h,
+         "deadline": deadline, "priority": priority} for h in handles])
+    msgs = []
+    for r in rows:
+        emp = r["assignee"]
+        if emp:
+            btns = kb_inline([
+                [("✅ Qabul qilish", f"task:acc:{r['id']}"), ("❌ Rad qilish", f"task:rej:{r['id']}")],
+                [("☑️ Bajardim", f"task:done:{r['id']}")]
+            ])
+            msgs.append((emp["telegram_id"], T(emp.get("language","uz"), "task_assigned", title=title,
+                                                deadline=deadline or "-", priority=priority), {"reply_markup": btns}))
+    in_background(update, context, broadcaster.send(context.bot, msgs, "task_assigned"))
+    text = T(lang, "tasks_created_bulk", count=len(rows), ids=", ".join(str(r["id"]) for r in rows))
+    missing = [h for h, r in zip(handles, rows) if not r["assignee"]]
+    if missing:
+        text += "\n" + T(lang, "assignees_not_found", names=", ".join(missing))
+    await update.effective_chat.send_message(text, reply_markup=manager_home_kb(lang))
+    await schedule_task_deadline(context.application, *(r["id"] for r in rows))
+
+async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                     after: Optional[tuple] = None, before: Optional[tuple] = None):
     tg = update.effective_user
     u = await ensure_user(update, context)
     lang = u.get("language", Config.DEFAULT_LANG)
     if not is_manager(tg):
         return await update.effective_chat.send_message(T(lang,"only_manager"))
-    items = db.get_status_overview()
+    cap = Config.STATUS_TASKS_PER_EMPLOYEE
+    items, prev, nxt = await db.get_status_page(after, before, Config.STATUS_PAGE_SIZE, cap + 1)
     lines = [T(lang,"manager_status_header")]
     for row in items:
         emp = row["employee"]; tasks = row["tasks"]
@@ -539,12 +578,12 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         lines.append(f"👤 @{uname} — {fname}")
         if not tasks: lines.append("  • —")
         else:
-            for t in tasks: lines.append("  • " + fmt_task(t))
-    await update.effective_chat.send_message("\n".join(lines), parse_mode=ParseMode.MARKDOWN,
-                                             reply_markup=manager_home_kb(lang))
+            for t in tasks[:cap]: lines.append("  • " + fmt_task(t))
+            if len(tasks) > cap: lines.append("  • …")
+    await send_chunked(update, lines, page_nav_kb(lang, "st", prev, nxt) or manager_home_kb(lang))
 
 async def build_daily_report_text() -> str:
-    rows = db.build_daily_summary()
+    rows = await db.build_daily_summary()
     if not rows: return "*Bugun faoliyat bo‘yicha ma’lumot yo‘q.*"
     out = ["*Kunlik hisobot:*"]
     for r in rows:
@@ -561,17 +600,74 @@ async def cmd_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.effective_chat.send_message(text, parse_mode=ParseMode.MARKDOWN,
                                              reply_markup=manager_home_kb(lang))
 
-async def cmd_mytasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def cmd_mytasks(update: Update, context: ContextTypes.DEFAULT_TYPE, history: Optional[bool] = None,
+                      after: Optional[tuple] = None, before: Optional[tuple] = None):
     tg = update.effective_user
     u = await ensure_user(update, context)
     lang = u.get("language", Config.DEFAULT_LANG)
-    tasks = db.list_tasks_for_user(tg.id)
+    # /mytasks all — arxivdagi tarix bilan (tugma/callback'da context.args yo'q)
+    if history is None:
+        history = bool(context.args) and context.args[0].lower() in ("all", "history", "arxiv", "архив")
+    tasks, prev, nxt = await db.list_tasks_page(tg.id, after, before, Config.MYTASKS_PAGE_SIZE,
+                                                include_archived=history)
     if not tasks:
         return await update.effective_chat.send_message(T(lang,"no_tasks"), reply_markup=employee_home_kb(lang))
     lines = [T(lang,"your_tasks_header")]
     lines.extend([fmt_task(t) for t in tasks])
-    await update.effective_chat.send_message("\n".join(lines), parse_mode=ParseMode.MARKDOWN,
-                                             reply_markup=employee_home_kb(lang))
+    await send_chunked(update, lines, page_nav_kb(lang, "mt:" + ("h" if history else "a"), prev, nxt)
+                       or employee_home_kb(lang))
+
+SEARCH_DAYS_RE = re.compile(r"^(\d{1,4})[dд]$", re.I)
+
+async def cmd_search(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                     after: Optional[tuple] = None, before: Optional[tuple] = None):
+    """/search [7d] so'zlar — vazifalar (arxiv bilan) va hisobotlar bo'yicha FTS5 qidiruv (manager only)."""
+    tg = update.effective_user
+    u = await ensure_user(update, context)
+    lang = u.get("language", Config.DEFAULT_LANG)
+    if not is_manager(tg):
+        return await update.effective_chat.send_message(T(lang,"only_manager"))
+    cursor = after or before
+    if cursor is None:
+        args = list(context.args or [])
+        since = None
+        if args and (m := SEARCH_DAYS_RE.match(args[0])):
+            args.pop(0)
+            since = (datetime.now(timezone.utc) - timedelta(days=int(m.group(1)))).strftime("%Y-%m-%d %H:%M:%S")
+        query = " ".join(args).strip()
+        if not query:
+            return await update.effective_chat.send_message(T(lang,"search_usage"))
+        context.user_data["search"] = {"query": query, "since": since}
+    else:
+        # sahifa tugmasi: so'rov user_data'da (callback_data'ga sig'maydi)
+        saved = context.user_data.get("search")
+        if not saved:
+            return await update.effective_chat.send_message(T(lang,"search_usage"))
+        query, since = saved["query"], saved["since"]
+    rows, prev, nxt = await db.search_tasks(query, Config.SEARCH_PAGE_SIZE, cursor, since, Config.SEARCH_WINDOW)
+    reports = await db.search_reports(query, 5, since, Config.SEARCH_WINDOW) if cursor is None else []
+    if not rows and not reports:
+        return await update.effective_chat.send_message(T(lang,"search_empty", query=query),
+                                                        reply_markup=manager_home_kb(lang))
+    lines = [T(lang,"search_header", query=query)] if rows else []
+    for t in rows:
+        arch = f" ({T(lang,'search_archived')})" if t["archived"] else ""
+        lines.append(fmt_task(t) + arch)
+        if t.get("snippet") and t["snippet"] != t.get("title"):
+            lines.append("    " + t["snippet"])
+    if reports:
+        lines.append(T(lang,"search_reports_header"))
+        lines.extend(f"• @{r['username'] or '-'} {r['date']}: {r['snippet']}" for r in reports)
+    await send_chunked(update, lines, page_nav_kb(lang, "sr", prev, nxt) or manager_home_kb(lang))
+
+async def cmd_reload(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/reload — MANAGER_IDS/MANAGER_USERNAMES va DB'dagi managerlarni qayta o'qish (SIGHUP bilan bir xil)."""
+    p = await resolve_principal(update, context)
+    if not p.is_manager:
+        return await update.effective_chat.send_message(T(p.lang,"only_manager"))
+    ids, unames, from_db = await reload_roles()
+    await update.effective_chat.send_message(T(p.lang,"roles_reloaded", ids=ids, usernames=unames, db=from_db),
+                                             reply_markup=manager_home_kb(p.lang))
 
 async def cmd_done(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg = update.effective_user
@@ -581,20 +677,16 @@ async def cmd_done(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if len(args) < 2 or not args[1].isdigit():
         return await update.effective_chat.send_message(T(lang,"done_usage"))
     task_id = int(args[1])
-    ok = db.set_task_status(task_id, "done", by=tg.id)
+    ok = await db.set_task_status(task_id, "done", by=tg.id)
     if ok:
-        for m in db.list_managers():
-            try:
-                await context.bot.send_message(m["telegram_id"], T(lang,"task_done_notify_manager", username=u.get('username') or '-', task_id=task_id))
-            except Exception:
-                pass
+        in_background(update, context, notify_managers_task_done(context.bot, u, lang, task_id))
         await update.effective_chat.send_message(T(lang,"done_ok", task_id=task_id), reply_markup=employee_home_kb(lang))
     else:
         await update.effective_chat.send_message(T(lang,"done_fail", task_id=task_id), reply_markup=employee_home_kb(lang))
 
 async def cb_employee_report(update: Update, context: ContextTypes.DEFAULT_TYPE, lang: str):
     await update.effective_chat.send_message("Bugungi hisobotni yozib yuboring.\n(IDsiz yuborsangiz umumiy kundalik sifatida saqlanadi)")
-    context.user_data["awaiting_task_done_report"] = 0
+    conversations.set(update.effective_user.id, State.TASK_DONE, 0)
 
 # ---------- Voice → AI (manager only) ----------
 async def on_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -605,70 +697,99 @@ async def on_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     voice = update.message.voice
     if not voice: return
-    file = await context.bot.get_file(voice.file_id)
-    path = await file.download_to_drive(custom_path=f"/tmp/{voice.file_unique_id}.oga")
-
-    title = "Voice task"; assigned = ""; deadline = ""; priority = "Medium"
+    job = VoiceJob(update.effective_chat.id, tg.id, voice.file_id, lang)
+    if not voice_pipeline.submit(job):
+        return await update.effective_chat.send_message(T(lang, "voice_busy"))
+    await update.effective_chat.send_message(T(lang, "voice_processing"))
+
+async def process_voice_job(app: Application, job: VoiceJob):
+    """Worker ichida: yuklab olish (xotiraga) → Whisper → parse → DB → xabarlar."""
+    lang = job.lang
+    with job.stage("download"):
+        file = await app.bot.get_file(job.file_id)
+        data = bytes(await file.download_as_bytearray())
+
+    title = "Voice task"; assigned = ""; deadline = ""; priority = "Medium"; txt = ""
     if Config.OPENAI_API_KEY:
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=Config.OPENAI_API_KEY)
-            with open(path, "rb") as f:
-                tr = client.audio.transcriptions.create(model="whisper-1", file=f)
+            with job.stage("transcribe"):
+                tr = await ai.transcription(("voice.oga", data))
             txt = tr.text.strip()
-            now = datetime.now(TZ).strftime("%Y-%m-%d %H:%M")
-            known = [u.get("username") for u in db.list_employees() if u.get("username")]
-            parsed = await ai_parse_task(txt, now, known)
-            title = parsed.get("title") or "Voice task"
-            deadline = parsed.get("deadline") or (parse_deadline_hhmm_dmy(txt, datetime.now(TZ)) or "")
-            priority = parsed.get("priority") or "Medium"
-            assigned = parsed.get("assignee") or parse_assignee(txt.split()[0] if txt.split() else "") or ""
+            with job.stage("parse"):
+                now = datetime.now(TZ).strftime("%Y-%m-%d %H:%M")
+                known = [u.get("username") for u in await db.list_employees() if u.get("username")]
+                parsed = await ai_parse_task(txt, now, known)
+                title = parsed.get("title") or "Voice task"
+                deadline = parsed.get("deadline") or (parse_deadline_hhmm_dmy(txt, datetime.now(TZ)) or "")
+                priority = parsed.get("priority") or "Medium"
+                assigned = parsed.get("assignee") or await parse_assignee(txt.split()[0] if txt.split() else "") or ""
         except Exception as e:
             logger.warning("Whisper parse failed: %s", e)
 
-    task_id = db.create_task(
-        title=title, description=title, created_by=tg.id,
-        assigned_to_username=assigned.lstrip("@") if assigned else "",
-        deadline=deadline, priority=priority
-    )
+    with job.stage("insert"):
+        task_id = await db.create_task(
+            title=title, description=title, created_by=job.user_id,
+            assigned_to_username=assigned.lstrip("@") if assigned else "",
+            deadline=deadline, priority=priority
+        )
+        emp = await db.get_user_by_username(assigned.lstrip("@")) if assigned else None
 
-    emp = db.get_user_by_username(assigned.lstrip("@")) if assigned else None
     if emp:
-        btns = kb_inline([
-            [("✅ Qabul qilish", f"task:acc:{task_id}"), ("❌ Rad qilish", f"task:rej:{task_id}")],
-            [("☑️ Bajardim", f"task:done:{task_id}")]
-        ])
-        try:
-            await context.bot.send_message(emp["telegram_id"],
-                T(emp.get("language","uz"), "task_assigned", title=title, deadline=deadline or "-", priority=priority),
-                reply_markup=btns)
-        except Exception as e:
-            logger.warning("Notify employee failed: %s", e)
+        await notify_assigned(app.bot, emp, task_id, title, deadline, priority)
 
-    await update.effective_chat.send_message(T(lang,"task_created", task_id=task_id), reply_markup=manager_home_kb(lang))
-    await schedule_task_deadline(context.application, task_id)
+    await app.bot.send_message(job.chat_id, T(lang,"task_created", task_id=task_id), reply_markup=manager_home_kb(lang))
+    if not emp:
+        await ask_assignee(app.bot, job.chat_id, lang, task_id, txt.split()[0] if txt.split() else "")
+    await schedule_task_deadline(app, task_id)
+
+async def voice_job_failed(app: Application, job: VoiceJob, exc: BaseException):
+    await app.bot.send_message(job.chat_id, T(job.lang, "voice_failed"))
+
+voice_pipeline = VoicePipeline(process_voice_job, workers=Config.VOICE_WORKERS, maxsize=Config.VOICE_QUEUE_SIZE,
+                               timeout=Config.VOICE_JOB_TIMEOUT, on_error=voice_job_failed)
+
+# ---------- Broadcast ----------
+async def _on_chat_blocked(chat_id: int, reason: str):
+    await db.mark_chat_blocked(chat_id, reason)
+
+broadcaster = Broadcaster(rate=Config.BROADCAST_RATE, per_chat_interval=Config.BROADCAST_PER_CHAT_INTERVAL,
+                          concurrency=Config.BROADCAST_CONCURRENCY, on_blocked=_on_chat_blocked)
+
+def in_background(update: Update, context: ContextTypes.DEFAULT_TYPE, coro) -> None:
+    """Handler ichidan broadcast: rate-limit kutishi foydalanuvchi lock'ini va update slotini (updates.py)
+    band qilmaydi. Xato error handler'ga boradi, Application.stop() tugashini kutadi."""
+    context.application.create_task(coro, update=update)
+
+async def notify_managers_task_done(bot, u: dict, lang: str, task_id: int):
+    text = T(lang, "task_done_notify_manager", username=u.get('username') or '-', task_id=task_id)
+    msgs = [(m["telegram_id"], text, {}) for m in await db.list_managers()]
+    await broadcaster.send(bot, msgs, "task_done")
 
 # ---------- Schedulers ----------
 async def send_daily_reminder(app: Application, when: str):
-    for e in db.list_employees():
+    msgs = []
+    for e in await db.list_employees():
         lang = e.get("language", "uz")
         text = T(lang, "reminder_morning" if when=="morning" else "reminder_evening")
-        try:
-            await app.bot.send_message(e["telegram_id"], text, reply_markup=employee_home_kb(lang))
-        except Exception as ex:
-            logger.warning("Reminder failed to %s: %s", e.get("username"), ex)
-
-async def send_deadline_ping(app: Application, task_id: int):
-    t = db.get_task(task_id)
-    if not t: return
-    emp = db.get_user(t["assigned_to"])
-    if not emp: return
-    lang = emp.get("language","uz")
-    msg = T(lang,"deadline_ping", task=fmt_task(t))
-    try:
-        await app.bot.send_message(emp["telegram_id"], msg, parse_mode=ParseMode.MARKDOWN)
-    except Exception as e:
-        logger.warning("Deadline ping failed: %s", e)
+        msgs.append((e["telegram_id"], text, {"reply_markup": employee_home_kb(lang)}))
+    await broadcaster.send(app.bot, msgs, f"{when}_reminder")
+
+async def fire_deadline_pings(app: Application, rows: List[dict]):
+    """DeadlineScheduler paketi: ochiq vazifalarga bitta broadcast, so'ng hammasi bitta tranzaksiyada sent."""
+    msgs = []
+    for r in rows:
+        if r["ping_status"] in ("new", "accepted") and r.get("chat_id"):
+            text = T(r.get("lang") or "uz", "deadline_ping" if r["kind"] == "pre" else "deadline_due", task=fmt_task(r))
+            msgs.append((r["chat_id"], text, {"parse_mode": ParseMode.MARKDOWN}))
+    if msgs:
+        await broadcaster.send(app.bot, msgs, "deadline")
+    await db.mark_deadline_pings_sent([(r["task_id"], r["kind"]) for r in rows])
+
+conversations = ConversationStore(db.load_conversation_states, db.save_conversation_states,
+                                  ttl=Config.STATE_TTL_MINUTES * 60, interval=Config.STATE_FLUSH_INTERVAL)
+
+deadline_scheduler = DeadlineScheduler(
+    db.list_pending_deadline_pings, db.list_due_deadline_pings, fire_deadline_pings, TZ, grace=Config.DEADLINE_GRACE_HOURS * 3600, batch_size=Config.DEADLINE_BATCH_SIZE)
 
 async def schedule_user_jobs(app: Application):
     if not app.job_queue: return
@@ -687,202 +808,273 @@ async def schedule_daily_manager_report(app: Application):
                             time=REPORT_TIME, name="daily_manager_report")
     logger.info("Daily manager report scheduled at %s", REPORT_TIME)
 
-async def schedule_task_deadline(app: Application, task_id: int):
-    if not app.job_queue: return
-    t = db.get_task(task_id)
-    if not t or not t.get("deadline"): return
-    try:
-        dt = datetime.fromisoformat(t["deadline"])
-    except Exception:
-        return
-    for j in app.job_queue.get_jobs_by_name(f"deadline_{task_id}"): j.schedule_removal()
-    app.job_queue.run_once(lambda ctx: asyncio.create_task(send_deadline_ping(ctx.application, task_id)),
-                           when=dt, name=f"deadline_{task_id}")
+async def schedule_task_deadline(app: Application, *task_ids: int):
+    """DB'ga 'pre' (−DEADLINE_PRE_MINUTES) va 'due' eslatmalarini yozib, rejalashtiruvchini uyg'otadi."""
+    now = normalize_dt(datetime.now(TZ))
+    if len(task_ids) == 1:
+        rows = await db.schedule_deadline_pings(task_ids[0], now, Config.DEADLINE_PRE_MINUTES)
+    else:
+        rows = await db.schedule_deadline_pings_bulk(list(task_ids), now, Config.DEADLINE_PRE_MINUTES)
+    deadline_scheduler.notify(r["fire_at"] for r in rows)
+
+async def archive_old_tasks(app: Application):
+    """Batch'lar orasida writer navbati bo'shaydi — bot ishlashda davom etadi."""
+    total = 0
+    while True:
+        moved = await db.archive_tasks(Config.ARCHIVE_AFTER_DAYS, Config.ARCHIVE_BATCH_SIZE)
+        total += moved
+        if moved < Config.ARCHIVE_BATCH_SIZE:
+            break
+        await asyncio.sleep(0.05)
+    logger.info("Archived %d tasks older than %d days", total, Config.ARCHIVE_AFTER_DAYS)
+
+async def schedule_archive_job(app: Application):
+    if not app.job_queue or Config.ARCHIVE_AFTER_DAYS <= 0: return
+    for j in app.job_queue.get_jobs_by_name("archive_tasks"): j.schedule_removal()
+    app.job_queue.run_daily(lambda ctx: asyncio.create_task(archive_old_tasks(ctx.application)),
+                            time=ARCHIVE_TIME, name="archive_tasks")
+    logger.info("Task archive job scheduled at %s", ARCHIVE_TIME)
 
 async def daily_manager_report(app: Application):
-    managers = db.list_managers()
+    managers = await db.list_managers()
     text = await build_daily_report_text()
-    for m in managers:
-        try:
-            await app.bot.send_message(m["telegram_id"], text, parse_mode=ParseMode.MARKDOWN)
-        except Exception as e:
-            logger.warning("Manager report failed: %s", e)
+    msgs = [(m["telegram_id"], text, {"parse_mode": ParseMode.MARKDOWN}) for m in managers]
+    await broadcaster.send(app.bot, msgs, "daily_manager_report")
 
 # ---------- Callbacks ----------
+callbacks = CallbackRouter()
+callbacks.converter("status_cursor", decode_status_cursor)
+callbacks.converter("task_cursor", decode_task_cursor, greedy=True)
+callbacks.converter("int_cursor", decode_int_cursor)
+
 async def on_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    tg = update.effective_user
-    u = db.get_user(tg.id) or {}
-    lang = u.get("language", Config.DEFAULT_LANG)
-    data = update.callback_query.data
-
-    # Language
-    if data == "u:language":
-        return await cmd_language(update, context)
-    if data.startswith("lang:"):
-        return await on_cb_language(update, context, data.split(":",1)[1])
-
-    # Employees menu
-    if data == "m:employees": return await cb_employees_menu(update, context, lang)
-    if data == "emp:list":    return await cb_emp_list(update, context, lang)
-    if data == "emp:add":     return await ask_emp_add(update, context, lang)
-    if data == "emp:remove":  return await ask_emp_remove(update, context, lang)
-
-    # Invites / Requests (pending users)
-    if data == "m:invites":
-        reqs = db.list_invite_requests()
-        rows = []
-        if not reqs:
-            rows = [[("—", "noop")]]
-        else:
-            for r in reqs:
-                rid = r["id"]
-                title = f"@{r.get('username') or '-'} | {r.get('full_name') or '-'}"
-                rows.append([(title, "noop")])
-                rows.append([
-                    (LM(lang,"btn_approve", BTN_APPROVE), f"inv:approve_user:{rid}"),
-                    (LM(lang,"btn_reject", BTN_REJECT),   f"inv:reject_user:{rid}")
-                ])
-        rows.append([(LM(lang,"btn_back", LBL["back"]), "back:home")])
-        return await update.effective_chat.send_message(T(lang,"invites_title"), reply_markup=kb_inline(rows))
+    p = await resolve_principal(update, context)
+    data = update.callback_query.data or ""
+    hit = callbacks.resolve(data)
+    if hit is None:
+        return logger.debug("Unrouted callback: %r", data)   # "noop", eski tugmalar
+    fn, args = hit
+    await fn(update, context, p, *args)
+
+# Language
+callbacks.add("u:language", lambda u, c, p: cmd_language(u, c))
+callbacks.add("lang:<str>", lambda u, c, p, code: on_cb_language(u, c, code))
+
+# Sahifalash (keyset kursor callback_data ichida)
+callbacks.add("st:<str>:<status_cursor>", lambda u, c, p, d, cur: cmd_status(u, c, **page_kw(d, cur)))
+callbacks.add("mt:<str>:<str>:<task_cursor>",
+              lambda u, c, p, mode, d, cur: cmd_mytasks(u, c, history=mode == "h", **page_kw(d, cur)))
+callbacks.add("sr:<str>:<int_cursor>", lambda u, c, p, d, cur: cmd_search(u, c, **page_kw(d, cur)))
+
+# Employees menu
+callbacks.add("m:employees", lambda u, c, p: cb_employees_menu(u, c, p.lang))
+callbacks.add("emp:list", lambda u, c, p: cb_emp_list(u, c, p.lang))
+callbacks.add("emp:add", lambda u, c, p: ask_emp_add(u, c, p.lang))
+callbacks.add("emp:remove", lambda u, c, p: ask_emp_remove(u, c, p.lang))
+
+# Invites / Requests (pending users)
+@callbacks.route("m:invites")
+async def cb_invites(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal):
+    lang = p.lang
+    reqs = await db.list_invite_requests()
+    rows = []
+    if not reqs:
+        rows = [[("—", "noop")]]
+    else:
+        for r in reqs:
+            rid = r["id"]
+            title = f"@{r.get('username') or '-'} | {r.get('full_name') or '-'}"
+            rows.append([(title, "noop")])
+            rows.append([
+                (T(lang, "btn_approve"), f"inv:approve_user:{rid}"),
+                (T(lang, "btn_reject"),   f"inv:reject_user:{rid}")
+            ])
+    rows.append([(T(lang, "btn_back"), "back:home")])
+    await update.effective_chat.send_message(T(lang,"invites_title"), reply_markup=kb_inline(rows))
 
-    if data.startswith("inv:approve_user:"):
-        rid = int(data.split(":")[-1])
+@callbacks.route("inv:approve_user:<int>")
+async def cb_inv_approve(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, rid: int):
+    lang = p.lang
+    try:
+        await db.approve_pending_user(rid, approved_by=p.user_id)
+        await update.effective_chat.send_message("✅ Approved.", reply_markup=manager_home_kb(lang))
+        # try notify the user
         try:
-            db.approve_pending_user(rid, approved_by=tg.id)
-            await update.effective_chat.send_message("✅ Approved.", reply_markup=manager_home_kb(lang))
-            # try notify the user
-            try:
-                with sqlite3.connect(db.path) as con:
-                    con.row_factory = lambda c, row: {desc[0]: row[i] for i, desc in enumerate(c.description)}
-                    cur = con.cursor()
-                    cur.execute("SELECT user_id FROM invite_requests WHERE id=?", (rid,))
-                    r = cur.fetchone()
-                if r and r.get("user_id"):
-                    u_lang = (db.get_user(r["user_id"]) or {}).get("language","uz")
-                    await context.bot.send_message(r["user_id"], LM(u_lang, "approved_user", TXT_APPROVED_USER))
-            except Exception as ne:
-                logger.warning("Notify approved user failed: %s", ne)
-        except Exception as ex:
-            logger.exception("approve inv req: %s", ex)
-            await update.effective_chat.send_message("Xatolik.", reply_markup=manager_home_kb(lang))
-        return
-
-    if data.startswith("inv:reject_user:"):
-        rid = int(data.split(":")[-1])
-        # get user_id to store in context
-        uid = None
+            r = await db.get_invite_request(rid)
+            if r and r.get("user_id"):
+                u_lang = (await db.get_user(r["user_id"]) or {}).get("language","uz")
+                await context.bot.send_message(r["user_id"], T(u_lang, "approved_user"))
+        except Exception as ne:
+            logger.warning("Notify approved user failed: %s", ne)
+    except Exception as ex:
+        logger.exception("approve inv req: %s", ex)
+        await update.effective_chat.send_message("Xatolik.", reply_markup=manager_home_kb(lang))
+
+@callbacks.route("inv:reject_user:<int>")
+async def cb_inv_reject(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, rid: int):
+    # get user_id to store in context
+    uid = None
+    try:
+        r = await db.get_invite_request(rid)
+        uid = r.get("user_id") if r else None
+    except Exception:
+        pass
+    conversations.set(p.user_id, State.USER_REJECT, uid or rid)
+    await update.effective_chat.send_message("Rad etish sababini yuboring:")
+
+# Employee quick entries
+callbacks.add("e:mytasks", lambda u, c, p: cmd_mytasks(u, c))
+callbacks.add("e:report", lambda u, c, p: cb_employee_report(u, c, p.lang))
+
+# Manager quick entries
+callbacks.add("m:assign", lambda u, c, p: task_wizard_start(u, c))
+callbacks.add("m:status", lambda u, c, p: cmd_status(u, c))
+callbacks.add("m:reports", lambda u, c, p: cmd_report(u, c))
+
+# Task lifecycle
+@callbacks.route("task:acc:<int>")
+async def cb_task_accept(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, task_id: int):
+    try:
+        await db.set_task_status(task_id, "accepted", by=p.user_id)
+        await update.effective_chat.send_message("✅ Vazifa qabul qilindi.", reply_markup=employee_home_kb(p.lang))
+    except Exception as ex:
+        logger.exception("Task accept failed: %s", ex)
+        await update.effective_chat.send_message("Qabul qilishda xatolik.", reply_markup=employee_home_kb(p.lang))
+
+@callbacks.route("task:asg:<int>:<int>")
+async def cb_task_assign(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, task_id: int, uid: int):
+    """ask_assignee nomzodlaridan biri tanlandi — faqat ijrochisiz vazifaga, faqat menejer."""
+    if not p.is_manager: return
+    emp = await db.get_user(uid)
+    if not emp or not await db.assign_task(task_id, uid):
+        return await update.effective_chat.send_message(T(p.lang, "assignee_taken", task_id=task_id))
+    t = await db.get_task(task_id) or {}
+    name = f"@{emp['username']}" if emp.get("username") else (emp.get("full_name") or str(uid))
+    await update.effective_chat.send_message(T(p.lang, "assignee_set", task_id=task_id, name=name),
+                                             reply_markup=manager_home_kb(p.lang))
+    await notify_assigned(context.bot, emp, task_id, t.get("title"), t.get("deadline"), t.get("priority"))
+
+@callbacks.route("task:rej:<int>")
+async def cb_task_reject(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, task_id: int):
+    conversations.set(p.user_id, State.TASK_REJECT, task_id)
+    await update.effective_chat.send_message("Rad etish sababini yuboring:")
+
+@callbacks.route("task:done:<int>")
+async def cb_task_done(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, task_id: int):
+    conversations.set(p.user_id, State.TASK_DONE, task_id)
+    await update.effective_chat.send_message("Qisqacha hisobot yuboring (nima bajarildi):")
+
+# Inline approval from instant manager notification
+@callbacks.route("user:approve:<int>")
+async def cb_user_approve(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, uid: int):
+    try:
+        await db.approve_pending_user(uid, approved_by=p.user_id)
         try:
-            with sqlite3.connect(db.path) as con:
-                con.row_factory = lambda c, row: {desc[0]: row[i] for i, desc in enumerate(c.description)}
-                cur = con.cursor()
-                cur.execute("SELECT user_id FROM invite_requests WHERE id=?", (rid,))
-                r = cur.fetchone()
-                uid = r.get("user_id") if r else None
+            u_lang = (await db.get_user(uid) or {}).get("language","uz")
+            await context.bot.send_message(uid, T(u_lang, "approved_user"))
         except Exception:
             pass
-        context.user_data["awaiting_user_reject_reason_for"] = uid or rid
-        await update.effective_chat.send_message("Rad etish sababini yuboring:")
-        return
-
-    # Employee quick entries
-    if data == "e:mytasks":
-        return await cmd_mytasks(update, context)
-    if data == "e:report":
-        return await cb_employee_report(update, context, lang)
-
-    # Manager quick entries
-    if data == "m:assign":
-        context.user_data["tw_wait_nl"] = True
-        return await update.effective_chat.send_message(T(lang,"assign_task_prompt"))
-    if data == "m:status":
-        return await cmd_status(update, context)
-    if data == "m:reports":
-        return await cmd_report(update, context)
-
-    # Task lifecycle
-    if data.startswith("task:acc:"):
-        task_id = int(data.split(":")[-1])
-        try:
-            db.set_task_status(task_id, "accepted", by=tg.id)
-            await update.effective_chat.send_message("✅ Vazifa qabul qilindi.", reply_markup=employee_home_kb(lang))
-        except Exception as ex:
-            logger.exception("Task accept failed: %s", ex)
-            await update.effective_chat.send_message("Qabul qilishda xatolik.", reply_markup=employee_home_kb(lang))
-        return
-
-    if data.startswith("task:rej:"):
-        task_id = int(data.split(":")[-1])
-        context.user_data["awaiting_task_reject_reason"] = task_id
-        await update.effective_chat.send_message("Rad etish sababini yuboring:")
-        return
-
-    if data.startswith("task:done:"):
-        task_id = int(data.split(":")[-1])
-        context.user_data["awaiting_task_done_report"] = task_id
-        await update.effective_chat.send_message("Qisqacha hisobot yuboring (nima bajarildi):")
-        return
-
-    # Inline approval from instant manager notification
-    if data.startswith("user:approve:"):
-        uid = int(data.split(":")[-1])
-        try:
-            db.approve_pending_user(uid, approved_by=tg.id)
-            try:
-                u_lang = (db.get_user(uid) or {}).get("language","uz")
-                await context.bot.send_message(uid, LM(u_lang, "approved_user", TXT_APPROVED_USER))
-            except Exception:
-                pass
-            await update.effective_chat.send_message("✅ Approved.", reply_markup=manager_home_kb(lang))
-        except Exception as e:
-            logger.exception("user approve failed: %s", e)
-            await update.effective_chat.send_message("Xatolik.", reply_markup=manager_home_kb(lang))
-        return
-
-    if data.startswith("user:reject:"):
-        uid = int(data.split(":")[-1])
-        context.user_data["awaiting_user_reject_reason_for"] = uid
-        await update.effective_chat.send_message("Rad etish sababini yuboring:")
-        return
-
-    if data == "back:home":
-        role_is_manager = is_manager(tg)
-        text = T(lang, "welcome_manager" if role_is_manager else "welcome_employee")
-        kb = manager_home_kb(lang) if role_is_manager else (employee_home_kb(lang) if db.user_is_approved(tg.id) else employee_pending_kb(lang))
-        await update.effective_chat.send_message(text, reply_markup=kb)
+        await update.effective_chat.send_message("✅ Approved.", reply_markup=manager_home_kb(p.lang))
+    except Exception as e:
+        logger.exception("user approve failed: %s", e)
+        await update.effective_chat.send_message("Xatolik.", reply_markup=manager_home_kb(p.lang))
+
+@callbacks.route("user:reject:<int>")
+async def cb_user_reject(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal, uid: int):
+    conversations.set(p.user_id, State.USER_REJECT, uid)
+    await update.effective_chat.send_message("Rad etish sababini yuboring:")
+
+@callbacks.route("back:home")
+async def cb_back_home(update: Update, context: ContextTypes.DEFAULT_TYPE, p: Principal):
+    lang = p.lang
+    text = T(lang, "welcome_manager" if p.is_manager else "welcome_employee")
+    kb = manager_home_kb(lang) if p.is_manager else (employee_home_kb(lang) if p.approved else employee_pending_kb(lang))
+    await update.effective_chat.send_message(text, reply_markup=kb)
 
 # ---------- Post init ----------
 async def on_start(app: Application):
-    if app.job_queue:
+    await db.start()
+    await conversations.start()
+    await reload_roles()
+    if hasattr(signal, "SIGHUP"):
         try:
-            app.job_queue.set_timezone(TZ)
-        except Exception:
-            try:
-                app.job_queue.scheduler.configure(timezone=TZ)  # type: ignore
-            except Exception as e:
-                logger.warning("Timezone set failed: %s", e)
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGHUP, lambda: app.create_task(reload_roles(), name="reload_roles"))
+        except (NotImplementedError, RuntimeError) as e:
+            logger.warning("SIGHUP handler not installed: %s", e)
+    if OPENAI_API_KEY:
+        ai.get_client()
+    await voice_pipeline.start(app)
+    if update_recorder is not None:
+        await update_recorder.start()
     await schedule_user_jobs(app)
     await schedule_daily_manager_report(app)
+    await schedule_archive_job(app)
+    await deadline_scheduler.start(app)
     logger.info("Startup scheduling done")
 
+async def on_stop(app: Application):
+    await deadline_scheduler.stop()
+    await voice_pipeline.stop()
+    logger.info("Task parse stats: %s, AI cache: %s", PARSE_STATS, ai.response_cache.stats())
+    logger.info("User cache: %s", await db.user_cache_stats())
+    logger.info("Update processor: %s", update_processor.stats())
+    if update_recorder is not None:
+        await update_recorder.stop()
+        logger.info("Recorded %d updates to %s", update_recorder.written, update_recorder.path)
+    await conversations.stop()
+    logger.info("Conversation states: %d active, %d flushes, %d rows written",
+                len(conversations), conversations.flushes, conversations.rows_written)
+    await db.close()
+    await ai.close_client()
+    logger.info("Database connections closed")
+
 # ---------- Wizard shortcuts ----------
 async def task_wizard_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg = update.effective_user
-    u = db.get_user(tg.id) or {}
+    u = await db.get_user(tg.id) or {}
     lang = u.get("language", Config.DEFAULT_LANG)
     if not is_manager(tg):
         return await update.effective_chat.send_message(T(lang,"only_manager"))
-    context.user_data["tw_wait_nl"] = True
+    conversations.set(tg.id, State.TASK_WIZARD)
     await update.effective_chat.send_message(T(lang,"assign_task_prompt"))
 
-async def on_callback_from_text(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
-    class _D: pass
-    d = _D(); d.data = data
-    update.callback_query = d
-    await on_callback(update, context)
+# Reply-klaviatura tugmalari: uch tildagi matn → amal (bitta dict; text_router'da holat oqimlaridan oldin)
+BUTTON_ACTIONS = {
+    txt: action for key, action in (
+        ("btn_assign", lambda u, c, p: task_wizard_start(u, c)),
+        ("btn_status", lambda u, c, p: cmd_status(u, c)),
+        ("btn_reports", lambda u, c, p: cmd_report(u, c)),
+        ("btn_employees", lambda u, c, p: cb_employees_menu(u, c, p.lang)),
+        ("btn_requests", cb_invites),
+        ("btn_change_lang", lambda u, c, p: cmd_language(u, c)),
+        ("btn_my_tasks", lambda u, c, p: cmd_mytasks(u, c)),
+        ("btn_send_report", lambda u, c, p: cb_employee_report(u, c, p.lang)),
+        ("btn_refresh", lambda u, c, p: cmd_start(u, c)),
+    ) for txt in variants(key)
+}
 
 # ---------- App builder ----------
-def build_application() -> Application:
-    app = (Application.builder().token(Config.TELEGRAM_BOT_TOKEN).post_init(on_start).build())
+update_processor = PerUserUpdateProcessor(Config.MAX_CONCURRENT_UPDATES, Config.MAX_PENDING_UPDATES or None)
+
+update_recorder = UpdateRecorder(Config.RECORD_UPDATES_PATH) if Config.RECORD_UPDATES_PATH else None
+
+async def record_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """RECORD_UPDATES_PATH: har update bitta JSON qator (loadtest.py --updates); yozish fon thread'ida."""
+    update_recorder.record(update.to_dict())
+
+def build_application(request: Optional[BaseRequest] = None) -> Application:
+    """request — Bot API so'rovlari uchun boshqa transport (loadtest.py soxta javoblar beradi)."""
+    builder = (Application.builder().token(Config.TELEGRAM_BOT_TOKEN)
+               .defaults(Defaults(tzinfo=TZ))   # JobQueue vaqt zonasi (scheduler.configure() executor'ni almashtirib yuboradi)
+               .concurrent_updates(update_processor)
+               .post_init(on_start).post_shutdown(on_stop))
+    if request is not None:
+        builder = builder.request(request)
+    app = builder.build()
+
+    if update_recorder is not None:
+        app.add_handler(TypeHandler(Update, record_update), group=-1)
 
     # Slash
     app.add_handler(CommandHandler("start", cmd_start))
@@ -892,60 +1084,48 @@ def build_application() -> Application:
     app.add_handler(CommandHandler("report", cmd_report))
     app.add_handler(CommandHandler("mytasks", cmd_mytasks))
     app.add_handler(CommandHandler("done", cmd_done))
-
-    # Reply keyboard handlers (3-til regex)
-    app.add_handler(MessageHandler(filters.Regex(any_btn("assign")), task_wizard_start))
-    app.add_handler(MessageHandler(filters.Regex(any_btn("status")), cmd_status))
-    app.add_handler(MessageHandler(filters.Regex(any_btn("reports")), cmd_report))
-    app.add_handler(MessageHandler(filters.Regex(any_btn("employees")),
-                                   lambda u,c: cb_employees_menu(u,c,(db.get_user(u.effective_user.id) or {}).get('language',Config.DEFAULT_LANG))))
-    app.add_handler(MessageHandler(filters.Regex(any_btn("invites")),
-                                   lambda u,c: on_callback_from_text(u,c,"m:invites")))
-    app.add_handler(MessageHandler(filters.Regex(any_btn("lang")), cmd_language))
-    app.add_handler(MessageHandler(filters.Regex(any_btn("mytasks")), cmd_mytasks))
-    app.add_handler(MessageHandler(filters.Regex(any_btn("sendrep")),
-                                   lambda u,c: cb_employee_report(u,c,(db.get_user(u.effective_user.id) or {}).get('language',Config.DEFAULT_LANG))))
-    app.add_handler(MessageHandler(filters.Regex(any_btn("refresh")), cmd_start))
+    app.add_handler(CommandHandler("search", cmd_search))
+    app.add_handler(CommandHandler("reload", cmd_reload))
 
     # Callback, text, voice
     app.add_handler(CallbackQueryHandler(on_callback))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_router))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_router))   # tugmalar ham shu yerda
     app.add_handler(MessageHandler(filters.VOICE, on_voice))  # fayl handlerlari yo‘q
 
     return app
 
 # ---------- Main (webhook/polling) ----------
+async def collect_metrics() -> Dict[str, float]:
+    """/metrics (webhook.py) uchun: processor, suhbat holatlari, navbatlar va keshlar."""
+    m: Dict[str, float] = {f"update_processor_{k}": v for k, v in update_processor.stats().items()}
+    m["conversation_states"] = len(conversations)
+    m["voice_queue_size"] = voice_pipeline.pending
+    m.update({f"voice_jobs_{k}_total": getattr(voice_pipeline, k) for k in ("done", "failed", "timed_out")})
+    m.update({f"task_parse_{k}_total": v for k, v in PARSE_STATS.items()})
+    m.update({f"user_cache_{k}": v for k, v in (await db.user_cache_stats()).items()})
+    m.update({f"ai_cache_{k}": v for k, v in ai.response_cache.stats().items()})
+    return m
+
 def main():
     app = build_application()
     logger.info("Starting bot …")
 
-    use_webhook = os.getenv("USE_WEBHOOK", "0") == "1" or bool(os.getenv("RENDER_EXTERNAL_URL"))
-    port = int(os.getenv("PORT", "8080"))
-    base_url = os.getenv("WEBHOOK_BASE", os.getenv("RENDER_EXTERNAL_URL", "")).rstrip("/")
-    secret_token = os.getenv("WEBHOOK_SECRET", "")
-
-    if use_webhook and base_url:
-        webhook_url = f"{base_url}/{Config.TELEGRAM_BOT_TOKEN}"
-        logger.info("Running in WEBHOOK mode at %s", webhook_url)
-        app.run_webhook(
-            listen="0.0.0.0",
-            port=port,
-            url_path=Config.TELEGRAM_BOT_TOKEN,
-            webhook_url=webhook_url,
-            secret_token=secret_token or None,
-            drop_pending_updates=True,
-            allowed_updates=Update.ALL_TYPES,
-        )
+    # Pending update'lar hech qaysi rejimda tashlanmaydi: deploy paytida yozilgan xabarlar restartdan keyin keladi
+    use_webhook = Config.USE_WEBHOOK or bool(os.getenv("RENDER_EXTERNAL_URL"))
+    if use_webhook:
+        webhook_url = f"{Config.WEBHOOK_BASE}/{Config.TELEGRAM_BOT_TOKEN}" if Config.WEBHOOK_BASE else ""
+        logger.info("Running in WEBHOOK mode on port %d%s", Config.PORT,
+                    "" if webhook_url else " (WEBHOOK_BASE yo'q — setWebhook chaqirilmaydi, lokal test)")
+        asyncio.run(webhook.serve(
+            app, "0.0.0.0", Config.PORT, Config.TELEGRAM_BOT_TOKEN, webhook_url, Config.WEBHOOK_SECRET,
+            max_connections=Config.WEBHOOK_MAX_CONNECTIONS, drain_timeout=Config.DRAIN_TIMEOUT,
+            metrics=collect_metrics, metrics_token=Config.METRICS_TOKEN))
     else:
         logger.info("Running in POLLING mode")
-        try:
-            app.bot.delete_webhook(drop_pending_updates=True)
-        except Exception:
-            pass
-        app.run_polling(
-            poll_interval=2.0,
-            timeout=30,
-            drop_pending_updates=True,
+        app.run_polling(   # deleteWebhook'ni o'zi chaqiradi; SIGTERM'da Application.stop() handlerlarni kutadi
+            poll_interval=Config.POLL_INTERVAL,
+            timeout=Config.POLL_TIMEOUT,
+            drop_pending_updates=False,
             allowed_updates=Update.ALL_TYPES,
         )
 
@@ -0,0 +1,162 @@
+# broadcast.py — ko'p qabul qiluvchiga xabar: global token bucket + har chat limiti + RetryAfter
+import asyncio, logging, time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from telegram.error import Forbidden, NetworkError, RetryAfter, TimedOut
+
+logger = logging.getLogger("taskbot.broadcast")
+
+# (chat_id, text, send_message kwargs)
+Message = Tuple[int, str, Dict[str, Any]]
+
+
+class TokenBucket:
+    """rate token/sek, capacity gacha burst. acquire() token bo'lguncha kutadi."""
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """RetryAfter kelganda butun bucketni to'xtatib turish."""
+        self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class BroadcastReport:
+    __slots__ = ("label", "total", "sent", "failed", "blocked", "retries", "started", "finished")
+
+    def __init__(self, label: str, total: int):
+        self.label = label
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.blocked: List[int] = []
+        self.retries = 0
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.label}: {self.sent}/{self.total} sent, {self.failed} failed, "
+                f"{len(self.blocked)} blocked, {self.retries} retries in {self.elapsed:.1f}s ({self.rate:.1f} msg/s)")
+
+
+class _ChatSlot:
+    __slots__ = ("lock", "refs", "next_at")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.refs = 0
+        self.next_at = 0.0
+
+
+class Broadcaster:
+    """
+    Telegram limitlari: global ~30 xabar/sek, bitta chatga ~1 xabar/sek.
+    Limiter'lar butun jarayon uchun umumiy — bir vaqtdagi bir nechta broadcast ham limitdan oshmaydi.
+    bot — send_message(chat_id, text, **kwargs) korutinasi bor har qanday obyekt (testda fake).
+    """
+    def __init__(self, rate: float = 25.0, per_chat_interval: float = 1.0, concurrency: int = 16,
+                 max_retries: int = 3, on_blocked: Optional[Callable[[int, str], Awaitable[None]]] = None):
+        self.bucket = TokenBucket(rate)
+        self.per_chat_interval = per_chat_interval
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.on_blocked = on_blocked
+        self._chats: Dict[int, _ChatSlot] = {}
+
+    async def _chat_slot(self, chat_id: int) -> None:
+        slot = self._chats.get(chat_id)
+        if slot is None:
+            slot = self._chats[chat_id] = _ChatSlot()
+        slot.refs += 1
+        try:
+            async with slot.lock:
+                wait = slot.next_at - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                slot.next_at = time.monotonic() + self.per_chat_interval
+        finally:
+            slot.refs -= 1
+
+    def _prune(self) -> None:
+        """Kutayotgani yo'q va intervali o'tgan chatlar unutiladi (dict har xabar olgan chat bilan o'smaydi)."""
+        now = time.monotonic()
+        for chat_id in [c for c, s in self._chats.items() if not s.refs and s.next_at <= now]:
+            del self._chats[chat_id]
+
+    async def _send_one(self, bot, msg: Message, report: BroadcastReport) -> None:
+        chat_id, text, kwargs = msg
+        for attempt in range(self.max_retries + 1):
+            await self._chat_slot(chat_id)
+            await self.bucket.acquire()
+            try:
+                await bot.send_message(chat_id, text, **kwargs)
+                report.sent += 1
+                return
+            except RetryAfter as e:
+                ra = e.retry_after
+                delay = ra.total_seconds() if hasattr(ra, "total_seconds") else float(ra)
+                self.bucket.pause(delay)   # keyingi acquire() shuncha kutadi (hamma yuboruvchilar uchun)
+                report.retries += 1
+            except Forbidden as e:
+                report.blocked.append(chat_id)
+                if self.on_blocked:
+                    try:
+                        await self.on_blocked(chat_id, str(e))
+                    except Exception as ex:
+                        logger.warning("on_blocked failed for %s: %s", chat_id, ex)
+                return
+            except (TimedOut, NetworkError):
+                if attempt >= self.max_retries:
+                    break
+                report.retries += 1
+                await asyncio.sleep(min(2 ** attempt, 10))
+            except Exception as e:
+                logger.warning("Broadcast %s to %s failed: %s", report.label, chat_id, e)
+                break
+        report.failed += 1
+
+    async def send(self, bot, messages: Iterable[Message], label: str = "broadcast",
+                   progress_every: int = 100) -> BroadcastReport:
+        msgs = list(messages)
+        report = BroadcastReport(label, len(msgs))
+        if not msgs:
+            report.finished = time.monotonic()
+            return report
+        sem = asyncio.Semaphore(self.concurrency)
+        done = 0
+
+        async def run(m: Message):
+            nonlocal done
+            async with sem:
+                await self._send_one(bot, m, report)
+            done += 1
+            if progress_every and done % progress_every == 0 and done < report.total:
+                logger.info("Broadcast %s progress: %d/%d (%.1f msg/s)", label, done, report.total, report.rate)
+
+        await asyncio.gather(*(run(m) for m in msgs))
+        self._prune()
+        report.finished = time.monotonic()
+        logger.info("Broadcast %s", report)
+        return report
@@ -30,6 +30,13 @@ class Config:
     # SQLite fayl yo'li (dev uchun oqilona default)
     DATABASE_PATH = os.getenv("DATABASE_PATH", "taskbot.db")
 
+    # Foydalanuvchi keshi (har update'dagi ensure_user/get_user so'rovlarini DB'siz qaytaradi)
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "5000"))
+    USER_CACHE_TTL  = float(os.getenv("USER_CACHE_TTL", "300"))
+
+    # Migratsiyalar: online rejimda katta backfill'lar fon thread'ida bo'laklab bajariladi (bot ishlashda davom etadi)
+    DB_ONLINE_MIGRATIONS = _getenv_bool("DB_ONLINE_MIGRATIONS", False)
+
     # Vaqt zonasi (default: Asia/Tashkent)
     TIMEZONE = ZoneInfo(os.getenv("TIMEZONE", "Asia/Tashkent"))
 
@@ -38,6 +45,30 @@ class Config:
     EVENING_REMINDER  = os.getenv("EVENING_REMINDER", "18:00")
     DAILY_REPORT_TIME = os.getenv("DAILY_REPORT_TIME", "18:00")
 
+    # Deadline eslatmalari: muddatdan necha daqiqa oldin ogohlantirish va restartda
+    # o'tib ketgan (yuborilmagan) eslatmalarni necha soat orqaga qarab yuborish
+    DEADLINE_PRE_MINUTES = int(os.getenv("DEADLINE_PRE_MINUTES", "120"))
+    DEADLINE_GRACE_HOURS = int(os.getenv("DEADLINE_GRACE_HOURS", "12"))
+    DEADLINE_BATCH_SIZE = int(os.getenv("DEADLINE_BATCH_SIZE", "500"))
+
+    # Arxiv: shu kundan eski done/rejected vazifalar har kecha tasks_archive'ga ko'chiriladi (0 = o'chirilgan)
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+    ARCHIVE_TIME       = os.getenv("ARCHIVE_TIME", "03:30")
+
+    # Sahifalash (/status — xodimlar soni va har xodimga vazifalar, /mytasks — vazifalar)
+    STATUS_PAGE_SIZE          = int(os.getenv("STATUS_PAGE_SIZE", "10"))
+    STATUS_TASKS_PER_EMPLOYEE = int(os.getenv("STATUS_TASKS_PER_EMPLOYEE", "10"))
+    MYTASKS_PAGE_SIZE         = int(os.getenv("MYTASKS_PAGE_SIZE", "20"))
+
+    # /search (FTS5): sahifa hajmi va bm25 tartiblanadigan eng yangi mosliklar oynasi
+    SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "10"))
+    SEARCH_WINDOW    = int(os.getenv("SEARCH_WINDOW", "2000"))
+
+    # Suhbat holatlari (states.py): TTL va SQLite'ga yig'ib yozish oralig'i (soniya)
+    STATE_TTL_MINUTES    = int(os.getenv("STATE_TTL_MINUTES", "60"))
+    STATE_FLUSH_INTERVAL = float(os.getenv("STATE_FLUSH_INTERVAL", "2"))
+
     # Til (languages.py bilan mos)
     DEFAULT_LANG = os.getenv("DEFAULT_LANG", "uz")
 
@@ -50,6 +81,25 @@ class Config:
     OPENAI_API_KEY    = os.getenv("OPENAI_API_KEY", "")
     # Botdagi default model: gpt-4o-mini (xohlasangiz almashtiring)
     OPENAI_TASK_MODEL = os.getenv("OPENAI_TASK_MODEL", "gpt-4o-mini")
+    # Lokal parser ishonchi shu chegaradan past bo'lsa LLM chaqiriladi (0..1)
+    LOCAL_PARSE_THRESHOLD = float(os.getenv("LOCAL_PARSE_THRESHOLD", "0.9"))
+
+    # Ovozli xabarlar: parallel workerlar soni va navbat hajmi (to'lsa "band" javobi)
+    VOICE_WORKERS    = int(os.getenv("VOICE_WORKERS", "2"))
+    VOICE_QUEUE_SIZE = int(os.getenv("VOICE_QUEUE_SIZE", "20"))
+    VOICE_JOB_TIMEOUT = float(os.getenv("VOICE_JOB_TIMEOUT", "120"))   # bitta ovozli xabar (yuklash+Whisper+parse)
+
+    # Broadcast (eslatmalar, hisobotlar): Telegram limiti ~30 xabar/sek global, ~1 xabar/sek bitta chatga
+    BROADCAST_RATE               = float(os.getenv("BROADCAST_RATE", "25"))
+    BROADCAST_PER_CHAT_INTERVAL  = float(os.getenv("BROADCAST_PER_CHAT_INTERVAL", "1.0"))
+    BROADCAST_CONCURRENCY        = int(os.getenv("BROADCAST_CONCURRENCY", "16"))
+
+    # Update'larni parallel qayta ishlash (updates.py): bir vaqtda ishlaydigan handlerlar va qabul qilingan
+    # update'lar chegarasi (0 — MAX_CONCURRENT_UPDATES * 8). Bitta foydalanuvchiniki baribir ketma-ket.
+    MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "32"))
+    MAX_PENDING_UPDATES    = int(os.getenv("MAX_PENDING_UPDATES", "0"))
+    # Kelgan update'larni JSONL'ga yozish (loadtest.py --updates bilan qayta o'ynatish uchun); bo'sh — o'chiq
+    RECORD_UPDATES_PATH = os.getenv("RECORD_UPDATES_PATH", "")
 
     # Log darajasi: DEBUG | INFO | WARNING | ERROR
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
@@ -65,10 +115,19 @@ class Config:
     # Telegram webhook tekshiruvi uchun ixtiyoriy maxfiy token
     WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
 
-    # Render/Heroku port (run_webhook uchun kerak bo'ladi)
+    # GET /metrics uchun alohida token (Authorization: Bearer ...); WEBHOOK_SECRET sarlavhasi ham qabul qilinadi.
+    # Ikkalasi ham bo'sh bo'lsa /metrics yopiq (403). /healthz doim ochiq.
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+    # Render/Heroku port (webhook.py serveri shu portda tinglaydi: webhook, /healthz, /metrics)
     PORT = int(os.getenv("PORT", "8080"))
 
+    # setWebhook max_connections (Telegram bir vaqtda shuncha so'rov yuboradi) va SIGTERM'da
+    # ishlayotgan handlerlarni kutish chegarasi (platformaning to'xtatish muddatidan qisqaroq bo'lsin)
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+    DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "25"))
+
     # --- Qo'shimcha dev qulayliklari ---
-    # Polling interval va timeout ni xohlasangiz .env bilan boshqaring (bot.py defaultlarini saqlab qolgan holda)
+    # Polling interval va timeout (run_polling shu qiymatlar bilan ishlaydi)
     POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "2.0"))
     POLL_TIMEOUT  = int(os.getenv("POLL_TIMEOUT", "30"))
@@ -1,7 +1,12 @@
 # database.py
-import sqlite3, secrets
+import asyncio, logging, re, sqlite3, secrets, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import migrations
+from name_index import AUTO_MARGIN, AUTO_SCORE, NameIndex
 
 try:
     from config import Config
@@ -9,103 +14,257 @@ try:
 except Exception:
     BOT_USERNAME = ""
 
+logger = logging.getLogger("taskbot.db")
+
+# Har bir ulanishga bir marta qo'llanadigan PRAGMA'lar (WAL: o'quvchilar yozuvchini bloklamaydi)
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",      # ~16 MB sahifa keshi
+    "PRAGMA mmap_size=134217728",    # 128 MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# tasks va tasks_archive uchun umumiy ustunlar (INSERT ... SELECT / UNION ALL)
+TASK_COLUMNS = ("id, title, description, created_by, assigned_to, deadline, status, priority, "
+                "created_at, completed_at, report_text, reject_reason, accepted_at")
+
+# Vazifalar tartibi: avval ochiqlar, keyin done; ichida yangisi birinchi (idx_tasks_assignee_page)
+DONE_FLAG = "(CASE WHEN status='done' THEN 1 ELSE 0 END)"
+
+# Keyset kursorlari: vazifa — (done, created_at, id), xodim — (lower(username), telegram_id)
+TaskCursor = Tuple[int, str, int]
+EmployeeCursor = Tuple[str, int]
+Page = Tuple[List[Dict[str, Any]], Optional[tuple], Optional[tuple]]
+
+# Rollup'lar hot + arxiv bo'yicha hisoblanadi
+ALL_TASKS_SQL = ("SELECT assigned_to, status, completed_at FROM tasks "
+                 "UNION ALL SELECT assigned_to, status, completed_at FROM tasks_archive")
+
+# FTS5: qidiruv oynasi — eng yangi shuncha moslik ichida bm25 bo'yicha tartiblanadi (ish hajmi chegaralangan)
+SEARCH_WINDOW = 2000
+FTS_WORD_RE = re.compile(r"\w+")
+SearchCursor = Tuple[int, int]   # (oyna quyi rowid'i, offset)
+
+def fts_query(text: str) -> str:
+    """Foydalanuvchi matnidan xavfsiz FTS5 so'rovi: har so'z prefiks bo'yicha (muzlatkich → muzlatkichni), hammasi AND."""
+    return " ".join(f'"{w}"*' for w in FTS_WORD_RE.findall(text or ""))
+
 def dict_factory(cursor, row):
     return {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
 
+class UserCache:
+    """
+    telegram_id -> {"user": row, "approved": bool|None} (TTL + LRU).
+    Har bir update'dagi get_user/upsert_user/user_is_approved so'rovlarini DB'siz qaytaradi.
+    O'quvchilar SELECT'dan oldin generation() oladi va put(..., gen=) ga beradi: oraliqda invalidate()
+    yoki yozuvchining put'i bo'lgan bo'lsa eski qator keshga qaytmaydi.
+    """
+    def __init__(self, max_size: int = 5000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._gen: Dict[int, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, telegram_id: int, count: bool = True) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._data.get(telegram_id)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[telegram_id]
+                self.misses += count
+                return None
+            self._data.move_to_end(telegram_id)
+            self.hits += count
+            return item[1]
+
+    def generation(self, telegram_id: int) -> Tuple[int, int]:
+        with self._lock:
+            return self._epoch, self._gen.get(telegram_id, 0)
+
+    def put(self, telegram_id: int, user: Dict[str, Any], approved: Optional[bool] = None,
+            gen: Optional[Tuple[int, int]] = None) -> bool:
+        """gen=None — yozuvchidan (qator aniq yangi, generation oshadi); aks holda o'zgargan bo'lsa tashlanadi."""
+        with self._lock:
+            if gen is None:
+                self._gen[telegram_id] = self._gen.get(telegram_id, 0) + 1
+            elif gen != (self._epoch, self._gen.get(telegram_id, 0)):
+                return False
+            self._data[telegram_id] = (time.monotonic() + self.ttl, {"user": dict(user), "approved": approved})
+            self._data.move_to_end(telegram_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+            return True
+
+    def invalidate(self, *telegram_ids: int) -> None:
+        with self._lock:
+            for tid in telegram_ids:
+                self._data.pop(tid, None)
+                self._gen[tid] = self._gen.get(tid, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._epoch += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data),
+                    "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
 class Database:
-    def __init__(self, path: str):
+    """
+    Doimiy ulanishlar: bitta yozuvchi (lock bilan) + har bir thread uchun o'quvchi ulanish.
+    Ulanishlar birinchi so'rovda ochiladi va close() chaqirilguncha qayta ishlatiladi.
+    """
+    def __init__(self, path: str, user_cache_size: int = 5000, user_cache_ttl: float = 300.0,
+                 online_migrations: bool = False):
         self.path = path
+        self.online_migrations = online_migrations
+        self._backfill: Optional[threading.Thread] = None
+        self.users = UserCache(user_cache_size, user_cache_ttl)
+        self._names: Optional[NameIndex] = None    # resolve_assignee uchun, birinchi qidiruvda quriladi
+        self._lock = threading.RLock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._depth = 0
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
         self._init_db()
 
-    @contextmanager
-    def _conn(self):
+    def _open(self) -> sqlite3.Connection:
         con = sqlite3.connect(self.path, check_same_thread=False)
         con.row_factory = dict_factory
-        try:
-            yield con
-            con.commit()
-        finally:
-            con.close()
+        for p in PRAGMAS:
+            con.execute(p)
+        return con
+
+    @contextmanager
+    def _conn(self):
+        """Yozuvchi ulanish: tranzaksiya oxirida commit, xatoda rollback (ichma-ich chaqiruvlar bitta tranzaksiya)."""
+        with self._lock:
+            if self._writer is None:
+                self._writer = self._open()
+            con = self._writer
+            self._depth += 1
+            try:
+                yield con
+                if self._depth == 1:
+                    con.commit()
+            except Exception:
+                if self._depth == 1:
+                    con.rollback()
+                raise
+            finally:
+                self._depth -= 1
+
+    @contextmanager
+    def _read(self):
+        """Faqat o'qish uchun: thread'ga biriktirilgan ulanish (WAL tufayli yozuvni kutmaydi)."""
+        if self.path == ":memory:":
+            with self._conn() as con:
+                yield con
+            return
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._open()
+            con.isolation_level = None
+            self._local.con = con
+            with self._lock:
+                self._readers.append(con)
+        yield con
+
+    def close(self) -> None:
+        """Barcha ulanishlarni yopish (Application shutdown'da chaqiriladi)."""
+        with self._lock:
+            for con in self._readers:
+                try: con.close()
+                except Exception: pass
+            self._readers.clear()
+            self._local = threading.local()
+            if self._writer is not None:
+                try: self._writer.close()
+                except Exception: pass
+                self._writer = None
 
     def _init_db(self):
-        with self._conn() as c:
-            cur = c.cursor()
-            cur.executescript("""
-            CREATE TABLE IF NOT EXISTS users(
-                telegram_id INTEGER PRIMARY KEY,
-                username TEXT, full_name TEXT,
-                role TEXT,                 -- 'MANAGER' | 'EMPLOYEE' | NULL
-                language TEXT DEFAULT 'uz',
-                active INTEGER DEFAULT 1
-            );
-            CREATE TABLE IF NOT EXISTS tasks(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT, description TEXT,
-                created_by INTEGER, assigned_to INTEGER,
-                deadline TEXT,
-                status TEXT DEFAULT 'new',          -- new|accepted|rejected|done|archived
-                priority TEXT DEFAULT 'Medium',
-                created_at TEXT DEFAULT (datetime('now')),
-                completed_at TEXT,
-                report_text TEXT,
-                reject_reason TEXT,
-                accepted_at TEXT
-            );
-            CREATE TABLE IF NOT EXISTS reports(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER, date TEXT, content TEXT, tasks_completed INTEGER
-            );
-            /* Pending/approve oqimi */
-            CREATE TABLE IF NOT EXISTS invite_requests(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER, username TEXT, full_name TEXT,
-                status TEXT DEFAULT 'pending',   -- pending|approved|rejected
-                reason TEXT,
-                created_at TEXT DEFAULT (datetime('now')),
-                decided_at TEXT
-            );
-            /* Optional: to'g'ridan-to'g'ri invite linklar */
-            CREATE TABLE IF NOT EXISTS invites(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT, full_name TEXT,
-                token TEXT UNIQUE,
-                status TEXT DEFAULT 'active',
-                created_at TEXT DEFAULT (datetime('now')),
-                approved_by INTEGER, approved_at TEXT,
-                used_by INTEGER, used_at TEXT
-            );
-            """)
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(lower(username))")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_assigned ON tasks(assigned_to)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_invreq_status ON invite_requests(status)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_invreq_user   ON invite_requests(user_id)")
-            cur.execute("CREATE INDEX IF NOT EXISTS idx_invites_token ON invites(token)")
+        """Sxema migrations.py'da; joriy bo'lsa faqat PRAGMA user_version o'qiladi."""
+        if migrations.current_version(self._conn) == migrations.LATEST and not (
+                self.online_migrations and migrations.pending_backfills(self._conn)):
+            return
+        migrations.migrate(self._conn, online=self.online_migrations)
+        if self.online_migrations and self.path != ":memory:":
+            self._backfill = threading.Thread(target=self._run_backfills, name="db-backfill", daemon=True)
+            self._backfill.start()
+        elif self.online_migrations:
+            migrations.run_backfills(self._conn, pause=0)
+
+    def _run_backfills(self):
+        try:
+            migrations.run_backfills(self._conn)
+        except Exception as e:
+            logger.exception("Online backfill failed (will resume on next start): %s", e)
 
     # ------- Users -------
+    def cached_user(self, telegram_id: int, username: Optional[str], full_name: str) -> Optional[Dict[str, Any]]:
+        """upsert_user'ning I/O'siz qismi: keshda bor va username/full_name o'zgarmagan bo'lsa qator nusxasi."""
+        rec = self.users.get(telegram_id)
+        if rec and rec["user"].get("username") == username and rec["user"].get("full_name") == full_name:
+            return dict(rec["user"])
+        return None
+
     def upsert_user(self, telegram_id: int, username: Optional[str], full_name: str) -> Dict[str, Any]:
+        hit = self.cached_user(telegram_id, username, full_name)
+        if hit is not None:
+            return hit
+        return self._store_user(telegram_id, username, full_name)
+
+    def _store_user(self, telegram_id: int, username: Optional[str], full_name: str) -> Dict[str, Any]:
+        """upsert_user'ning yozuv qismi (AsyncDatabase kesh tekshiruvidan keyin writer'da shuni chaqiradi)."""
+        rec = self.users.get(telegram_id, count=False)
         with self._conn() as c:
             cur = c.cursor()
             cur.execute("SELECT * FROM users WHERE telegram_id=?", (telegram_id,))
             row = cur.fetchone()
             if row:
-                cur.execute("UPDATE users SET username=?, full_name=? WHERE telegram_id=?",
-                            (username, full_name, telegram_id))
+                if row.get("username") != username or row.get("full_name") != full_name:
+                    cur.execute("UPDATE users SET username=?, full_name=? WHERE telegram_id=?",
+                                (username, full_name, telegram_id))
+                    row.update(username=username, full_name=full_name)
             else:
                 cur.execute("INSERT INTO users(telegram_id, username, full_name) VALUES(?,?,?)",
                             (telegram_id, username, full_name))
-            cur.execute("SELECT * FROM users WHERE telegram_id=?", (telegram_id,))
-            return cur.fetchone()
+                cur.execute("SELECT * FROM users WHERE telegram_id=?", (telegram_id,))
+                row = cur.fetchone()
+        self.users.put(telegram_id, row, rec["approved"] if rec else None)
+        if self._names is not None:
+            self._names.add(telegram_id, full_name, username)
+        return dict(row)
 
     def get_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
-        with self._conn() as c:
+        rec = self.users.get(telegram_id)
+        if rec:
+            return dict(rec["user"])
+        gen = self.users.generation(telegram_id)
+        with self._read() as c:
             cur = c.cursor()
             cur.execute("SELECT * FROM users WHERE telegram_id=?", (telegram_id,))
-            return cur.fetchone()
+            row = cur.fetchone()
+        if row:
+            self.users.put(telegram_id, row, gen=gen)
+        return row
+
+    def user_cache_stats(self) -> Dict[str, Any]:
+        return self.users.stats()
 
     def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         if not username: return None
-        with self._conn() as c:
+        with self._read() as c:
             cur = c.cursor()
             cur.execute("SELECT * FROM users WHERE lower(username)=lower(?)", (username,))
             return cur.fetchone()
@@ -113,9 +272,10 @@ class Database:
     def set_user_role(self, telegram_id: int, role: str) -> None:
         with self._conn() as c:
             c.execute("UPDATE users SET role=? WHERE telegram_id=?", (role, telegram_id))
+        self.users.invalidate(telegram_id)
 
     def get_user_role(self, telegram_id: int) -> Optional[str]:
-        with self._conn() as c:
+        with self._read() as c:
             cur = c.cursor()
             cur.execute("SELECT role FROM users WHERE telegram_id=?", (telegram_id,))
             r = cur.fetchone()
@@ -124,9 +284,10 @@ class Database:
     def set_user_language(self, telegram_id: int, lang: str) -> None:
         with self._conn() as c:
             c.execute("UPDATE users SET language=? WHERE telegram_id=?", (lang, telegram_id))
+        self.users.invalidate(telegram_id)
 
     def list_employees(self) -> List[Dict[str, Any]]:
-        with self._conn() as c:
+        with self._read() as c:
             cur = c.cursor()
             cur.execute("""
                 SELECT * FROM users
@@ -141,29 +302,78 @@ class Database:
             cur.execute("SELECT telegram_id FROM users WHERE lower(username)=lower(?) AND role='EMPLOYEE'", (username,))
             r = cur.fetchone()
             if not r: return False
+            cur.execute("SELECT telegram_id FROM users WHERE lower(username)=lower(?)", (username,))
+            ids = [x["telegram_id"] for x in cur.fetchall()]
             cur.execute("UPDATE users SET role=NULL WHERE lower(username)=lower(?)", (username,))
-            return True
+        self.users.invalidate(*ids)
+        return True
 
     def list_managers(self) -> List[Dict[str, Any]]:
-        with self._conn() as c:
+        with self._read() as c:
             cur = c.cursor()
             cur.execute("SELECT * FROM users WHERE role='MANAGER'")
             return cur.fetchall() or []
 
+    def sync_manager_roles(self, ids: Iterable[int], usernames: Iterable[str]) -> List[int]:
+        """Config'dagi managerlarga DB'da ham role='MANAGER' (list_managers/xabarlar uchun); o'zgarganlar id'lari."""
+        ids, usernames = list(ids), [u.lower() for u in usernames]
+        if not ids and not usernames:
+            return []
+        with self._conn() as c:
+            cur = c.cursor()
+            cur.execute(f"""
+                SELECT telegram_id FROM users WHERE telegram_id IN ({",".join("?" * len(ids)) or "NULL"}) AND COALESCE(role,'')<>'MANAGER'
+                UNION
+                SELECT telegram_id FROM users WHERE lower(username) IN ({",".join("?" * len(usernames)) or "NULL"}) AND COALESCE(role,'')<>'MANAGER'
+            """, (*ids, *usernames))
+            changed = [r["telegram_id"] for r in cur.fetchall()]
+            if changed:
+                cur.execute(f"UPDATE users SET role='MANAGER' WHERE telegram_id IN ({','.join('?' * len(changed))})", changed)
+        self.users.invalidate(*changed)
+        return changed
+
     def resolve_assignee(self, name_or_username: str) -> Optional[Dict[str, Any]]:
+        """
+        Faqat ishonchli moslik: username (@ bilan yoki usiz), yagona aniq to'liq ism yoki NameIndex topilmasi
+        AUTO_SCORE'dan yuqori va ikkinchi nomzoddan AUTO_MARGIN oldinda. Aks holda None —
+        bot suggest_assignees nomzodlari bilan menejerdan tasdiq so'raydi.
+        """
         key = (name_or_username or "").strip()
         if not key: return None
-        with self._conn() as c:
+        with self._read() as c:
             cur = c.cursor()
-            if key.startswith("@"):
-                cur.execute("SELECT * FROM users WHERE lower(username)=lower(?)", (key.lstrip("@"),))
-                return cur.fetchone()
-            cur.execute("SELECT * FROM users WHERE lower(full_name)=lower(?)", (key,))
+            cur.execute("SELECT * FROM users WHERE lower(username)=lower(?)", (key.lstrip("@"),))
             r = cur.fetchone()
-            if r: return r
-            cur.execute("SELECT * FROM users WHERE lower(full_name) LIKE lower(?) ORDER BY length(full_name) LIMIT 1",
-                        (f"%{key}%",))
-            return cur.fetchone()
+            if r or key.startswith("@"): return r
+            cur.execute("SELECT * FROM users WHERE lower(full_name)=lower(?) LIMIT 2", (key,))
+            rows = cur.fetchall()
+            if rows: return rows[0] if len(rows) == 1 else None
+        found = self._name_index().search(key, limit=2)
+        if found and found[0][1] >= AUTO_SCORE and (len(found) == 1 or found[0][1] - found[1][1] >= AUTO_MARGIN):
+            return self.get_user(found[0][0])
+        return None
+
+    def suggest_assignees(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """NameIndex bo'yicha tartiblangan nomzodlar (lotin/kirill, imlo xatolari): [user + {"score"}]."""
+        out = []
+        for uid, score in self._name_index().search(query, limit=limit):
+            u = self.get_user(uid)
+            if u:
+                u["score"] = score
+                out.append(u)
+        return out
+
+    def _name_index(self) -> NameIndex:
+        """Ism indeksi: birinchi chaqiruvda users'dan quriladi, keyin upsert_user yangilab boradi."""
+        if self._names is None:
+            with self._lock:
+                if self._names is None:
+                    idx = NameIndex()
+                    with self._read() as c:
+                        idx.add_many((r["telegram_id"], r["full_name"], r["username"])
+                                     for r in c.execute("SELECT telegram_id, full_name, username FROM users"))
+                    self._names = idx
+        return self._names
 
     # ------- Tasks -------
     def create_task(self, title: str, description: str, created_by: int,
@@ -181,62 +391,375 @@ class Database:
                 INSERT INTO tasks(title, description, created_by, assigned_to, deadline, status, priority)
                 VALUES(?,?,?,?,?,?,?)
             """, (title, description, created_by, assigned_to_id, deadline or None, "new", priority))
-            return cur.lastrowid
+            task_id = cur.lastrowid
+            if assigned_to_id is not None:
+                cur.execute("""
+                    INSERT INTO user_task_totals(user_id, total) VALUES(?, 1)
+                    ON CONFLICT(user_id) DO UPDATE SET total=total+1
+                """, (assigned_to_id,))
+            return task_id
 
-    def list_tasks_for_user(self, telegram_id: int) -> List[Dict[str, Any]]:
+    def assign_task(self, task_id: int, user_id: int) -> bool:
+        """Ijrochisiz vazifaga ijrochi (menejer nomzodni tasdiqlaganda). Allaqachon tayinlangan bo'lsa — False."""
         with self._conn() as c:
             cur = c.cursor()
+            cur.execute("UPDATE tasks SET assigned_to=? WHERE id=? AND assigned_to IS NULL", (user_id, task_id))
+            if cur.rowcount == 0:
+                return False
             cur.execute("""
-                SELECT * FROM tasks
-                WHERE assigned_to=?
-                ORDER BY CASE WHEN status='done' THEN 1 ELSE 0 END, created_at DESC
-            """, (telegram_id,))
-            return cur.fetchall() or []
+                INSERT INTO user_task_totals(user_id, total) VALUES(?, 1)
+                ON CONFLICT(user_id) DO UPDATE SET total=total+1
+            """, (user_id,))
+            return True
 
-    def get_task(self, task_id: int) -> Optional[Dict[str, Any]]:
+    def create_tasks_bulk(self, created_by: int, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Ko'p vazifani bitta tranzaksiyada yaratish (masalan, bitta checklist 40 xodimga).
+        tasks: [{"title", "description", "assignee" (@username), "deadline", "priority"}, ...].
+        Username'lar bitta so'rovda topiladi, INSERT — executemany. Natija kirish tartibida:
+        [{"id": task_id, "assignee": user yoki None}, ...].
+        """
+        if not tasks:
+            return []
+        names = {(t.get("assignee") or "").lstrip("@").lower() for t in tasks} - {""}
         with self._conn() as c:
+            cur = c.cursor()
+            users: Dict[str, Dict[str, Any]] = {}
+            if names:
+                cur.execute("SELECT * FROM users WHERE lower(username) IN (%s)" % ",".join("?" * len(names)),
+                            tuple(names))
+                users = {r["username"].lower(): r for r in cur.fetchall()}
+            owners = [users.get((t.get("assignee") or "").lstrip("@").lower()) for t in tasks]
+            cur.executemany("""
+                INSERT INTO tasks(title, description, created_by, assigned_to, deadline, status, priority)
+                VALUES(?,?,?,?,?,'new',?)
+            """, [(t.get("title"), t.get("description", t.get("title")), created_by,
+                   u["telegram_id"] if u else None, t.get("deadline") or None, t.get("priority") or "Medium")
+                  for t, u in zip(tasks, owners)])
+            # AUTOINCREMENT + bitta yozuvchi tranzaksiya: id'lar ketma-ket, oxirgisi last_insert_rowid()
+            last = cur.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
+            totals: Dict[int, int] = {}
+            for u in owners:
+                if u:
+                    totals[u["telegram_id"]] = totals.get(u["telegram_id"], 0) + 1
+            cur.executemany("""
+                INSERT INTO user_task_totals(user_id, total) VALUES(?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET total=total+excluded.total
+            """, totals.items())
+        first = last - len(tasks) + 1
+        return [{"id": first + i, "assignee": u} for i, u in enumerate(owners)]
+
+    def list_tasks_for_user(self, telegram_id: int, include_archived: bool = False) -> List[Dict[str, Any]]:
+        """Faqat hot jadval; include_archived=True — tasks_archive'dagi tarix ham."""
+        with self._read() as c:
+            cur = c.cursor()
+            if not include_archived:
+                cur.execute("""
+                    SELECT * FROM tasks
+                    WHERE assigned_to=?
+                    ORDER BY CASE WHEN status='done' THEN 1 ELSE 0 END, created_at DESC
+                """, (telegram_id,))
+            else:
+                cur.execute(f"""
+                    SELECT * FROM (
+                        SELECT {TASK_COLUMNS} FROM tasks WHERE assigned_to=?
+                        UNION ALL
+                        SELECT {TASK_COLUMNS} FROM tasks_archive WHERE assigned_to=?
+                    ) ORDER BY CASE WHEN status='done' THEN 1 ELSE 0 END, created_at DESC
+                """, (telegram_id, telegram_id))
+            return cur.fetchall() or []
+
+    def list_tasks_page(self, telegram_id: int, after: Optional[TaskCursor] = None,
+                        before: Optional[TaskCursor] = None, limit: int = 20,
+                        include_archived: bool = False) -> Page:
+        """
+        list_tasks_for_user tartibidagi bitta sahifa: (rows, prev, next). OFFSET yo'q —
+        after=next dan keyingi, before=prev dan oldingi sahifa; prev/next None — u tomonda sahifa yo'q.
+        done bo'limlari alohida o'qiladi: (assigned_to, done)=? + (created_at, id) < (?, ?) indeksda seek.
+        """
+        forward = before is None or after is not None
+        cursor = after if forward else before
+        want = int(limit) + 1
+        flags = (0, 1) if forward else (1, 0)
+        if cursor is not None:
+            flags = flags[flags.index(int(cursor[0])):]
+        rows: List[Dict[str, Any]] = []
+        with self._read() as c:
+            cur = c.cursor()
+            for flag in flags:
+                bound = cursor if cursor is not None and flag == int(cursor[0]) else None
+                rows += self._task_slice(cur, telegram_id, flag, bound, forward, want - len(rows), include_archived)
+                if len(rows) >= want:
+                    break
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if not forward:
+            rows.reverse()
+        if not rows:
+            return [], None, None
+        first, last = (self._task_key(r) for r in (rows[0], rows[-1]))
+        if forward:
+            return rows, first if cursor is not None else None, last if more else None
+        return rows, first if more else None, last
+
+    @staticmethod
+    def _task_key(row: Dict[str, Any]) -> TaskCursor:
+        return (1 if row["status"] == "done" else 0, row["created_at"], row["id"])
+
+    @staticmethod
+    def _task_slice(cur, telegram_id: int, flag: int, bound: Optional[TaskCursor], forward: bool,
+                    n: int, include_archived: bool) -> List[Dict[str, Any]]:
+        where, params = f"assigned_to=? AND {DONE_FLAG}=?", [telegram_id, flag]
+        if bound is not None:
+            where += " AND (created_at, id) " + ("<" if forward else ">") + " (?, ?)"
+            params += [bound[1], bound[2]]
+        order = "created_at DESC, id DESC" if forward else "created_at, id"
+        if include_archived:
+            # Har tomon o'z indeksida LIMIT bilan to'xtaydi, keyin ikki sahifa birlashtiriladi
+            arm = "SELECT * FROM (SELECT {cols} FROM {t} WHERE {w} ORDER BY {o} LIMIT ?)"
+            sql = (arm.format(cols=TASK_COLUMNS, t="tasks", w=where, o=order) + " UNION ALL " +
+                   arm.format(cols=TASK_COLUMNS, t="tasks_archive", w=where, o=order) + f" ORDER BY {order} LIMIT ?")
+            params = [*params, n, *params, n]
+        else:
+            sql = f"SELECT * FROM tasks WHERE {where} ORDER BY {order} LIMIT ?"
+        cur.execute(sql, (*params, n))
+        return cur.fetchall() or []
+
+    def get_task(self, task_id: int, include_archived: bool = False) -> Optional[Dict[str, Any]]:
+        with self._read() as c:
             cur = c.cursor()
             cur.execute("SELECT * FROM tasks WHERE id=?", (task_id,))
-            return cur.fetchone()
+            row = cur.fetchone()
+            if row is None and include_archived:
+                cur.execute(f"SELECT {TASK_COLUMNS}, archived_at FROM tasks_archive WHERE id=?", (task_id,))
+                row = cur.fetchone()
+            return row
+
+    def archive_tasks(self, older_than_days: int, limit: int = 500) -> int:
+        """
+        Bitta batch: older_than_days'dan eski done/rejected vazifalarni tasks_archive'ga ko'chiradi
+        (bitta qisqa tranzaksiya). Ko'chirilganlar sonini qaytaradi — 0 bo'lguncha chaqiriladi.
+        Rollup'lar (daily_stats, user_task_totals) tarixni saqlaydi, ularga tegilmaydi.
+        """
+        with self._conn() as c:
+            cur = c.cursor()
+            cur.execute("""
+                SELECT id FROM tasks
+                WHERE status IN ('done','rejected','archived') AND COALESCE(completed_at, created_at) < datetime('now', ?)
+                LIMIT ?
+            """, (f"-{int(older_than_days)} days", int(limit)))
+            ids = [r["id"] for r in cur.fetchall()]
+            if not ids:
+                return 0
+            marks = ",".join("?" * len(ids))
+            cur.execute(f"INSERT OR REPLACE INTO tasks_archive({TASK_COLUMNS}) SELECT {TASK_COLUMNS} FROM tasks WHERE id IN ({marks})", ids)
+            cur.execute(f"DELETE FROM deadline_pings WHERE task_id IN ({marks})", ids)
+            cur.execute(f"DELETE FROM tasks WHERE id IN ({marks})", ids)
+            return len(ids)
 
     def set_task_status(self, task_id: int, status: str, by: int, reason: Optional[str] = None) -> bool:
+        with self._conn() as c:
+            return self._set_status(c.cursor(), task_id, status, by, reason)
+
+    def set_status_bulk(self, task_ids: List[int], status: str, by: int, reason: Optional[str] = None) -> List[int]:
+        """set_task_status ko'p vazifaga bitta tranzaksiyada; o'zgargan id'larni qaytaradi."""
         with self._conn() as c:
             cur = c.cursor()
-            if status == "accepted":
-                cur.execute("UPDATE tasks SET status='accepted', accepted_at=datetime('now') WHERE id=? AND assigned_to=?",
-                            (task_id, by))
-            elif status == "rejected":
-                cur.execute("UPDATE tasks SET status='rejected', reject_reason=?, completed_at=NULL WHERE id=? AND assigned_to=?",
-                            (reason or "", task_id, by))
-            elif status == "done":
-                cur.execute("UPDATE tasks SET status='done', completed_at=datetime('now') WHERE id=? AND assigned_to=?",
-                            (task_id, by))
-            else:
-                return False
-            return cur.rowcount > 0
+            return [tid for tid in task_ids if self._set_status(cur, tid, status, by, reason)]
+
+    def _set_status(self, cur, task_id: int, status: str, by: int, reason: Optional[str]) -> bool:
+        prev_day = self._done_day(cur, task_id)
+        if status == "accepted":
+            cur.execute("UPDATE tasks SET status='accepted', accepted_at=datetime('now') WHERE id=? AND assigned_to=?",
+                        (task_id, by))
+        elif status == "rejected":
+            cur.execute("UPDATE tasks SET status='rejected', reject_reason=?, completed_at=NULL WHERE id=? AND assigned_to=?",
+                        (reason or "", task_id, by))
+        elif status == "done":
+            cur.execute("UPDATE tasks SET status='done', completed_at=datetime('now') WHERE id=? AND assigned_to=?",
+                        (task_id, by))
+        else:
+            return False
+        ok = cur.rowcount > 0
+        if ok:
+            self._move_done_day(cur, by, prev_day, self._done_day(cur, task_id))
+        if ok and status in ("rejected", "done"):
+            self.cancel_deadline_pings(task_id)
+        return ok
 
     def mark_task_done_with_report(self, task_id: int, by: int, report: str) -> bool:
         if int(task_id) == 0:
             self.save_report(by, report, self.count_completed_today(by)); return True
         with self._conn() as c:
             cur = c.cursor()
+            prev_day = self._done_day(cur, task_id)
             cur.execute("""
                 UPDATE tasks
                 SET status='done', completed_at=datetime('now'), report_text=?
                 WHERE id=? AND assigned_to=?
             """, (report or "", task_id, by))
-            return cur.rowcount > 0
+            ok = cur.rowcount > 0
+            if ok:
+                self._move_done_day(cur, by, prev_day, self._done_day(cur, task_id))
+                self.cancel_deadline_pings(task_id)
+            return ok
 
-    # ------- Reports -------
-    def count_completed_today(self, telegram_id: int) -> int:
+    # ------- Deadline pings -------
+    def schedule_deadline_pings(self, task_id: int, now: str, pre_minutes: int = 120) -> List[Dict[str, Any]]:
+        """
+        Vazifa deadline'i bo'yicha 'pre' va 'due' eslatmalarini yozadi (idempotent: fire_at o'zgarmasa
+        yuborilgan belgisi saqlanadi). now — lokal vaqt; o'tib ketgan 'pre' yozilmaydi.
+        Yuborilishi kutilayotgan yozuvlarni qaytaradi.
+        """
+        with self._conn() as c:
+            cur = c.cursor()
+            cur.execute("SELECT deadline, status FROM tasks WHERE id=?", (task_id,))
+            t = cur.fetchone()
+            if not t or t["status"] not in ("new", "accepted"):
+                self.cancel_deadline_pings(task_id)
+                return []
+            cur.execute("""
+                SELECT datetime(?, ?) AS pre, datetime(?) AS due
+            """, (t["deadline"], f"-{int(pre_minutes)} minutes", t["deadline"]))
+            fire = cur.fetchone()
+            if not fire["due"]:
+                self.cancel_deadline_pings(task_id)
+                return []
+            wanted = {"due": fire["due"]}
+            if pre_minutes > 0 and fire["pre"] > now:
+                wanted["pre"] = fire["pre"]
+            cur.execute("DELETE FROM deadline_pings WHERE task_id=? AND sent_at IS NULL AND kind NOT IN (%s)"
+                        % ",".join("?" * len(wanted)), (task_id, *wanted))
+            for kind, fire_at in wanted.items():
+                cur.execute("""
+                    INSERT INTO deadline_pings(task_id, kind, fire_at) VALUES(?,?,?)
+                    ON CONFLICT(task_id, kind) DO UPDATE SET fire_at=excluded.fire_at, sent_at=NULL
+                    WHERE deadline_pings.fire_at != excluded.fire_at
+                """, (task_id, kind, fire_at))
+            cur.execute("SELECT * FROM deadline_pings WHERE task_id=? AND sent_at IS NULL ORDER BY fire_at", (task_id,))
+            return cur.fetchall() or []
+
+    def schedule_deadline_pings_bulk(self, task_ids: List[int], now: str, pre_minutes: int = 120) -> List[Dict[str, Any]]:
+        """schedule_deadline_pings bir nechta vazifa uchun, bitta tranzaksiyada."""
+        with self._conn():
+            return [r for tid in task_ids for r in self.schedule_deadline_pings(tid, now, pre_minutes)]
+
+    def cancel_deadline_pings(self, task_id: int) -> int:
         with self._conn() as c:
             cur = c.cursor()
+            cur.execute("DELETE FROM deadline_pings WHERE task_id=? AND sent_at IS NULL", (task_id,))
+            return cur.rowcount
+
+    def mark_deadline_pings_sent(self, keys: List[Tuple[int, str]]) -> None:
+        """keys — [(task_id, kind), ...]; bitta tranzaksiyada."""
+        with self._conn() as c:
+            c.executemany("UPDATE deadline_pings SET sent_at=datetime('now') WHERE task_id=? AND kind=?", keys)
+
+    def list_pending_deadline_pings(self, since: str, until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Yuborilmagan eslatmalar [since, until) oralig'ida — idx_pings_pending bo'yicha bitta range so'rov."""
+        with self._read() as c:
+            cur = c.cursor()
+            cur.execute("""
+                SELECT p.task_id, p.kind, p.fire_at FROM deadline_pings p
+                CROSS JOIN tasks t ON t.id=p.task_id    -- tartib qat'iy: oyna idx_pings_pending'dan, tasks — PK
+                WHERE p.sent_at IS NULL AND p.fire_at >= ? AND p.fire_at < ?
+                  AND t.status IN ('new','accepted')
+                ORDER BY p.fire_at
+            """, (since, until or "9999-12-31"))
+            return cur.fetchall() or []
+
+    def list_due_deadline_pings(self, since: str, until: str, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Yuborishga tayyor paket: eslatma + vazifa ustunlari + ijrochining chat/tili.
+        Yopilgan vazifalar ham qaytadi (ping_status bilan) — ular yuborilmay sent deb belgilanadi.
+        """
+        with self._read() as c:
+            cur = c.cursor()
+            cur.execute("""
+                SELECT t.*, p.task_id, p.kind, p.fire_at, t.status AS ping_status,
+                       u.telegram_id AS chat_id, u.language AS lang
+                FROM deadline_pings p
+                JOIN tasks t ON t.id=p.task_id
+                LEFT JOIN users u ON u.telegram_id=t.assigned_to
+                WHERE p.sent_at IS NULL AND p.fire_at >= ? AND p.fire_at < ?
+                ORDER BY p.fire_at
+                LIMIT ?
+            """, (since, until, limit))
+            return cur.fetchall() or []
+
+    # ------- Daily stats rollup -------
+    @staticmethod
+    def _done_day(cur, task_id: int) -> Optional[str]:
+        """Vazifa daily_stats'ga qaysi kun hisobida kiradi (done bo'lmasa None)."""
+        cur.execute("SELECT CASE WHEN status='done' THEN date(completed_at) END AS day FROM tasks WHERE id=?", (task_id,))
+        r = cur.fetchone()
+        return r["day"] if r else None
+
+    @staticmethod
+    def _move_done_day(cur, user_id: int, old_day: Optional[str], new_day: Optional[str]) -> None:
+        """daily_stats: eski kundan −1, yangi kunga +1 (o'sha tranzaksiyada)."""
+        if old_day == new_day:
+            return
+        if old_day:
+            cur.execute("UPDATE daily_stats SET completed=completed-1 WHERE user_id=? AND day=?", (user_id, old_day))
+        if new_day:
+            cur.execute("""
+                INSERT INTO daily_stats(user_id, day, completed) VALUES(?,?,1)
+                ON CONFLICT(user_id, day) DO UPDATE SET completed=completed+1
+            """, (user_id, new_day))
+
+    def rebuild_daily_stats(self) -> Dict[str, int]:
+        """daily_stats va user_task_totals'ni tasks'dan to'liq qayta hisoblash (bitta tranzaksiya)."""
+        with self._conn() as c:
+            cur = c.cursor()
+            cur.execute("DELETE FROM daily_stats")
+            cur.execute("DELETE FROM user_task_totals")
+            cur.execute(f"""
+                INSERT INTO daily_stats(user_id, day, completed)
+                SELECT assigned_to, date(completed_at), COUNT(*) FROM ({ALL_TASKS_SQL})
+                WHERE assigned_to IS NOT NULL AND status='done' AND date(completed_at) IS NOT NULL
+                GROUP BY assigned_to, date(completed_at)
+            """)
+            days = cur.rowcount
+            cur.execute(f"""
+                INSERT INTO user_task_totals(user_id, total)
+                SELECT assigned_to, COUNT(*) FROM ({ALL_TASKS_SQL}) WHERE assigned_to IS NOT NULL GROUP BY assigned_to
+            """)
+            return {"daily_rows": days, "users": cur.rowcount}
+
+    def check_daily_stats(self) -> List[Dict[str, Any]]:
+        """Rollup'ni tasks bilan solishtirish: [{user_id, day ('*' = total), expected, actual}] — farqlar."""
+        with self._read() as c:
+            cur = c.cursor()
+            cur.execute(f"""
+                SELECT assigned_to AS user_id, date(completed_at) AS day, COUNT(*) AS n FROM ({ALL_TASKS_SQL})
+                WHERE assigned_to IS NOT NULL AND status='done' AND date(completed_at) IS NOT NULL
+                GROUP BY assigned_to, date(completed_at)
+                UNION ALL
+                SELECT assigned_to, '*', COUNT(*) FROM ({ALL_TASKS_SQL}) WHERE assigned_to IS NOT NULL GROUP BY assigned_to
+            """)
+            expected = {(r["user_id"], r["day"]): r["n"] for r in cur.fetchall()}
             cur.execute("""
-                SELECT COUNT(*) AS c FROM tasks
-                WHERE assigned_to=? AND status='done' AND date(completed_at)=date('now','localtime')
-            """, (telegram_id,))
+                SELECT user_id, day, completed AS n FROM daily_stats
+                UNION ALL
+                SELECT user_id, '*', total FROM user_task_totals
+            """)
+            actual = {(r["user_id"], r["day"]): r["n"] for r in cur.fetchall()}
+        out = []
+        for key in sorted(expected.keys() | actual.keys(), key=lambda k: (k[0], k[1])):
+            e, a = expected.get(key, 0), actual.get(key, 0)
+            if e != a:
+                out.append({"user_id": key[0], "day": key[1], "expected": e, "actual": a})
+        return out
+
+    # ------- Reports -------
+    def count_completed_today(self, telegram_id: int) -> int:
+        with self._read() as c:
+            cur = c.cursor()
+            cur.execute("SELECT completed FROM daily_stats WHERE user_id=? AND day=date('now','localtime')",
+                        (telegram_id,))
             r = cur.fetchone()
-            return int(r["c"]) if r else 0
+            return int(r["completed"]) if r else 0
 
     def save_report(self, user_id: int, content: str, tasks_completed: int) -> None:
         with self._conn() as c:
@@ -246,34 +769,247 @@ class Database:
             """, (user_id, content, tasks_completed))
 
     def build_daily_summary(self) -> List[Dict[str, Any]]:
-        with self._conn() as c:
+        with self._read() as c:
             cur = c.cursor()
+            # O(xodimlar): rollup jadvallaridan bittadan PK lookup
             cur.execute("""
-                SELECT u.username,
-                       SUM(CASE WHEN t.status='done' AND date(t.completed_at)=date('now','localtime') THEN 1 ELSE 0 END) AS completed,
-                       COUNT(t.id) AS total
+                SELECT u.username, COALESCE(d.completed, 0) AS completed, COALESCE(s.total, 0) AS total
                 FROM users u
-                LEFT JOIN tasks t ON t.assigned_to=u.telegram_id
+                LEFT JOIN daily_stats d ON d.user_id=u.telegram_id AND d.day=date('now','localtime')
+                LEFT JOIN user_task_totals s ON s.user_id=u.telegram_id
                 WHERE u.role='EMPLOYEE' AND COALESCE(u.active,1)=1
-                GROUP BY u.telegram_id
                 ORDER BY lower(u.username)
             """)
             return cur.fetchall() or []
 
-    def get_status_overview(self) -> List[Dict[str, Any]]:
-        with self._conn() as c:
+    def get_status_overview(self, limit: Optional[int] = None, offset: int = 0,
+                            tasks_per_employee: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        [{"employee": user, "tasks": [...]}] — ikki so'rovda (xodimlar + ularning barcha vazifalari).
+        limit/offset: xodimlar bo'yicha sahifalash; tasks_per_employee: har xodimga eng ko'p N ta vazifa.
+        """
+        with self._read() as c:
             cur = c.cursor()
-            cur.execute("SELECT * FROM users WHERE role='EMPLOYEE' AND COALESCE(active,1)=1 ORDER BY lower(username)")
+            page = (-1 if limit is None else int(limit), int(offset))
+            emp_sql = """
+                SELECT * FROM users WHERE role='EMPLOYEE' AND COALESCE(active,1)=1
+                ORDER BY lower(username) LIMIT ? OFFSET ?
+            """
+            cur.execute(emp_sql, page)
+            out = {e["telegram_id"]: {"employee": e, "tasks": []} for e in cur.fetchall() or []}
+            if not out:
+                return []
+            self._fill_overview(cur, out, f"IN (SELECT telegram_id FROM ({emp_sql}))", page, tasks_per_employee)
+            return list(out.values())
+
+    def get_status_page(self, after: Optional[EmployeeCursor] = None, before: Optional[EmployeeCursor] = None,
+                        limit: int = 10, tasks_per_employee: Optional[int] = 10) -> Page:
+        """
+        get_status_overview'ning keyset varianti: (items, prev, next), kursor — (lower(username), telegram_id).
+        Har sahifa xodimlar bo'yicha limit ta va har xodimga tasks_per_employee ta vazifa bilan chegaralangan.
+        """
+        forward = before is None or after is not None
+        cursor = after if forward else before
+        key = "COALESCE(lower(username),'')"
+        sql = f"SELECT *, {key} AS _key FROM users WHERE role='EMPLOYEE' AND COALESCE(active,1)=1"
+        params: List[Any] = []
+        if cursor is not None:
+            sql += f" AND ({key}, telegram_id) {'>' if forward else '<'} (?, ?)"
+            params += [cursor[0], cursor[1]]
+        sql += f" ORDER BY {key}, telegram_id" if forward else f" ORDER BY {key} DESC, telegram_id DESC"
+        with self._read() as c:
+            cur = c.cursor()
+            cur.execute(sql + " LIMIT ?", (*params, int(limit) + 1))
             emps = cur.fetchall() or []
-            out = []
-            for e in emps:
-                cur.execute("""
-                    SELECT * FROM tasks
-                    WHERE assigned_to=? AND status!='archived'
-                    ORDER BY CASE WHEN status='done' THEN 1 ELSE 0 END, created_at DESC
-                """, (e["telegram_id"],))
-                out.append({"employee": e, "tasks": cur.fetchall() or []})
-            return out
+            more = len(emps) > limit
+            emps = emps[:limit]
+            if not forward:
+                emps.reverse()
+            if not emps:
+                return [], None, None
+            out = {e["telegram_id"]: {"employee": e, "tasks": []} for e in emps}
+            if tasks_per_employee is None:
+                self._fill_overview(cur, out, f"IN ({','.join('?' * len(out))})", tuple(out), None)
+            else:
+                # Har xodimga alohida LIMIT'li seek (ROW_NUMBER barcha vazifalarni o'qib chiqadi)
+                one = (f"SELECT * FROM (SELECT * FROM tasks WHERE assigned_to=? AND status!='archived' "
+                       f"ORDER BY {DONE_FLAG}, created_at DESC, id DESC LIMIT ?)")
+                cur.execute(" UNION ALL ".join([one] * len(out)),
+                            [x for tid in out for x in (tid, int(tasks_per_employee))])
+                for t in cur:
+                    out[t["assigned_to"]]["tasks"].append(t)
+        keys = [(e.pop("_key"), e["telegram_id"]) for e in emps]
+        first, last = keys[0], keys[-1]
+        items = list(out.values())
+        if forward:
+            return items, first if cursor is not None else None, last if more else None
+        return items, first if more else None, last
+
+    @staticmethod
+    def _fill_overview(cur, out: Dict[int, Dict[str, Any]], ids_sql: str, params: tuple,
+                       tasks_per_employee: Optional[int]) -> None:
+        """out[telegram_id]["tasks"] ni bitta so'rovda to'ldiradi (assigned_to {ids_sql})."""
+        order = "CASE WHEN t.status='done' THEN 1 ELSE 0 END, t.created_at DESC"
+        where = f"t.assigned_to {ids_sql} AND t.status!='archived'"
+        if tasks_per_employee is None:
+            cur.execute(f"SELECT t.* FROM tasks t WHERE {where} ORDER BY t.assigned_to, {order}", params)
+        else:
+            cur.execute(f"""
+                SELECT * FROM (
+                    SELECT t.*, ROW_NUMBER() OVER (PARTITION BY t.assigned_to ORDER BY {order}) AS _rn
+                    FROM tasks t WHERE {where}
+                ) WHERE _rn <= ? ORDER BY assigned_to, _rn
+            """, (*params, int(tasks_per_employee)))
+        for t in cur:
+            t.pop("_rn", None)
+            out[t["assigned_to"]]["tasks"].append(t)
+
+    # ------- Full-text search -------
+    def search_tasks(self, query: str, limit: int = 10, cursor: Optional[SearchCursor] = None,
+                     since: Optional[str] = None, window: int = SEARCH_WINDOW) -> Page:
+        """
+        tasks + tasks_archive bo'yicha FTS5 qidiruv: (rows, prev, next), har qatorda score (bm25, kichigi
+        yaxshiroq), snippet (*topilgan* so'zlar bilan) va archived. Eng yangi `window` ta moslik ichida
+        tartiblanadi — juda ko'p uchraydigan so'zda ham ish hajmi chegaralangan.
+        since (UTC, DB formati) — shu vaqtdan keyin yaratilganlar.
+        """
+        match = fts_query(query)
+        if not match:
+            return [], None, None
+        with self._read() as c:
+            cur = c.cursor()
+            if cursor is None:
+                floor, offset = self._fts_floor(cur, "tasks_fts", match, window), 0
+                if since:
+                    floor = max(floor, self._first_id_since(cur, since))
+            else:
+                floor, offset = int(cursor[0]), int(cursor[1])
+            cur.execute("""
+                SELECT rowid AS id, rank AS score, snippet(tasks_fts, -1, '*', '*', '…', 10) AS snippet
+                FROM tasks_fts WHERE tasks_fts MATCH ? AND rowid >= ? ORDER BY rank LIMIT ? OFFSET ?
+            """, (match, floor, int(limit) + 1, offset))
+            hits = cur.fetchall() or []
+            more = len(hits) > limit
+            hits = hits[:limit]
+            if not hits:
+                return [], None, None
+            marks = ",".join("?" * len(hits))
+            ids = tuple(h["id"] for h in hits)
+            cur.execute(f"""
+                SELECT id, title, status, priority, assigned_to, created_at, 0 AS archived FROM tasks WHERE id IN ({marks})
+                UNION ALL
+                SELECT id, title, status, priority, assigned_to, created_at, 1 FROM tasks_archive WHERE id IN ({marks})
+            """, ids + ids)
+            tasks = {t["id"]: t for t in cur.fetchall()}
+        rows = [dict(tasks[h["id"]], score=round(h["score"], 3), snippet=h["snippet"]) for h in hits if h["id"] in tasks]
+        prev = (floor, max(0, offset - limit)) if offset > 0 else None
+        return rows, prev, (floor, offset + limit) if more else None
+
+    def search_reports(self, query: str, limit: int = 5, since: Optional[str] = None,
+                       window: int = SEARCH_WINDOW) -> List[Dict[str, Any]]:
+        """Kunlik hisobotlar (reports.content) bo'yicha FTS5: [{id, user_id, username, date, score, snippet}]."""
+        match = fts_query(query)
+        if not match:
+            return []
+        with self._read() as c:
+            cur = c.cursor()
+            floor = self._fts_floor(cur, "reports_fts", match, window)
+            cur.execute("""
+                SELECT f.rowid AS id, f.rank AS score, snippet(reports_fts, 0, '*', '*', '…', 10) AS snippet,
+                       r.user_id, r.date, u.username
+                FROM reports_fts f JOIN reports r ON r.id=f.rowid LEFT JOIN users u ON u.telegram_id=r.user_id
+                WHERE reports_fts MATCH ? AND f.rowid >= ? AND r.date >= date(COALESCE(?, '0000-01-01'))
+                ORDER BY f.rank LIMIT ?
+            """, (match, floor, since, int(limit)))
+            return [dict(r, score=round(r["score"], 3)) for r in cur.fetchall() or []]
+
+    @staticmethod
+    def _fts_floor(cur, table: str, match: str, window: int) -> int:
+        """Eng yangi `window` ta moslikning eng kichik rowid'i (moslik kam bo'lsa 0)."""
+        cur.execute(f"SELECT rowid AS id FROM {table} WHERE {table} MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                    (match, max(0, int(window) - 1)))
+        r = cur.fetchone()
+        return r["id"] if r else 0
+
+    @staticmethod
+    def _first_id_since(cur, since: str) -> int:
+        """created_at >= since bo'lgan birinchi id (id vaqt bo'yicha o'sadi): PK bo'yicha ikkilik qidiruv, hot + arxiv."""
+        cur.execute("SELECT MAX(m) AS m FROM (SELECT MAX(id) AS m FROM tasks UNION ALL SELECT MAX(id) FROM tasks_archive)")
+        lo, hi = 0, (cur.fetchone()["m"] or 0) + 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cur.execute("""
+                SELECT created_at FROM (
+                    SELECT * FROM (SELECT id, created_at FROM tasks WHERE id >= ? ORDER BY id LIMIT 1)
+                    UNION ALL
+                    SELECT * FROM (SELECT id, created_at FROM tasks_archive WHERE id >= ? ORDER BY id LIMIT 1)
+                ) ORDER BY id LIMIT 1
+            """, (mid, mid))
+            r = cur.fetchone()
+            if r is None or (r["created_at"] or "") >= since:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def rebuild_fts(self, batch: int = 5000) -> Dict[str, int]:
+        """tasks_fts/reports_fts'ni noldan qurish (manage.py rebuild-fts); bo'laklar alohida tranzaksiyada."""
+        chunks = migrations.rebuild_fts(self._conn, batch)
+        return dict(self.check_fts(), chunks=chunks)
+
+    def check_fts(self) -> Dict[str, int]:
+        """FTS5 integrity-check + indeksdagi va jadvallardagi qatorlar soni."""
+        with self._conn() as c:
+            c.execute("INSERT INTO tasks_fts(tasks_fts) VALUES('integrity-check')")
+            c.execute("INSERT INTO reports_fts(reports_fts) VALUES('integrity-check')")
+            one = lambda sql: c.execute(sql).fetchone()["n"]
+            return {
+                "tasks_indexed": one("SELECT count(*) AS n FROM tasks_fts"),
+                "tasks": one("SELECT (SELECT count(*) FROM tasks) + (SELECT count(*) FROM tasks_archive) AS n"),
+                "reports_indexed": one("SELECT count(*) AS n FROM reports_fts"),
+                "reports": one("SELECT count(*) AS n FROM reports"),
+            }
+
+    # ------- Conversation states (states.py) -------
+    def load_conversation_states(self, now: float) -> List[Dict[str, Any]]:
+        with self._read() as c:
+            cur = c.cursor()
+            cur.execute("SELECT user_id, state, payload, expires_at FROM conversation_states WHERE expires_at > ?", (now,))
+            return cur.fetchall() or []
+
+    def save_conversation_states(self, upserts: List[Tuple[int, str, Optional[str], float]],
+                                 deletes: List[int], now: float) -> None:
+        """states.ConversationStore.flush: yig'ilgan o'zgarishlar + muddati o'tganlarni tozalash — bitta tranzaksiya."""
+        with self._conn() as c:
+            if upserts:
+                c.executemany("""
+                    INSERT INTO conversation_states(user_id, state, payload, expires_at) VALUES(?,?,?,?)
+                    ON CONFLICT(user_id) DO UPDATE SET state=excluded.state, payload=excluded.payload,
+                                                       expires_at=excluded.expires_at
+                """, upserts)
+            if deletes:
+                c.executemany("DELETE FROM conversation_states WHERE user_id=?", [(d,) for d in deletes])
+            c.execute("DELETE FROM conversation_states WHERE expires_at <= ?", (now,))
+
+    # ------- Blocked chats -------
+    def mark_chat_blocked(self, chat_id: int, reason: Optional[str] = None) -> None:
+        with self._conn() as c:
+            c.execute("""
+                INSERT INTO blocked_chats(chat_id, reason) VALUES(?,?)
+                ON CONFLICT(chat_id) DO UPDATE SET reason=excluded.reason, blocked_at=datetime('now')
+            """, (chat_id, reason or None))
+
+    def unmark_chat_blocked(self, chat_id: int) -> bool:
+        with self._conn() as c:
+            cur = c.cursor()
+            cur.execute("DELETE FROM blocked_chats WHERE chat_id=?", (chat_id,))
+            return cur.rowcount > 0
+
+    def list_blocked_chats(self) -> List[Dict[str, Any]]:
+        with self._read() as c:
+            cur = c.cursor()
+            cur.execute("SELECT * FROM blocked_chats ORDER BY blocked_at DESC")
+            return cur.fetchall() or []
 
     # ------- Invites (direct link) -------
     def _gen_token(self) -> str:
@@ -294,20 +1030,34 @@ class Database:
     # ------- Pending/Approval helpers -------
     def user_is_approved(self, telegram_id: int) -> bool:
         """Managerlar har doim approved. Employee bo‘lsa va pending yo‘q bo‘lsa True."""
-        with self._conn() as c:
+        rec = self.users.get(telegram_id)
+        if rec and rec["approved"] is not None:
+            return rec["approved"]
+        gen = self.users.generation(telegram_id)
+        with self._read() as c:
             cur = c.cursor()
-            cur.execute("SELECT role FROM users WHERE telegram_id=?", (telegram_id,))
+            cur.execute("SELECT * FROM users WHERE telegram_id=?", (telegram_id,))
             u = cur.fetchone()
             if not u: return False
-            if (u.get("role") or "") == "MANAGER":
-                return True
-            if (u.get("role") or "") != "EMPLOYEE":
-                return False
-            cur.execute("SELECT 1 FROM invite_requests WHERE user_id=? AND status='pending' LIMIT 1", (telegram_id,))
-            return cur.fetchone() is None
+            role = u.get("role") or ""
+            if role == "MANAGER":
+                approved = True
+            elif role != "EMPLOYEE":
+                approved = False
+            else:
+                cur.execute("SELECT 1 FROM invite_requests WHERE user_id=? AND status='pending' LIMIT 1", (telegram_id,))
+                approved = cur.fetchone() is None
+        self.users.put(telegram_id, u, approved, gen=gen)
+        return approved
+
+    def get_invite_request(self, req_id: int) -> Optional[Dict[str, Any]]:
+        with self._read() as c:
+            cur = c.cursor()
+            cur.execute("SELECT * FROM invite_requests WHERE id=?", (req_id,))
+            return cur.fetchone()
 
     def get_invite_request_by_user(self, user_id: int) -> Optional[Dict[str, Any]]:
-        with self._conn() as c:
+        with self._read() as c:
             cur = c.cursor()
             cur.execute("SELECT * FROM invite_requests WHERE user_id=? AND status='pending' ORDER BY created_at DESC LIMIT 1",
                         (user_id,))
@@ -320,7 +1070,9 @@ class Database:
                 INSERT INTO invite_requests(user_id, username, full_name, status)
                 VALUES(?,?,?, 'pending')
             """, (user_id, username or None, full_name or None))
-            return cur.lastrowid
+            rid = cur.lastrowid
+        self.users.invalidate(user_id)
+        return rid
 
     def ensure_pending_request(self, user_id: int, username: Optional[str], full_name: Optional[str]) -> Tuple[bool, int]:
         """Agar pending mavjud bo‘lsa (False, id), bo‘lmasa yaratib (True, id) qaytaradi."""
@@ -334,10 +1086,12 @@ class Database:
                 INSERT INTO invite_requests(user_id, username, full_name, status, created_at)
                 VALUES(?,?,?, 'pending', datetime('now'))
             """, (user_id, username or None, full_name or None))
-            return (True, cur.lastrowid)
+            rid = cur.lastrowid
+        self.users.invalidate(user_id)
+        return (True, rid)
 
     def list_invite_requests(self) -> List[Dict[str, Any]]:
-        with self._conn() as c:
+        with self._read() as c:
             cur = c.cursor()
             cur.execute("SELECT * FROM invite_requests WHERE status='pending' ORDER BY created_at ASC")
             return cur.fetchall() or []
@@ -358,6 +1112,7 @@ class Database:
             uid = req["user_id"]
             cur.execute("UPDATE invite_requests SET status='approved', decided_at=datetime('now') WHERE id=?", (req["id"],))
             cur.execute("UPDATE users SET role='EMPLOYEE', active=1 WHERE telegram_id=?", (uid,))
+        self.users.invalidate(uid)
 
     def reject_pending_user(self, key: int, reason: Optional[str] = None) -> None:
         """key = request_id yoki user_id; topilgan pending yozuvni 'rejected' qiladi."""
@@ -376,6 +1131,7 @@ class Database:
                 SET status='rejected', reason=?, decided_at=datetime('now')
                 WHERE id=?
             """, (reason or "", req["id"]))
+        self.users.invalidate(req["user_id"])
 
     # --- Wrappers for backward-compat with your current bot.py ---
     def approve_invite_request(self, req_id: int) -> str:
@@ -403,8 +1159,100 @@ class Database:
                 VALUES(?,?,?,?,?, datetime('now'))
             """, (req.get("username"), req.get("full_name"), token, "active", uid))
             link = f"https://t.me/{(BOT_USERNAME or '<BOT_USERNAME>')}?start={token}"
-            return link
+        self.users.invalidate(uid)
+        return link
 
     def reject_invite_request(self, req_id: int, reason: Optional[str] = None) -> None:
         """Eski nomga mos wrapper."""
         self.reject_pending_user(req_id, reason)
+
+
+class AsyncDatabase:
+    """
+    Database ustidan asyncio fasad: handlerlar `await db.method(...)` qiladi, event loop bloklanmaydi.
+    - O'qishlar: kichik thread pool (har bir thread o'z o'quvchi ulanishi bilan).
+    - Yozuvlar: bitta writer task navbatdan olib, alohida thread'da ketma-ket bajaradi.
+    Metodlar nomi va argumentlari Database bilan bir xil.
+    """
+    WRITE_METHODS = frozenset({
+        "upsert_user", "set_user_role", "sync_manager_roles", "set_user_language", "remove_employee_by_username",
+        "create_task", "assign_task", "set_task_status", "mark_task_done_with_report", "save_report",
+        "create_tasks_bulk", "set_status_bulk", "schedule_deadline_pings_bulk",
+        "create_invite_for", "create_invite_request", "ensure_pending_request",
+        "approve_pending_user", "reject_pending_user", "approve_invite_request", "reject_invite_request",
+        "mark_chat_blocked", "unmark_chat_blocked",
+        "schedule_deadline_pings", "cancel_deadline_pings", "mark_deadline_pings_sent",
+        "rebuild_daily_stats", "archive_tasks", "rebuild_fts", "check_fts", "save_conversation_states",
+    })
+
+    def __init__(self, db: Database, readers: int = 4, queue_size: int = 1000):
+        self.db = db
+        self._read_pool = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-read")
+        self._write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+        self._queue_size = queue_size
+        self._queue = None
+        self._writer_task = None
+
+    @property
+    def path(self) -> str:
+        return self.db.path
+
+    async def start(self) -> None:
+        if self._writer_task is None:
+            self._queue = asyncio.Queue(maxsize=self._queue_size)
+            self._writer_task = asyncio.create_task(self._writer_loop(), name="db-writer")
+
+    async def close(self) -> None:
+        if self._writer_task is not None:
+            await self._queue.join()
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        self._read_pool.shutdown(wait=True)
+        self._write_pool.shutdown(wait=True)
+        self.db.close()
+
+    async def _writer_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            fn, args, kwargs, fut = await self._queue.get()
+            try:
+                res = await loop.run_in_executor(self._write_pool, lambda: fn(*args, **kwargs))
+                if not fut.done(): fut.set_result(res)
+            except Exception as e:
+                if not fut.done(): fut.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _write(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        if self._writer_task is None:
+            # start() chaqirilmagan (masalan, skriptlarda) — writer thread'ning o'zi ketma-ketlikni saqlaydi
+            return await loop.run_in_executor(self._write_pool, lambda: fn(*args, **kwargs))
+        fut = loop.create_future()
+        await self._queue.put((fn, args, kwargs, fut))
+        return await fut
+
+    async def upsert_user(self, telegram_id: int, username: Optional[str], full_name: str) -> Dict[str, Any]:
+        """Keshdagi o'zgarmagan foydalanuvchi (har update'dagi ensure_user) writer navbatiga tushmaydi."""
+        row = self.db.cached_user(telegram_id, username, full_name)
+        if row is not None:
+            return row
+        return await self._write(self.db._store_user, telegram_id, username, full_name)
+
+    async def _read(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_pool, lambda: fn(*args, **kwargs))
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.db, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        runner = self._write if name in self.WRITE_METHODS else self._read
+        async def call(*args, **kwargs):
+            return await runner(attr, *args, **kwargs)
+        call.__name__ = name
+        return call
@@ -0,0 +1,122 @@
+# deadlines.py — bitta deadline rejalashtiruvchi sikl: min-heap (faqat uyg'onish vaqtlari) + DB'dan batch o'qish
+import asyncio, heapq, logging, time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("taskbot.deadlines")
+
+Row = Dict[str, Any]
+
+
+class DeadlineScheduler:
+    """
+    Haqiqat manbai — deadline_pings jadvali. Xotirada faqat yaqin `horizon` soniyadagi
+    fire vaqtlari (float) heap'da turadi: har eslatmaga bitta float, job obyekti yo'q.
+    Uyg'onganda muddati kelgan eslatmalar fetch_due orqali batch_size bo'laklab olinadi va
+    fire(app, rows) ga bitta paket bo'lib beriladi; fire ularni sent deb belgilashi shart.
+    Bekor qilingan/ko'chirilgan eslatmalar heap'dan o'chirilmaydi — ortiqcha uyg'onish
+    bo'sh so'rov bilan tugaydi.
+    """
+    def __init__(self, fetch_times: Callable[[str, str], Awaitable[List[Row]]],
+                 fetch_due: Callable[[str, str, int], Awaitable[List[Row]]],
+                 fire: Callable[[Any, List[Row]], Awaitable[None]],
+                 tz, horizon: float = 3600.0, grace: float = 12 * 3600, batch_size: int = 500):
+        self.fetch_times = fetch_times  # (since, until) -> [{fire_at}]
+        self.fetch_due = fetch_due      # (since, until, limit) -> [{task_id, kind, ...}]
+        self.fire = fire
+        self.tz = tz
+        self.horizon = horizon
+        self.grace = grace
+        self.batch_size = batch_size
+        self._heap: List[float] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._app = None
+        self._window_end = 0.0
+        self.fired = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def _ts(self, fire_at: str) -> float:
+        return datetime.fromisoformat(fire_at).replace(tzinfo=self.tz).timestamp()
+
+    def _fmt(self, ts: float) -> str:
+        return datetime.fromtimestamp(ts, self.tz).strftime("%Y-%m-%d %H:%M:%S")
+
+    async def start(self, app) -> None:
+        if self._task:
+            return
+        self._app = app
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="deadline-scheduler")
+
+    async def stop(self) -> None:
+        if not self._task:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def notify(self, fire_ats: Iterable[str]) -> None:
+        """Yangi/ko'chirilgan eslatmalar: oyna ichida bo'lsa heap'ga qo'shib, siklni uyg'otadi."""
+        pushed = False
+        for s in fire_ats:
+            ts = self._ts(s)
+            if ts < self._window_end:
+                heapq.heappush(self._heap, ts)
+                pushed = True
+        if pushed and self._wake:
+            self._wake.set()
+
+    async def _refill(self, now: float) -> None:
+        """[now, now+horizon) oynasidagi fire vaqtlarini DB'dan qayta yuklash (heap qaytadan quriladi)."""
+        end = now + self.horizon
+        rows = await self.fetch_times(self._fmt(now), self._fmt(end))
+        self._heap = [self._ts(r["fire_at"]) for r in rows]
+        heapq.heapify(self._heap)
+        self._window_end = end
+
+    async def _fire_due(self, now: float) -> None:
+        since, until = self._fmt(now - self.grace), self._fmt(now + 1)
+        last = None
+        while True:
+            rows = await self.fetch_due(since, until, self.batch_size)
+            if not rows:
+                return
+            key = (rows[0]["task_id"], rows[0]["kind"])
+            if key == last:
+                logger.warning("Deadline batch not marked as sent, stopping at %s", key)
+                return
+            last = key
+            await self.fire(self._app, rows)
+            self.fired += len(rows)
+            if len(rows) < self.batch_size:
+                return
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                now = time.time()
+                if now >= self._window_end:
+                    # startup'da restart paytida o'tib ketganlar ham (grace ichida) shu yerda yuboriladi
+                    await self._fire_due(now)
+                    await self._refill(now)
+                nxt = min(self._heap[0] if self._heap else self._window_end, self._window_end)
+                if nxt > now:
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), nxt - now)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                now = time.time()
+                while self._heap and self._heap[0] <= now:
+                    heapq.heappop(self._heap)
+                await self._fire_due(now)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Deadline scheduler iteration failed: %s", e)
+                await asyncio.sleep(5)
@@ -1,4 +1,11 @@
 # languages.py
+import logging
+from string import Formatter
+from typing import Dict, List, Tuple, Union
+
+logger = logging.getLogger("taskbot.languages")
+_FMT = Formatter()
+
 DEFAULT_LANG = "uz"
 
 STRINGS = {
@@ -8,10 +15,21 @@ STRINGS = {
         "choose_language": "Tilni tanlang:",
         "language_set": "Til o‘rnatildi: {lang}",
         "only_manager": "Kechirasiz, bu bo‘lim faqat menejerlar uchun.",
+        "roles_reloaded": "🔄 Rollar qayta yuklandi: {ids} ta ID, {usernames} ta username, DB'dan {db} ta manager.",
         "unknown_command": "Tushunarsiz buyruq. Pastdagi tugmalardan foydalaning.",
 
         # Menyular
         "btn_back": "◀️ Orqaga",
+        "btn_assign": "📝 Vazifa berish",
+        "btn_status": "📊 Holat",
+        "btn_reports": "🧾 Hisobotlar",
+        "btn_employees": "👤 Hodimlar",
+        "btn_requests": "📨 So‘rovlar",
+        "btn_change_lang": "🌐 Til",
+        "btn_my_tasks": "✅ Mening vazifalarim",
+        "btn_send_report": "🧾 Hisobot yuborish",
+        "btn_page_prev": "⬅️ Oldingi",
+        "btn_page_next": "Keyingi ➡️",
         "btn_emp_list": "📋 Ro‘yxat",
         "btn_emp_add": "➕ Qo‘shish",
         "btn_emp_remove": "🗑️ O‘chirish",
@@ -28,14 +46,25 @@ STRINGS = {
         "invite_created": "Taklif havolasi @{username} uchun tayyor:\n{link}",
 
         # Tasks
-        "assign_task_prompt": "Quyidagi formatda yuboring:\n/task @username \"vazifa\" 10:00 24.09.2025 [High]",
+        "assign_task_prompt": "Quyidagi formatda yuboring:\n/task @username \"vazifa\" 10:00 24.09.2025 [High]\nBir nechta xodimga: /task @ali @vali \"vazifa\" 22:00",
         "task_assigned": "Yangi vazifa: {title}\nMuddat: {deadline}\nUstuvorlik: {priority}",
         "task_created": "✅ Vazifa yaratildi (ID: {task_id}).",
+        "tasks_created_bulk": "✅ {count} ta vazifa yaratildi (ID: {ids}).",
+        "assignees_not_found": "⚠️ Topilmadi (vazifa tayinlanmagan): {names}",
+        "assignee_confirm": "❓ «{name}» kim? Vazifa #{task_id} hozircha tayinlanmagan — ijrochini tanlang:",
+        "assignee_set": "✅ Vazifa #{task_id} ijrochisi: {name}",
+        "assignee_taken": "Vazifa #{task_id} allaqachon tayinlangan.",
+        "search_usage": "Qidiruv: /search [7d] so‘zlar — masalan /search 30d muzlatkich harorat",
+        "search_header": "🔎 «{query}» bo‘yicha vazifalar:",
+        "search_reports_header": "📝 Hisobotlarda:",
+        "search_empty": "«{query}» bo‘yicha hech narsa topilmadi.",
+        "search_archived": "arxiv",
         "no_tasks": "Hozircha vazifalar yo‘q.",
         "your_tasks_header": "Sizning vazifalaringiz:",
         "done_usage": "Foydalanish: /done <task_id>",
         "done_ok": "✅ #{task_id} vazifasi bajarildi!",
         "done_fail": "❌ #{task_id} topilmadi yoki sizga tegishli emas.",
+        "report_saved": "✅ Hisobot saqlandi.",
         "task_done_notify_manager": "Xodim @{username} #{task_id} vazifasini tugatdi.",
 
         # Status/Report
@@ -43,6 +72,10 @@ STRINGS = {
         "reminder_morning": "⏰ 9:00 eslatma: vazifalaringizni ko‘rib chiqing.",
         "reminder_evening": "⏰ 18:00 eslatma: bugungi hisobotni yuboring.",
         "deadline_ping": "⏳ Eslatma: vazifa yaqinlashdi — {task}",
+        "deadline_due": "⏰ Vazifa muddati keldi — {task}",
+        "voice_processing": "⏳ Ovozli xabar qayta ishlanmoqda…",
+        "voice_busy": "⚠️ Hozir navbat to‘la. Birozdan so‘ng qayta yuboring.",
+        "voice_failed": "⚠️ Ovozli xabarni qayta ishlab bo‘lmadi. Matn bilan yuboring yoki qayta urinib ko‘ring.",
 
         # Invites / Requests (yangi)
         "invites_title": "🧾 Pending so‘rovlar:",
@@ -61,9 +94,20 @@ STRINGS = {
         "choose_language": "Выберите язык:",
         "language_set": "Язык установлен: {lang}",
         "only_manager": "Извините, раздел доступен только менеджерам.",
+        "roles_reloaded": "🔄 Роли перезагружены: ID — {ids}, username — {usernames}, менеджеров из БД — {db}.",
         "unknown_command": "Неизвестная команда. Используйте кнопки ниже.",
 
         "btn_back": "◀️ Назад",
+        "btn_assign": "📝 Назначить",
+        "btn_status": "📊 Статус",
+        "btn_reports": "🧾 Отчёты",
+        "btn_employees": "👤 Сотрудники",
+        "btn_requests": "📨 Запросы",
+        "btn_change_lang": "🌐 Язык",
+        "btn_my_tasks": "✅ Мои задачи",
+        "btn_send_report": "🧾 Отчёт",
+        "btn_page_prev": "⬅️ Предыдущие",
+        "btn_page_next": "Следующие ➡️",
         "btn_emp_list": "📋 Список",
         "btn_emp_add": "➕ Добавить",
         "btn_emp_remove": "🗑️ Удалить",
@@ -79,20 +123,35 @@ STRINGS = {
         "emp_remove_fail": "❌ @{username} не найден.",
         "invite_created": "Инвайт-ссылка для @{username}:\n{link}",
 
-        "assign_task_prompt": "Формат:\n/task @username \"задача\" 10:00 24.09.2025 [High]",
+        "assign_task_prompt": "Формат:\n/task @username \"задача\" 10:00 24.09.2025 [High]\nНескольким сотрудникам: /task @ali @vali \"задача\" 22:00",
         "task_assigned": "Новая задача: {title}\nДедлайн: {deadline}\nПриоритет: {priority}",
         "task_created": "✅ Задача создана (ID: {task_id}).",
+        "tasks_created_bulk": "✅ Создано задач: {count} (ID: {ids}).",
+        "assignees_not_found": "⚠️ Не найдены (задача без исполнителя): {names}",
+        "assignee_confirm": "❓ Кто такой «{name}»? Задача #{task_id} пока без исполнителя — выберите:",
+        "assignee_set": "✅ Исполнитель задачи #{task_id}: {name}",
+        "assignee_taken": "У задачи #{task_id} уже есть исполнитель.",
+        "search_usage": "Поиск: /search [7d] слова — например /search 30d холодильник температура",
+        "search_header": "🔎 Задачи по запросу «{query}»:",
+        "search_reports_header": "📝 В отчётах:",
+        "search_empty": "По запросу «{query}» ничего не найдено.",
+        "search_archived": "архив",
         "no_tasks": "Пока нет задач.",
         "your_tasks_header": "Ваши задачи:",
         "done_usage": "Использование: /done <task_id>",
         "done_ok": "✅ Задача #{task_id} выполнена!",
         "done_fail": "❌ #{task_id} не найдена или не принадлежит вам.",
+        "report_saved": "✅ Отчёт сохранён.",
         "task_done_notify_manager": "Сотрудник @{username} выполнил задачу #{task_id}.",
 
         "manager_status_header": "Статус сотрудников:",
         "reminder_morning": "⏰ Напоминание 9:00: проверьте задачи.",
         "reminder_evening": "⏰ Напоминание 18:00: отправьте отчёт.",
         "deadline_ping": "⏳ Напоминание: приближается срок — {task}",
+        "deadline_due": "⏰ Срок задачи наступил — {task}",
+        "voice_processing": "⏳ Голосовое сообщение обрабатывается…",
+        "voice_busy": "⚠️ Очередь заполнена. Повторите чуть позже.",
+        "voice_failed": "⚠️ Не удалось обработать голосовое сообщение. Отправьте текстом или попробуйте ещё раз.",
 
         "invites_title": "🧾 Запросы на одобрение:",
         "pending_info": "🕒 Ваша заявка *ожидает одобрения*. После одобрения панель откроется.",
@@ -110,9 +169,20 @@ STRINGS = {
         "choose_language": "Тілді таңдаңыз:",
         "language_set": "Тіл орнатылды: {lang}",
         "only_manager": "Кешіріңіз, бұл бөлім тек менеджерлерге.",
+        "roles_reloaded": "🔄 Рөлдер қайта жүктелді: ID — {ids}, username — {usernames}, ДҚ-дан менеджер — {db}.",
         "unknown_command": "Белгісіз команда. Төмендегі түймелерді пайдаланыңыз.",
 
         "btn_back": "◀️ Артқа",
+        "btn_assign": "📝 Тапсырма беру",
+        "btn_status": "📊 Күй",
+        "btn_reports": "🧾 Есептер",
+        "btn_employees": "👤 Қызметкерлер",
+        "btn_requests": "📨 Сұраулар",
+        "btn_change_lang": "🌐 Тіл",
+        "btn_my_tasks": "✅ Менің тапсырмаларым",
+        "btn_send_report": "🧾 Есеп",
+        "btn_page_prev": "⬅️ Алдыңғы",
+        "btn_page_next": "Келесі ➡️",
         "btn_emp_list": "📋 Тізім",
         "btn_emp_add": "➕ Қосу",
         "btn_emp_remove": "🗑️ Жою",
@@ -128,20 +198,35 @@ STRINGS = {
         "emp_remove_fail": "❌ @{username} табылмады.",
         "invite_created": "@{username} үшін шақыру сілтемесі:\n{link}",
 
-        "assign_task_prompt": "Формат:\n/task @username \"тапсырма\" 10:00 24.09.2025 [High]",
+        "assign_task_prompt": "Формат:\n/task @username \"тапсырма\" 10:00 24.09.2025 [High]\nБірнеше қызметкерге: /task @ali @vali \"тапсырма\" 22:00",
         "task_assigned": "Жаңа тапсырма: {title}\nДедлайн: {deadline}\nБасымдылық: {priority}",
         "task_created": "✅ Тапсырма құрылды (ID: {task_id}).",
+        "tasks_created_bulk": "✅ {count} тапсырма құрылды (ID: {ids}).",
+        "assignees_not_found": "⚠️ Табылмады (тапсырма тағайындалмады): {names}",
+        "assignee_confirm": "❓ «{name}» кім? #{task_id} тапсырма әзірге тағайындалмады — орындаушыны таңдаңыз:",
+        "assignee_set": "✅ #{task_id} тапсырманың орындаушысы: {name}",
+        "assignee_taken": "#{task_id} тапсырманың орындаушысы бар.",
+        "search_usage": "Іздеу: /search [7d] сөздер — мысалы /search 30d тоңазытқыш температура",
+        "search_header": "🔎 «{query}» бойынша тапсырмалар:",
+        "search_reports_header": "📝 Есептерде:",
+        "search_empty": "«{query}» бойынша ештеңе табылмады.",
+        "search_archived": "мұрағат",
         "no_tasks": "Әзірге тапсырмалар жоқ.",
         "your_tasks_header": "Сіздің тапсырмаларыңыз:",
         "done_usage": "Пайдалану: /done <task_id>",
         "done_ok": "✅ #{task_id} тапсырмасы орындалды!",
         "done_fail": "❌ #{task_id} табылмады немесе сізге тиесілі емес.",
+        "report_saved": "✅ Есеп сақталды.",
         "task_done_notify_manager": "Қызметкер @{username} #{task_id} тапсырмасын аяқтады.",
 
         "manager_status_header": "Қызметкерлердің жағдайы:",
         "reminder_morning": "⏰ 9:00 еске салу: тапсырмаларыңызды тексеріңіз.",
         "reminder_evening": "⏰ 18:00 еске салу: бүгінгі есепті жіберіңіз.",
         "deadline_ping": "⏳ Еске салу: мерзім жақындады — {task}",
+        "deadline_due": "⏰ Тапсырма мерзімі келді — {task}",
+        "voice_processing": "⏳ Дауыстық хабар өңделуде…",
+        "voice_busy": "⚠️ Кезек толы. Сәл кейінірек қайта жіберіңіз.",
+        "voice_failed": "⚠️ Дауыстық хабарды өңдеу мүмкін болмады. Мәтінмен жіберіңіз немесе қайталап көріңіз.",
 
         "invites_title": "🧾 Мақұлдауға сұраулар:",
         "pending_info": "🕒 Сұрауыңыз *мақұлдауды күтуде*. Мақұлданған соң панель ашылады.",
@@ -155,10 +240,71 @@ STRINGS = {
     },
 }
 
+class Template:
+    """{placeholder}li matn: maydonlar katalog qurilganda ajratiladi; format xatosida xom matn qaytadi."""
+    __slots__ = ("text", "fields")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.fields = frozenset(f.split(".")[0].split("[")[0] for _, f, _, _ in _FMT.parse(text) if f is not None)
+
+    def __call__(self, kwargs: dict) -> str:
+        try:
+            return self.text.format_map(kwargs)
+        except Exception:
+            return self.text
+
+    def __repr__(self) -> str:
+        return f"Template({self.text!r})"
+
+
+Entry = Union[str, Template]
+
+
+def compile_catalog(strings: Dict[str, Dict[str, str]], default: str = DEFAULT_LANG
+                    ) -> Tuple[Dict[str, Dict[str, Entry]], List[str]]:
+    """
+    Har til uchun bitta tayyor jadval: o'z matni, bo'lmasa default til matni (fallback oldindan qo'shiladi).
+    Qavssiz matn — oddiy str, qolganlari Template. Ikkinchi qiymat — muammolar ro'yxati:
+    tarjimasi yo'q kalitlar va default tildan farqli {placeholder}lar.
+    """
+    base = {k: v for k, v in strings[default].items() if v}
+    base_fields = {k: Template(v).fields for k, v in base.items()}
+    problems: List[str] = []
+    catalog: Dict[str, Dict[str, Entry]] = {}
+    for lang, table in strings.items():
+        own = {k: v for k, v in table.items() if v}
+        problems += [f"{lang}: '{k}' tarjimasi yo'q ({default} matni ishlatiladi)" for k in sorted(base.keys() - own.keys())]
+        problems += [f"{lang}: '{k}' {default} tilida yo'q" for k in sorted(own.keys() - base.keys())]
+        out: Dict[str, Entry] = {}
+        for key, s in dict(base, **own).items():
+            out[key] = Template(s) if "{" in s or "}" in s else s
+            fields = out[key].fields if isinstance(out[key], Template) else frozenset()
+            if key in base_fields and fields != base_fields[key]:
+                problems.append(f"{lang}: '{key}' maydonlari {sorted(fields)}, {default} tilida {sorted(base_fields[key])}")
+        catalog[lang] = out
+    return catalog, problems
+
+
+CATALOG, PROBLEMS = compile_catalog(STRINGS)
+LANGS = tuple(CATALOG)
+_DEFAULT = CATALOG[DEFAULT_LANG]
+for _p in PROBLEMS:
+    logger.warning("languages: %s", _p)
+
+
 def T(lang: str, key: str, **kwargs) -> str:
-    lang = lang if lang in STRINGS else DEFAULT_LANG
-    s = STRINGS[lang].get(key) or STRINGS[DEFAULT_LANG].get(key) or key
-    try:
-        return s.format(**kwargs)
-    except Exception:
-        return s
+    """Tarjima: bitta dict qidiruv; noma'lum til — default, noma'lum kalit — kalitning o'zi."""
+    s = (CATALOG.get(lang) or _DEFAULT).get(key, key)
+    return s if s.__class__ is str else s(kwargs)
+
+
+def text(lang: str, key: str) -> str:
+    """Qat'iy qidiruv (klaviaturalar import paytida quriladi): noma'lum kalit — KeyError."""
+    s = (CATALOG.get(lang) or _DEFAULT)[key]
+    return s if s.__class__ is str else s.text
+
+
+def variants(*keys: str) -> Tuple[str, ...]:
+    """Kalit(lar)ning barcha tillardagi matnlari (tugma matnini tanish uchun), takrorlarsiz."""
+    return tuple(dict.fromkeys(text(lang, k) for k in keys for lang in LANGS))
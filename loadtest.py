@@ -0,0 +1,205 @@
+# loadtest.py — sintetik yuklama: update'larni bot handlerlari orqali o'tkazib throughput va p99'ni o'lchash
+#   python loadtest.py                          # sintetik xodim/manager oqimlari, 1/8/64 parallellik
+#   python loadtest.py --updates updates.jsonl  # RECORD_UPDATES_PATH bilan yozilgan haqiqiy update'lar
+# Telegram'ga so'rov ketmaydi: Bot API javoblari soxta transportdan --api-latency kechikish bilan qaytadi.
+# Bot vaqtinchalik DB bilan ishga tushadi (DATABASE_PATH berilmasa), OpenAI o'chiriladi.
+import argparse, asyncio, itertools, json, os, sys, tempfile, time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+MANAGER_BASE, EMPLOYEE_BASE = 9_000_000, 8_000_000
+
+
+def _fake_request_cls():
+    from telegram.request import BaseRequest, RequestData
+
+    class FakeRequest(BaseRequest):
+        """Har Bot API metodiga `latency` soniyadan keyin muvaffaqiyatli javob."""
+        def __init__(self, latency: float):
+            self.latency = latency
+            self.calls: Dict[str, int] = defaultdict(int)
+            self._ids = itertools.count(1)
+
+        @property
+        def read_timeout(self) -> Optional[float]:
+            return None
+
+        async def initialize(self) -> None:
+            pass
+
+        async def shutdown(self) -> None:
+            pass
+
+        async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                             read_timeout=None, write_timeout=None, connect_timeout=None,
+                             pool_timeout=None) -> Tuple[int, bytes]:
+            name = url.rsplit("/", 1)[-1]
+            self.calls[name] += 1
+            params = request_data.parameters if request_data else {}
+            if name == "getMe":
+                result: Any = {"id": 1, "is_bot": True, "first_name": "TaskBot", "username": "loadtest_bot",
+                               "can_join_groups": False, "can_read_all_group_messages": False,
+                               "supports_inline_queries": False}
+            elif name.startswith(("send", "edit")):
+                await asyncio.sleep(self.latency)
+                chat_id = int(params.get("chat_id") or 0)
+                result = {"message_id": next(self._ids), "date": int(time.time()),
+                          "chat": {"id": chat_id, "type": "private"}, "text": str(params.get("text", ""))}
+            else:
+                await asyncio.sleep(self.latency)
+                result = True
+            return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    return FakeRequest
+
+
+# ---------- sintetik update'lar ----------
+def _user(uid: int) -> Dict[str, Any]:
+    return {"id": uid, "is_bot": False, "first_name": f"U{uid}", "username": f"u{uid}", "language_code": "uz"}
+
+
+def _message(uid: int, mid: int, text: str) -> Dict[str, Any]:
+    msg = {"message_id": mid, "date": int(time.time()), "chat": {"id": uid, "type": "private"},
+           "from": _user(uid), "text": text}
+    if text.startswith("/"):
+        msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return msg
+
+
+def synthetic_updates(task_ids: Dict[int, int], managers: List[int], lang: str = "uz") -> List[Dict[str, Any]]:
+    """
+    Har xodim: "Mening vazifalarim" → qabul → bajarildi → hisobot matni (oxirgisi oldingi update qo'ygan
+    holatga bog'liq — tartib buzilsa vazifa 'done' bo'lmaydi). Managerlar: /status, /search.
+    Foydalanuvchilar aralashtirib (round-robin) yuboriladi.
+    """
+    from languages import T
+    seq = itertools.count(1)
+    flows: List[List[Dict[str, Any]]] = []
+    for uid, tid in task_ids.items():
+        flows.append([
+            {"message": _message(uid, next(seq), T(lang, "btn_my_tasks"))},
+            {"callback_query": {"id": str(next(seq)), "from": _user(uid), "chat_instance": str(uid),
+                                "data": f"task:acc:{tid}", "message": _message(uid, next(seq), "task")}},
+            {"callback_query": {"id": str(next(seq)), "from": _user(uid), "chat_instance": str(uid),
+                                "data": f"task:done:{tid}", "message": _message(uid, next(seq), "task")}},
+            {"message": _message(uid, next(seq), f"Bajarildi: vazifa {tid}")},
+        ])
+    for uid in managers:
+        flows.append([{"message": _message(uid, next(seq), "/status")},
+                      {"message": _message(uid, next(seq), "/search vazifa")},
+                      {"message": _message(uid, next(seq), T(lang, "btn_status"))}])
+    out = []
+    for batch in itertools.zip_longest(*flows):
+        out.extend(u for u in batch if u is not None)
+    for i, u in enumerate(out, 1):
+        u["update_id"] = i
+    return out
+
+
+def percentile(xs: List[float], q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q / 100 * (len(xs) - 1))))] if xs else 0.0
+
+
+async def run_level(app, updates: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    """Hammasi birdan navbatga (Application.update_fetcher kabi har update — alohida task)."""
+    from telegram import Update
+    from updates import PerUserUpdateProcessor, update_key
+
+    proc = PerUserUpdateProcessor(concurrency)
+    objs = [Update.de_json(u, app.bot) for u in updates]
+    started: Dict[Any, List[int]] = defaultdict(list)
+    lat: List[float] = []
+
+    async def handle(u: Update):
+        started[update_key(u)].append(u.update_id)
+        await app.process_update(u)
+
+    async def submit(u: Update):
+        t = time.perf_counter()
+        await proc.process_update(u, handle(u))
+        lat.append(time.perf_counter() - t)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(submit(u) for u in objs))
+    wall = time.perf_counter() - t0
+    disorder = sum(1 for ids in started.values() if ids != sorted(ids))
+    return {"concurrency": concurrency, "updates": len(objs), "wall": wall, "rps": len(objs) / wall,
+            "p50": percentile(lat, 50), "p99": percentile(lat, 99), "peak": proc.peak,
+            "serialized": proc.serialized, "disordered_users": disorder}
+
+
+async def main_async(args) -> int:
+    import bot
+    req = _fake_request_cls()(args.api_latency)
+    app = bot.build_application(req)
+    await app.initialize()          # run_polling bilan bir xil tartib: initialize → post_init → start
+    await bot.on_start(app)
+    await app.start()
+
+    recorded = None
+    if args.updates:
+        with open(args.updates, encoding="utf-8") as f:
+            recorded = [json.loads(line) for line in f if line.strip()]
+
+    managers = [MANAGER_BASE + i for i in range(args.managers)]
+    employees = [EMPLOYEE_BASE + i for i in range(args.employees)]
+    for uid in employees:
+        await bot.db.upsert_user(uid, f"u{uid}", f"U{uid}")
+        await bot.db.set_user_role(uid, "EMPLOYEE")
+
+    print(f"{'conc':>5} {'updates':>8} {'wall s':>8} {'upd/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'peak':>5} {'serial':>7} {'disorder':>8} {'done':>9}")
+    try:
+        for c in args.levels:
+            task_ids = {}
+            if recorded is None:
+                for uid in employees:
+                    task_ids[uid] = await bot.db.create_task(f"Yuklama vazifasi {c}/{uid}", "", managers[0] if managers else 0,
+                                                             f"u{uid}", None, "medium")
+            updates = recorded if recorded is not None else synthetic_updates(task_ids, managers)
+            r = await run_level(app, updates, c)
+            done = "-"
+            if task_ids:
+                ok = 0
+                for tid in task_ids.values():
+                    ok += ((await bot.db.get_task(tid)) or {}).get("status") == "done"
+                done = f"{ok}/{len(task_ids)}"
+            print(f"{r['concurrency']:>5} {r['updates']:>8} {r['wall']:>8.2f} {r['rps']:>8.1f} "
+                  f"{r['p50'] * 1000:>8.1f} {r['p99'] * 1000:>8.1f} {r['peak']:>5} {r['serialized']:>7} "
+                  f"{r['disordered_users']:>8} {done:>9}")
+    finally:
+        await app.stop()            # fon broadcast'larini (create_task) kutadi
+        await app.shutdown()
+        await bot.on_stop(app)
+    print("Bot API calls:", dict(sorted(req.calls.items())))
+    return 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="loadtest.py")
+    ap.add_argument("--updates", help="JSONL (RECORD_UPDATES_PATH) — berilmasa sintetik update'lar")
+    ap.add_argument("--levels", type=int, nargs="+", default=[1, 8, 64], help="parallellik darajalari")
+    ap.add_argument("--employees", type=int, default=100)
+    ap.add_argument("--managers", type=int, default=5)
+    ap.add_argument("--api-latency", type=float, default=0.05, help="soxta Bot API javob kechikishi (s)")
+    args = ap.parse_args(argv)
+
+    tmp = None
+    if not os.getenv("DATABASE_PATH"):
+        tmp = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_PATH"] = os.path.join(tmp.name, "loadtest.db")
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "1:loadtest")
+    os.environ["OPENAI_API_KEY"] = ""
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["MANAGER_IDS"] = ",".join(str(MANAGER_BASE + i) for i in range(args.managers))
+    os.environ["MANAGER_USERNAMES"] = ""
+    try:
+        return asyncio.run(main_async(args))
+    finally:
+        if tmp:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+# manage.py — texnik xizmat buyruqlari: python manage.py <buyruq>
+import argparse, os, re, sqlite3, sys
+from typing import Any, Callable, Dict, List, Tuple
+
+import migrations
+from database import Database
+
+# ---------- check-plans ----------
+# To'liq jadval skaniga ruxsat berilgan metodlar (sababi bilan)
+FULL_SCAN_OK = {
+    "list_blocked_chats": "butun ro'yxat kerak, jadval kichik",
+    "resolve_assignee": "birinchi chaqiruvda NameIndex butun users'dan quriladi",
+    "rebuild_daily_stats": "rollup'ni butun tasks'dan qayta hisoblaydi (manage.py stats --rebuild)",
+    "check_daily_stats": "rollup'ni butun tasks bilan solishtiradi (manage.py stats --check)",
+    "rebuild_fts": "FTS indeksini butun tasks/reports'dan qayta quradi (manage.py rebuild-fts)",
+    "check_fts": "FTS indeksidagi qatorlarni jadvallar bilan sanab solishtiradi (manage.py rebuild-fts --check)",
+}
+
+SCAN_RE = re.compile(r"^SCAN (\w+)")
+FTS_MATCH_RE = re.compile(r"VIRTUAL TABLE INDEX \d+:M")
+
+
+def _plan_calls() -> List[Tuple[str, Callable[[Database], Any]]]:
+    """
+    Database'ning har bir public metodi namunaviy argumentlar bilan (tartib muhim: oldingilari
+    keyingilari uchun ma'lumot yaratadi). Yangi metod qo'shilsa, shu ro'yxatga ham qo'shing.
+    """
+    now = "2025-01-01 09:00:00"
+    return [
+        ("upsert_user", lambda d: (d.upsert_user(1, "boss", "Boss"), d.upsert_user(2, "ali", "Ali Valiyev"),
+                                   d.upsert_user(3, "vali", "Vali"))),
+        ("set_user_role", lambda d: (d.set_user_role(1, "MANAGER"), d.set_user_role(2, "EMPLOYEE"),
+                                     d.set_user_role(3, "EMPLOYEE"))),
+        ("set_user_language", lambda d: d.set_user_language(2, "ru")),
+        ("get_user", lambda d: (d.users.clear(), d.get_user(2))),
+        ("get_user_by_username", lambda d: d.get_user_by_username("ali")),
+        ("get_user_role", lambda d: d.get_user_role(2)),
+        ("list_employees", lambda d: d.list_employees()),
+        ("list_managers", lambda d: d.list_managers()),
+        ("resolve_assignee", lambda d: (d.resolve_assignee("@ali"), d.resolve_assignee("ali valiyev"),
+                                        d.resolve_assignee("vali"), d.resolve_assignee("yo'q"))),
+        ("suggest_assignees", lambda d: d.suggest_assignees("Валиев")),
+        ("create_task", lambda d: (d.create_task("Ombor", "", 1, "ali", "2025-01-02 10:00:00", "High"),
+                                   d.create_task("Kassa", "", 1, "vali", None, "Low"))),
+        ("list_tasks_for_user", lambda d: (d.list_tasks_for_user(2), d.list_tasks_for_user(2, include_archived=True))),
+        ("assign_task", lambda d: d.assign_task(2, 3)),
+        ("create_tasks_bulk", lambda d: d.create_tasks_bulk(1, [
+            {"title": "Yopish", "assignee": "@ali", "deadline": "2025-01-02 22:00:00"},
+            {"title": "Yopish", "assignee": "VALI", "priority": "High"}, {"title": "Yopish", "assignee": "yo'q"}])),
+        ("list_tasks_page", lambda d: (d.list_tasks_page(2, limit=1), d.list_tasks_page(2, (0, now, 1)),
+                                       d.list_tasks_page(2, before=(1, now, 1)),
+                                       d.list_tasks_page(2, (0, now, 1), include_archived=True))),
+        ("get_task", lambda d: (d.get_task(1), d.get_task(999, include_archived=True))),
+        ("schedule_deadline_pings", lambda d: d.schedule_deadline_pings(1, now)),
+        ("list_pending_deadline_pings", lambda d: d.list_pending_deadline_pings(now, "2025-02-01 00:00:00")),
+        ("list_due_deadline_pings", lambda d: d.list_due_deadline_pings(now, "2025-02-01 00:00:00", 100)),
+        ("mark_deadline_pings_sent", lambda d: d.mark_deadline_pings_sent([(1, "pre")])),
+        ("set_task_status", lambda d: (d.set_task_status(1, "accepted", 2), d.set_task_status(2, "done", 3))),
+        ("schedule_deadline_pings_bulk", lambda d: d.schedule_deadline_pings_bulk([3, 4], now)),
+        ("set_status_bulk", lambda d: d.set_status_bulk([3, 5], "accepted", 2)),
+        ("cancel_deadline_pings", lambda d: d.cancel_deadline_pings(1)),
+        ("mark_task_done_with_report", lambda d: (d.mark_task_done_with_report(1, 2, "tayyor"),
+                                                  d.mark_task_done_with_report(0, 2, "kunlik"))),
+        ("count_completed_today", lambda d: d.count_completed_today(2)),
+        ("save_report", lambda d: d.save_report(3, "hisobot", 1)),
+        ("build_daily_summary", lambda d: d.build_daily_summary()),
+        ("get_status_overview", lambda d: (d.get_status_overview(), d.get_status_overview(10, 0, 5))),
+        ("get_status_page", lambda d: (d.get_status_page(limit=1), d.get_status_page(("ali", 2), tasks_per_employee=None),
+                                       d.get_status_page(before=("vali", 3)))),
+        ("mark_chat_blocked", lambda d: d.mark_chat_blocked(3, "Forbidden")),
+        ("unmark_chat_blocked", lambda d: d.unmark_chat_blocked(3)),
+        ("list_blocked_chats", lambda d: d.list_blocked_chats()),
+        ("create_invite_for", lambda d: d.create_invite_for("new", "New")),
+        ("create_invite_request", lambda d: d.create_invite_request(4, "req", "Req")),
+        ("ensure_pending_request", lambda d: (d.ensure_pending_request(4, "req", "Req"),
+                                              d.ensure_pending_request(5, "req2", "Req2"))),
+        ("user_is_approved", lambda d: (d.users.clear(), d.upsert_user(4, "req", "Req"), d.set_user_role(4, "EMPLOYEE"),
+                                        d.user_is_approved(4))),
+        ("get_invite_request", lambda d: d.get_invite_request(1)),
+        ("get_invite_request_by_user", lambda d: d.get_invite_request_by_user(4)),
+        ("list_invite_requests", lambda d: d.list_invite_requests()),
+        ("approve_pending_user", lambda d: d.approve_pending_user(4, 1)),
+        ("reject_pending_user", lambda d: d.reject_pending_user(5)),
+        ("approve_invite_request", lambda d: (d.create_invite_request(6, "c", "C"), d.approve_invite_request(4))),
+        ("reject_invite_request", lambda d: (d.create_invite_request(7, "e", "E"), d.reject_invite_request(5))),
+        ("remove_employee_by_username", lambda d: d.remove_employee_by_username("vali")),
+        ("check_daily_stats", lambda d: d.check_daily_stats()),
+        ("rebuild_daily_stats", lambda d: d.rebuild_daily_stats()),
+        ("archive_tasks", lambda d: d.archive_tasks(0)),
+        ("save_conversation_states", lambda d: d.save_conversation_states([(1, "task_done", "5", 2e9)], [2], 1e9)),
+        ("load_conversation_states", lambda d: d.load_conversation_states(1e9)),
+        ("sync_manager_roles", lambda d: d.sync_manager_roles([1, 2], ["vali"])),
+        ("search_tasks", lambda d: (d.search_tasks("vazifa", since="2020-01-01"), d.search_tasks("vazifa", cursor=(1, 10)))),
+        ("search_reports", lambda d: d.search_reports("hisobot", since="2020-01-01")),
+        ("check_fts", lambda d: d.check_fts()),
+        ("rebuild_fts", lambda d: d.rebuild_fts()),
+    ]
+
+
+def collect_plans() -> Tuple[Dict[str, List[Tuple[str, List[str]]]], List[str]]:
+    """{metod: [(sql, [plan qatorlari])]} va qamrab olinmagan public metodlar ro'yxati."""
+    db = Database(":memory:")
+    con = db._writer   # :memory: — o'qishlar ham shu ulanishdan o'tadi, trace hammasini ko'radi
+    current = [""]
+    traced: List[Tuple[str, str]] = []
+    con.set_trace_callback(lambda sql: traced.append((current[0], sql)))
+    calls = _plan_calls()
+    for name, fn in calls:
+        current[0] = name
+        try:
+            fn(db)
+        except ValueError:
+            pass
+    con.set_trace_callback(None)
+
+    out: Dict[str, List[Tuple[str, List[str]]]] = {}
+    seen = set()
+    for name, sql in traced:
+        head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+        if head not in ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH") or (name, sql) in seen:
+            continue
+        seen.add((name, sql))
+        plan = [r["detail"] for r in con.execute("EXPLAIN QUERY PLAN " + sql)]
+        out.setdefault(name, []).append((" ".join(sql.split()), plan))
+    db.close()
+
+    public = {m for m in dir(Database) if not m.startswith("_") and callable(getattr(Database, m))}
+    missing = sorted(public - {n for n, _ in calls} - {"close", "user_cache_stats", "cached_user"})
+    return out, missing
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """
+    Plan qatorlaridan haqiqiy jadval skanlari ('SCAN (subquery-1)'/CONSTANT ROW emas).
+    FTS5 MATCH 'SCAN x VIRTUAL TABLE INDEX n:M...' ko'rinishida chiqadi — bu indeks bo'yicha qidiruv.
+    """
+    return [p for p in plan if (m := SCAN_RE.match(p)) and m.group(1) != "CONSTANT" and not FTS_MATCH_RE.search(p)]
+
+
+def cmd_check_plans(args) -> int:
+    plans, missing = collect_plans()
+    bad = 0
+    for name in sorted(plans):
+        for sql, plan in plans[name]:
+            scans = full_scans(plan)
+            allowed = scans and name in FULL_SCAN_OK
+            if scans and not allowed:
+                bad += 1
+            if args.verbose or (scans and not allowed):
+                mark = "SCAN" if scans and not allowed else ("ok*" if allowed else "ok")
+                print(f"[{mark}] {name}: {sql[:110]}")
+                for p in plan:
+                    print(f"        {p}")
+    for name in missing:
+        print(f"[MISSING] {name}: check-plans ro'yxatida yo'q (manage._plan_calls)")
+    total = sum(len(v) for v in plans.values())
+    print(f"{total} ta so'rov, {len(plans)} ta metod: {bad} ta to'liq skan, {len(missing)} ta qamrab olinmagan metod")
+    return 1 if bad or missing else 0
+
+
+# ---------- migrate ----------
+def _db_path(args) -> str:
+    return args.db or os.getenv("DATABASE_PATH", "taskbot.db")
+
+
+def cmd_migrate(args) -> int:
+    """Sxemani oxirgi versiyaga ko'tarish; --online: backfill'lar qisqa tranzaksiyalarda (bot ishlab turganda)."""
+    path = _db_path(args)
+    con = sqlite3.connect(path)
+    version = con.execute("PRAGMA user_version").fetchone()[0]
+    con.close()
+    print(f"{path}: user_version={version}, oxirgi={migrations.LATEST}")
+    for m in migrations.MIGRATIONS:
+        if m.version > version:
+            print(f"  kutilmoqda: {m.version} {m.name}" + (f" (+{len(m.backfills)} backfill)" if m.backfills else ""))
+    if args.status:
+        return 0
+    db = Database(path, online_migrations=args.online)
+    if db._backfill is not None:
+        db._backfill.join()
+    left = migrations.pending_backfills(db._conn)
+    db.close()
+    print("tayyor" if not left else f"{len(left)} ta backfill tugallanmadi")
+    return 1 if left else 0
+
+
+# ---------- stats ----------
+def cmd_stats(args) -> int:
+    """daily_stats / user_task_totals rollup'ini tekshirish (--check) yoki qayta qurish (--rebuild)."""
+    db = Database(_db_path(args))
+    try:
+        if args.rebuild:
+            print("qayta qurildi:", db.rebuild_daily_stats())
+        diff = db.check_daily_stats()
+    finally:
+        db.close()
+    for r in diff[:50]:
+        print(f"  user={r['user_id']} day={r['day']}: kutilgan {r['expected']}, rollup'da {r['actual']}")
+    print("rollup tasks bilan mos" if not diff else f"{len(diff)} ta farq (tuzatish: manage.py stats --rebuild)")
+    return 1 if diff else 0
+
+
+# ---------- archive ----------
+def cmd_archive(args) -> int:
+    """Eski yopilgan vazifalarni tasks_archive'ga batch'lab ko'chirish."""
+    db = Database(_db_path(args))
+    total = 0
+    try:
+        while True:
+            moved = db.archive_tasks(args.days, args.batch)
+            total += moved
+            if moved < args.batch:
+                break
+    finally:
+        db.close()
+    print(f"{total} ta vazifa arxivlandi ({args.days} kundan eski)")
+    return 0
+
+
+# ---------- rebuild-fts ----------
+def cmd_rebuild_fts(args) -> int:
+    """tasks_fts/reports_fts: tekshirish (--check) yoki noldan qayta qurish (bo'laklab, qisqa tranzaksiyalarda)."""
+    db = Database(_db_path(args))
+    try:
+        stats = db.check_fts() if args.check else db.rebuild_fts(args.batch)
+    except sqlite3.DatabaseError as e:
+        print("FTS indeksi buzilgan:", e, "(tuzatish: manage.py rebuild-fts)")
+        return 1
+    finally:
+        db.close()
+    print(", ".join(f"{k}={v}" for k, v in stats.items()))
+    ok = stats["tasks_indexed"] == stats["tasks"] and stats["reports_indexed"] == stats["reports"]
+    print("FTS indeksi mos" if ok else "FTS indeksi jadvallar bilan mos emas (tuzatish: manage.py rebuild-fts)")
+    return 0 if ok else 1
+
+
+# ---------- role ----------
+def cmd_role(args) -> int:
+    """DB'da manager tayinlash/olib tashlash; ishlayotgan bot SIGHUP yoki /reload'dan keyin ko'radi."""
+    db = Database(_db_path(args))
+    try:
+        who = args.user.lstrip("@")
+        u = db.get_user(int(who)) if who.isdigit() else db.get_user_by_username(who)
+        if not u:
+            print(f"{args.user}: foydalanuvchi topilmadi (avval botga /start yozsin)")
+            return 1
+        db.set_user_role(u["telegram_id"], args.role.upper())
+    finally:
+        db.close()
+    print(f"@{u.get('username') or '-'} ({u['telegram_id']}): {u.get('role') or '-'} → {args.role.upper()}"
+          " (bot: kill -HUP <pid> yoki /reload)")
+    return 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="manage.py")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("check-plans", help="EXPLAIN QUERY PLAN: Database so'rovlarida to'liq skan yo'qligini tekshirish")
+    p.add_argument("-v", "--verbose", action="store_true", help="barcha planlarni chiqarish")
+    p.set_defaults(func=cmd_check_plans)
+    p = sub.add_parser("migrate", help="sxema migratsiyalari (PRAGMA user_version)")
+    p.add_argument("--db", help="SQLite fayl (default: $DATABASE_PATH)")
+    p.add_argument("--online", action="store_true", help="backfill'larni bo'laklab, qisqa tranzaksiyalarda")
+    p.add_argument("--status", action="store_true", help="faqat holatni ko'rsatish")
+    p.set_defaults(func=cmd_migrate)
+    p = sub.add_parser("stats", help="kunlik statistika rollup'i: tekshirish / qayta qurish")
+    p.add_argument("--db", help="SQLite fayl (default: $DATABASE_PATH)")
+    p.add_argument("--rebuild", action="store_true", help="tasks'dan to'liq qayta hisoblash")
+    p.set_defaults(func=cmd_stats)
+    p = sub.add_parser("archive", help="yopilgan eski vazifalarni tasks_archive'ga ko'chirish")
+    p.add_argument("--db", help="SQLite fayl (default: $DATABASE_PATH)")
+    p.add_argument("--days", type=int, default=int(os.getenv("ARCHIVE_AFTER_DAYS", "90")))
+    p.add_argument("--batch", type=int, default=500)
+    p.set_defaults(func=cmd_archive)
+    p = sub.add_parser("rebuild-fts", help="to'liq matnli qidiruv indeksini (FTS5) qayta qurish / tekshirish")
+    p.add_argument("--db", help="SQLite fayl (default: $DATABASE_PATH)")
+    p.add_argument("--batch", type=int, default=5000)
+    p.add_argument("--check", action="store_true", help="faqat integrity-check va sonlarni solishtirish")
+    p.set_defaults(func=cmd_rebuild_fts)
+    p = sub.add_parser("role", help="DB'da manager/employee rolini o'rnatish")
+    p.add_argument("user", help="@username yoki telegram_id")
+    p.add_argument("role", choices=["manager", "employee"])
+    p.add_argument("--db", help="SQLite fayl (default: $DATABASE_PATH)")
+    p.set_defaults(func=cmd_role)
+    args = ap.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+# migrations.py — PRAGMA user_version asosidagi sxema migratsiyalari (tartibli DDL + bo'laklangan backfill)
+import logging, time
+from typing import Callable, ContextManager, List, NamedTuple, Tuple, Union
+
+logger = logging.getLogger("taskbot.migrations")
+
+ConnFactory = Callable[[], ContextManager]   # Database._conn: har `with` — bitta tranzaksiya
+
+
+class Backfill(NamedTuple):
+    """
+    Katta jadvalni rowid oralig'i bo'yicha bo'laklab to'ldirish. sql (yoki bitta bo'lakda ketma-ket
+    bajariladigan sql'lar tuple'i) ichida :lo va :hi (… WHERE rowid > :lo AND rowid <= :hi).
+    Bo'lak chegaralari keyset bilan olinadi — siyrak rowid'lar (telegram_id) ham teng bo'laklanadi.
+    Idempotent bo'lishi shart — online rejimda uzilib qolsa oxirgi checkpoint'dan davom etadi.
+    """
+    table: str
+    sql: Union[str, Tuple[str, ...]]
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    ddl: Tuple[str, ...]
+    backfills: Tuple[Backfill, ...] = ()
+
+
+# To'liq matnli qidiruv (migratsiya 8 va manage.py rebuild-fts). Oddiy (o'z nusxasini saqlovchi) FTS5:
+# snippet() ishlaydi, trigger'lar va backfill idempotent (OR REPLACE / DELETE)
+FTS_TABLES = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, description, report_text, tokenize="unicode61 remove_diacritics 2", prefix='3')""",
+    "INSERT INTO tasks_fts(tasks_fts, rank) VALUES('rank', 'bm25(3.0, 1.0, 1.0)')",   # sarlavha og'irroq
+    """CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+        content, tokenize="unicode61 remove_diacritics 2", prefix='3')""",
+)
+FTS_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT OR REPLACE INTO tasks_fts(rowid, title, description, report_text)
+        VALUES(new.id, new.title, new.description, new.report_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description, report_text ON tasks BEGIN
+        INSERT OR REPLACE INTO tasks_fts(rowid, title, description, report_text)
+        VALUES(new.id, new.title, new.description, new.report_text);
+    END""",
+    # Arxivga ko'chirilgan vazifa indeksda qoladi (matni tasks_archive'da o'zgarmaydi)
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks
+    WHEN NOT EXISTS (SELECT 1 FROM tasks_archive WHERE id=old.id) BEGIN
+        DELETE FROM tasks_fts WHERE rowid=old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_archive_fts_ad AFTER DELETE ON tasks_archive BEGIN
+        DELETE FROM tasks_fts WHERE rowid=old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reports_fts_ai AFTER INSERT ON reports BEGIN
+        INSERT OR REPLACE INTO reports_fts(rowid, content) VALUES(new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reports_fts_au AFTER UPDATE OF content ON reports BEGIN
+        INSERT OR REPLACE INTO reports_fts(rowid, content) VALUES(new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reports_fts_ad AFTER DELETE ON reports BEGIN
+        DELETE FROM reports_fts WHERE rowid=old.id;
+    END""",
+)
+FTS_BACKFILLS = (
+    Backfill("tasks", """
+        INSERT OR REPLACE INTO tasks_fts(rowid, title, description, report_text)
+        SELECT id, title, description, report_text FROM tasks WHERE rowid > :lo AND rowid <= :hi"""),
+    Backfill("tasks_archive", """
+        INSERT OR REPLACE INTO tasks_fts(rowid, title, description, report_text)
+        SELECT id, title, description, report_text FROM tasks_archive WHERE rowid > :lo AND rowid <= :hi"""),
+    Backfill("reports", """
+        INSERT OR REPLACE INTO reports_fts(rowid, content)
+        SELECT id, content FROM reports WHERE rowid > :lo AND rowid <= :hi"""),
+)
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "base schema", (
+        """CREATE TABLE IF NOT EXISTS users(
+            telegram_id INTEGER PRIMARY KEY,
+            username TEXT, full_name TEXT,
+            role TEXT,                 -- 'MANAGER' | 'EMPLOYEE' | NULL
+            language TEXT DEFAULT 'uz',
+            active INTEGER DEFAULT 1
+        )""",
+        """CREATE TABLE IF NOT EXISTS tasks(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT, description TEXT,
+            created_by INTEGER, assigned_to INTEGER,
+            deadline TEXT,
+            status TEXT DEFAULT 'new',          -- new|accepted|rejected|done|archived
+            priority TEXT DEFAULT 'Medium',
+            created_at TEXT DEFAULT (datetime('now')),
+            completed_at TEXT,
+            report_text TEXT,
+            reject_reason TEXT,
+            accepted_at TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS reports(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER, date TEXT, content TEXT, tasks_completed INTEGER
+        )""",
+        # Pending/approve oqimi
+        """CREATE TABLE IF NOT EXISTS invite_requests(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER, username TEXT, full_name TEXT,
+            status TEXT DEFAULT 'pending',   -- pending|approved|rejected
+            reason TEXT,
+            created_at TEXT DEFAULT (datetime('now')),
+            decided_at TEXT
+        )""",
+        # Optional: to'g'ridan-to'g'ri invite linklar
+        """CREATE TABLE IF NOT EXISTS invites(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT, full_name TEXT,
+            token TEXT UNIQUE,
+            status TEXT DEFAULT 'active',
+            created_at TEXT DEFAULT (datetime('now')),
+            approved_by INTEGER, approved_at TEXT,
+            used_by INTEGER, used_at TEXT
+        )""",
+        # Online backfill checkpoint'lari
+        """CREATE TABLE IF NOT EXISTS schema_backfills(
+            version INTEGER NOT NULL, idx INTEGER NOT NULL,
+            last_rowid INTEGER NOT NULL DEFAULT 0, max_rowid INTEGER NOT NULL,
+            PRIMARY KEY(version, idx)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_users_username ON users(lower(username))",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_assigned ON tasks(assigned_to)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)",
+        "CREATE INDEX IF NOT EXISTS idx_invreq_status ON invite_requests(status)",
+        "CREATE INDEX IF NOT EXISTS idx_invreq_user   ON invite_requests(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_invites_token ON invites(token)",
+    )),
+    # Botni bloklagan foydalanuvchilar (broadcast Forbidden)
+    Migration(2, "blocked_chats", (
+        """CREATE TABLE IF NOT EXISTS blocked_chats(
+            chat_id INTEGER PRIMARY KEY,
+            reason TEXT,
+            blocked_at TEXT DEFAULT (datetime('now'))
+        )""",
+    )),
+    # Deadline eslatmalari (restartdan keyin qayta yuklanadi): kind = 'pre' (−N daqiqa) | 'due'
+    Migration(3, "deadline_pings", (
+        """CREATE TABLE IF NOT EXISTS deadline_pings(
+            task_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            fire_at TEXT NOT NULL,      -- lokal vaqt, 'YYYY-MM-DD HH:MM:SS'
+            sent_at TEXT,
+            PRIMARY KEY(task_id, kind)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_pings_pending ON deadline_pings(fire_at) WHERE sent_at IS NULL",
+    ), (
+        # Mavjud ochiq vazifalar uchun 'due' eslatmalari
+        Backfill("tasks", """
+            INSERT OR IGNORE INTO deadline_pings(task_id, kind, fire_at)
+            SELECT id, 'due', datetime(deadline) FROM tasks
+            WHERE rowid > :lo AND rowid <= :hi
+              AND status IN ('new','accepted') AND datetime(deadline) IS NOT NULL
+        """),
+    )),
+    Migration(4, "composite and expression indexes", (
+        "CREATE INDEX IF NOT EXISTS idx_users_fullname ON users(lower(full_name))",
+        "CREATE INDEX IF NOT EXISTS idx_users_role     ON users(role, lower(username))",
+        # list_tasks_for_user / get_status_overview: filtr + ORDER BY to'liq indeksdan (temp b-tree'siz)
+        """CREATE INDEX IF NOT EXISTS idx_tasks_assignee_order
+           ON tasks(assigned_to, (CASE WHEN status='done' THEN 1 ELSE 0 END), created_at DESC)""",
+        # count_completed_today / build_daily_summary: covering (jadvalga murojaatsiz)
+        "CREATE INDEX IF NOT EXISTS idx_tasks_assignee_done ON tasks(assigned_to, status, date(completed_at))",
+        "CREATE INDEX IF NOT EXISTS idx_invreq_user_status ON invite_requests(user_id, status, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_invreq_status_created ON invite_requests(status, created_at)",
+        # Yangi kompozit indekslar prefiksi bilan qoplangan eski indekslar
+        "DROP INDEX IF EXISTS idx_tasks_assigned",
+        "DROP INDEX IF EXISTS idx_invreq_status",
+        "DROP INDEX IF EXISTS idx_invreq_user",
+    )),
+    # Kunlik hisobot rollup'lari: create_task / set_task_status / mark_task_done_with_report yangilab boradi.
+    # day = date(completed_at) (build_daily_summary'dagi date('now','localtime') bilan solishtiriladi)
+    Migration(5, "daily_stats rollup", (
+        """CREATE TABLE IF NOT EXISTS daily_stats(
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(user_id, day)
+        ) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS user_task_totals(
+            user_id INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0
+        )""",
+    ), (
+        # Xodimlar bo'laklari bo'yicha to'liq qayta hisob (REPLACE) — online rejimda ham ikki marta sanamaydi
+        Backfill("users", (
+            "DELETE FROM daily_stats WHERE user_id IN (SELECT telegram_id FROM users WHERE rowid > :lo AND rowid <= :hi)",
+            """INSERT INTO daily_stats(user_id, day, completed)
+               SELECT t.assigned_to, date(t.completed_at), COUNT(*) FROM tasks t
+               WHERE t.assigned_to IN (SELECT telegram_id FROM users WHERE rowid > :lo AND rowid <= :hi)
+                 AND t.status='done' AND date(t.completed_at) IS NOT NULL
+               GROUP BY t.assigned_to, date(t.completed_at)""",
+            """INSERT OR REPLACE INTO user_task_totals(user_id, total)
+               SELECT u.telegram_id, (SELECT COUNT(*) FROM tasks t WHERE t.assigned_to=u.telegram_id)
+               FROM users u WHERE u.rowid > :lo AND u.rowid <= :hi""",
+        )),
+    )),
+    # Hot/cold: yopilgan eski vazifalar tasks_archive'ga ko'chiriladi (Database.archive_tasks)
+    Migration(6, "tasks_archive", (
+        """CREATE TABLE IF NOT EXISTS tasks_archive(
+            id INTEGER PRIMARY KEY,             -- tasks.id saqlanadi
+            title TEXT, description TEXT,
+            created_by INTEGER, assigned_to INTEGER,
+            deadline TEXT,
+            status TEXT,
+            priority TEXT,
+            created_at TEXT,
+            completed_at TEXT,
+            report_text TEXT,
+            reject_reason TEXT,
+            accepted_at TEXT,
+            archived_at TEXT DEFAULT (datetime('now'))
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_archive_assignee ON tasks_archive(assigned_to, created_at DESC)",
+        # Arxiv nomzodlari: status + yopilgan vaqt; idx_tasks_status shu indeks prefiksi
+        "CREATE INDEX IF NOT EXISTS idx_tasks_closed ON tasks(status, COALESCE(completed_at, created_at))",
+        "DROP INDEX IF EXISTS idx_tasks_status",
+    )),
+    Migration(7, "keyset page indexes", (
+        # Keyset sahifalash: (assigned_to, done, created_at, id) — kursor (done, created_at, id);
+        # id DESC bir xil created_at'li qatorlarni ajratadi. idx_tasks_assignee_order shu indeks prefiksi
+        "CREATE INDEX IF NOT EXISTS idx_tasks_assignee_page ON tasks("
+        "assigned_to, (CASE WHEN status='done' THEN 1 ELSE 0 END), created_at DESC, id DESC)",
+        "DROP INDEX IF EXISTS idx_tasks_assignee_order",
+        "CREATE INDEX IF NOT EXISTS idx_archive_page ON tasks_archive(assigned_to, created_at DESC, id DESC)",
+        "DROP INDEX IF EXISTS idx_archive_assignee",
+    )),
+    Migration(8, "full-text search", FTS_TABLES + FTS_TRIGGERS, FTS_BACKFILLS),
+    Migration(9, "conversation_states", (
+        # states.py: foydalanuvchiga bitta suhbat holati (restart'dan keyin ham davom etadi)
+        """
+        CREATE TABLE IF NOT EXISTS conversation_states(
+            user_id INTEGER PRIMARY KEY,
+            state TEXT NOT NULL,
+            payload TEXT,              -- JSON
+            expires_at REAL NOT NULL   -- unix vaqt (TTL)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_states_expires ON conversation_states(expires_at)",
+    )),
+    Migration(10, "archive page index with done flag", (
+        # /mytasks tarixi: arxiv ham tasks kabi (done, created_at, id) bo'yicha seek — aks holda
+        # done bo'limi uchun xodimning butun arxivi o'qilib saralanadi
+        "CREATE INDEX IF NOT EXISTS idx_archive_page_done ON tasks_archive("
+        "assigned_to, (CASE WHEN status='done' THEN 1 ELSE 0 END), created_at DESC, id DESC)",
+        "DROP INDEX IF EXISTS idx_archive_page",
+    )),
+]
+
+LATEST = MIGRATIONS[-1].version
+
+
+def current_version(conn: ConnFactory) -> int:
+    with conn() as c:
+        return c.execute("PRAGMA user_version").fetchone()["user_version"]
+
+
+def pending_backfills(conn: ConnFactory) -> List[dict]:
+    with conn() as c:
+        try:
+            return c.execute("SELECT * FROM schema_backfills ORDER BY version, idx").fetchall()
+        except Exception:
+            return []
+
+
+def _max_rowid(c, table: str) -> int:
+    return c.execute(f"SELECT COALESCE(MAX(rowid), 0) AS m FROM {table}").fetchone()["m"]
+
+
+def _run_chunk(c, bf: Backfill, lo: int, hi: int, batch: int) -> int:
+    """lo'dan keyingi `batch` ta qatorni (hi'dan oshmay) qayta ishlaydi; bo'lak oxirgi rowid'ini qaytaradi."""
+    nxt = c.execute(f"SELECT MAX(rowid) AS k FROM (SELECT rowid FROM {bf.table} WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+                    (lo, batch)).fetchone()["k"]
+    nxt = hi if nxt is None else min(nxt, hi)
+    for sql in ((bf.sql,) if isinstance(bf.sql, str) else bf.sql):
+        c.execute(sql, {"lo": lo, "hi": nxt})
+    return nxt
+
+
+def migrate(conn: ConnFactory, online: bool = False, batch: int = 5000) -> int:
+    """
+    user_version'dan keyingi migratsiyalarni tartib bilan qo'llaydi; sxema joriy bo'lsa DDL umuman
+    bajarilmaydi. Oddiy rejim: har migratsiya (DDL + barcha backfill bo'laklari) — bitta tranzaksiya.
+    Online rejim: DDL darhol, backfill'lar esa schema_backfills'ga checkpoint bo'lib yoziladi va
+    run_backfills() bilan alohida, qisqa tranzaksiyalarda bajariladi. Qo'llangan migratsiyalar sonini qaytaradi.
+    """
+    version = current_version(conn)
+    todo = [m for m in MIGRATIONS if m.version > version]
+    for m in todo:
+        t0 = time.perf_counter()
+        with conn() as c:
+            c.execute("BEGIN IMMEDIATE")
+            for sql in m.ddl:
+                c.execute(sql)
+            for idx, bf in enumerate(m.backfills):
+                hi = _max_rowid(c, bf.table)
+                if online:
+                    c.execute("INSERT OR REPLACE INTO schema_backfills(version, idx, last_rowid, max_rowid) VALUES(?,?,0,?)",
+                              (m.version, idx, hi))
+                else:
+                    lo = 0
+                    while lo < hi:
+                        lo = _run_chunk(c, bf, lo, hi, batch)
+            c.execute(f"PRAGMA user_version={int(m.version)}")
+        logger.info("Migration %d (%s) applied in %.1f ms", m.version, m.name, (time.perf_counter() - t0) * 1000)
+    return len(todo)
+
+
+def run_backfills(conn: ConnFactory, batch: int = 2000, pause: float = 0.05) -> int:
+    """
+    Online backfill: har bo'lak alohida tranzaksiya (writer lock bo'laklar orasida bo'shaydi, bot
+    xizmat qilishda davom etadi), checkpoint shu tranzaksiyada yangilanadi. Qayta ishga tushsa davom etadi.
+    """
+    by_version = {m.version: m for m in MIGRATIONS}
+    done = 0
+    for row in pending_backfills(conn):
+        m = by_version.get(row["version"])
+        if m is None or row["idx"] >= len(m.backfills):
+            with conn() as c:
+                c.execute("DELETE FROM schema_backfills WHERE version=? AND idx=?", (row["version"], row["idx"]))
+            continue
+        bf = m.backfills[row["idx"]]
+        lo, hi = row["last_rowid"], row["max_rowid"]
+        t0 = time.perf_counter()
+        while lo < hi:
+            with conn() as c:
+                nxt = _run_chunk(c, bf, lo, hi, batch)
+                c.execute("UPDATE schema_backfills SET last_rowid=? WHERE version=? AND idx=?", (nxt, row["version"], row["idx"]))
+            done += 1
+            lo = nxt
+            if pause:
+                time.sleep(pause)
+        with conn() as c:
+            c.execute("DELETE FROM schema_backfills WHERE version=? AND idx=?", (row["version"], row["idx"]))
+        logger.info("Backfill %d.%d (%s) finished in %.1f s", row["version"], row["idx"], m.name, time.perf_counter() - t0)
+    return done
+
+
+def rebuild_fts(conn: ConnFactory, batch: int = 5000) -> int:
+    """
+    tasks_fts/reports_fts'ni noldan qurish: jadvallar qayta yaratiladi, keyin FTS_BACKFILLS bo'laklari
+    alohida tranzaksiyalarda (bot ishlab tursa ham). Trigger'lar o'z joyida qoladi. Bo'laklar sonini qaytaradi.
+    """
+    with conn() as c:
+        c.execute("BEGIN IMMEDIATE")
+        c.execute("DROP TABLE IF EXISTS tasks_fts")
+        c.execute("DROP TABLE IF EXISTS reports_fts")
+        for sql in FTS_TABLES:
+            c.execute(sql)
+        bounds = [_max_rowid(c, bf.table) for bf in FTS_BACKFILLS]
+    chunks = 0
+    for bf, hi in zip(FTS_BACKFILLS, bounds):
+        lo = 0
+        while lo < hi:
+            with conn() as c:
+                lo = _run_chunk(c, bf, lo, hi, batch)
+            chunks += 1
+    with conn() as c:
+        c.execute("INSERT INTO tasks_fts(tasks_fts) VALUES('optimize')")
+        c.execute("INSERT INTO reports_fts(reports_fts) VALUES('optimize')")
+    return chunks
@@ -0,0 +1,218 @@
+# name_index.py — xotiradagi ism indeksi: lotin/kirill (uz, ru, kk) transliteratsiya + trigram qidiruv
+import heapq, math, re, threading, unicodedata
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# Kirill → lotin (o'zbek lotin yozuviga yaqin); qozoq harflari ham shu yerda
+CYR = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo", "ж": "j", "з": "z",
+    "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "x", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sh",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+    "ў": "o", "қ": "q", "ғ": "g", "ҳ": "h",                                  # o'zbek
+    "ә": "a", "ө": "o", "ұ": "u", "ү": "u", "һ": "h", "і": "i", "ң": "n",   # qozoq
+    "ı": "i",
+}
+# Yozuvlar orasidagi farqlarni tekislash (Khasanov/Xasanov/Хасанов, Djamshid/Jamshid, Qodir/Кодир)
+FOLDS = (("kh", "x"), ("zh", "j"), ("dj", "j"), ("q", "k"), ("ye", "e"))
+
+APOSTROPHES_RE = re.compile(r"['ʻʼ‘’`´]")
+NON_WORD_RE = re.compile(r"[^0-9a-z]+")
+
+MIN_SCORE = 0.45       # foydalanuvchi bo'yicha o'rtacha o'xshashlik chegarasi
+TOKEN_MIN = 0.4        # so'rov tokeniga lug'atdagi token shundan past mos kelsa — hisobga olinmaydi
+# Noaniq ism bo'yicha avtomatik tayinlash: eng yaxshi nomzod kamida AUTO_SCORE va ikkinchisidan AUTO_MARGIN
+# oldinda bo'lishi kerak (otasining ismi prefiksi ~0.915 — yetmaydi); aks holda menejer tasdiqlaydi
+AUTO_SCORE = 0.92
+AUTO_MARGIN = 0.1
+
+Sig = Tuple[str, ...]  # imzo: bitta ism (yoki username) tokenlari
+
+
+def fold(text: str) -> str:
+    """Ism/username'ni taqqoslash shakliga: kichik harf, lotin, apostrof/diakritikasiz."""
+    s = unicodedata.normalize("NFKC", text or "").casefold()
+    s = "".join(CYR.get(ch, ch) for ch in s)
+    s = APOSTROPHES_RE.sub("", s)
+    s = "".join(ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch))
+    for a, b in FOLDS:
+        s = s.replace(a, b)
+    return NON_WORD_RE.sub(" ", s).strip()
+
+
+def tokens(text: str) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(fold(text).split()))
+
+
+def trigrams(token: str) -> FrozenSet[str]:
+    t = f" {token} "
+    return frozenset(t[i:i + 3] for i in range(len(t) - 2))
+
+
+def edit_distance(a: str, b: str, k: int = 2) -> int:
+    """
+    Damerau-Levenshtein (OSA: qo'shish/o'chirish/almashtirish/yonma-yon o'rin almashish).
+    Masofa k dan oshishi aniq bo'lgach to'xtaydi va k+1 qaytaradi.
+    """
+    if abs(len(a) - len(b)) > k:
+        return k + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cb = b[j - 1]
+            d = prev[j - 1] + (ca != cb)
+            if prev[j] + 1 < d:
+                d = prev[j] + 1
+            if cur[j - 1] + 1 < d:
+                d = cur[j - 1] + 1
+            if prev2 is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb and prev2[j - 2] + 1 < d:
+                d = prev2[j - 2] + 1
+            cur[j] = d
+        if min(cur) > k:
+            return k + 1
+        prev2, prev = prev, cur
+    return min(prev[-1], k + 1)
+
+
+def token_score(q: str, t: str, qg: FrozenSet[str], tg: FrozenSet[str], fuzzy: bool = True) -> float:
+    """
+    Ikki token o'xshashligi 0..1: aniq — 1, prefiks (≥3 harf) — kamida 0.85,
+    aks holda trigram Jaccard va (fuzzy=True) tahrir masofasi ulushidan kattasi (imlo xatolari uchun).
+    """
+    if q == t:
+        return 1.0
+    s = len(qg & tg) / len(qg | tg)
+    if len(q) >= 3 and t.startswith(q):
+        s = max(s, 0.85)
+    if fuzzy and 0.15 <= s < 0.85 and len(q) >= 4:
+        d = edit_distance(q, t)
+        if d <= 2:
+            s = max(s, 1 - d / max(len(q), len(t)))
+    return s
+
+
+class NameIndex:
+    """
+    Uch bosqichli indeks: trigram → lug'at tokeni → imzo (ism tokenlari kortej) → telegram_id.
+    Ismlar ko'p takrorlanadi: 100k foydalanuvchida ham imzolar va lug'at ancha kichik,
+    qidiruv shular bo'yicha ketadi. full_name va username alohida imzo.
+    add/remove inkremental — upsert_user shu yerni yangilaydi.
+    """
+    def __init__(self):
+        self._users: Dict[int, Tuple[Sig, ...]] = {}      # telegram_id → imzolar
+        self._sigs: Dict[Sig, Set[int]] = {}              # imzo → telegram_id'lar
+        self._postings: Dict[str, Set[Sig]] = {}          # token → imzolar
+        self._grams: Dict[str, Set[str]] = {}             # trigram → tokenlar
+        self._token_grams: Dict[str, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def add(self, uid: int, full_name: Optional[str], username: Optional[str] = None) -> None:
+        sigs = tuple(dict.fromkeys(t for t in (tokens(full_name or ""), tokens(username or "")) if t))
+        with self._lock:
+            if self._users.get(uid) == sigs:
+                return
+            self._drop(uid)
+            if not sigs:
+                return
+            self._users[uid] = sigs
+            for sig in sigs:
+                ids = self._sigs.get(sig)
+                if ids is None:
+                    ids = self._sigs[sig] = set()
+                    for t in sig:
+                        self._add_token(t, sig)
+                ids.add(uid)
+
+    def _add_token(self, t: str, sig: Sig) -> None:
+        sigs = self._postings.get(t)
+        if sigs is None:
+            sigs = self._postings[t] = set()
+            self._token_grams[t] = grams = trigrams(t)
+            for g in grams:
+                self._grams.setdefault(g, set()).add(t)
+        sigs.add(sig)
+
+    def add_many(self, rows: Iterable[Tuple[int, Optional[str], Optional[str]]]) -> None:
+        for uid, full_name, username in rows:
+            self.add(uid, full_name, username)
+
+    def remove(self, uid: int) -> None:
+        with self._lock:
+            self._drop(uid)
+
+    def _drop(self, uid: int) -> None:
+        for sig in self._users.pop(uid, ()):
+            ids = self._sigs[sig]
+            ids.discard(uid)
+            if ids:
+                continue
+            del self._sigs[sig]
+            for t in sig:
+                sigs = self._postings[t]
+                sigs.discard(sig)
+                if sigs:
+                    continue
+                del self._postings[t]
+                for g in self._token_grams.pop(t):
+                    toks = self._grams[g]
+                    toks.discard(t)
+                    if not toks:
+                        del self._grams[g]
+
+    def _match_token(self, q: str) -> Dict[str, float]:
+        """So'rov tokeniga mos lug'at tokenlari {token: score}."""
+        qg = trigrams(q)
+        grams = sorted(qg, key=lambda g: len(self._grams.get(g, ())))
+        # kamida `need` trigram mos kelishi kerak → eng kam uchraydigan n-need+1 tasidan biri albatta bor
+        need = max(1, math.ceil(len(grams) * TOKEN_MIN) - 1)
+        cands: Set[str] = set()
+        for g in grams[:len(grams) - need + 1]:
+            cands.update(self._grams.get(g, ()))
+        out = {}
+        fuzzy = q not in self._postings    # aniq token lug'atda bo'lsa, imlo xatosi qidirilmaydi
+        for t in cands:
+            tg = self._token_grams[t]
+            if len(qg & tg) >= need:
+                s = token_score(q, t, qg, tg, fuzzy)
+                if s >= TOKEN_MIN:
+                    out[t] = s
+        return out
+
+    def search(self, query: str, limit: int = 5, min_score: float = MIN_SCORE) -> List[Tuple[int, float]]:
+        """[(telegram_id, score)] — score kamayish tartibida (teng bo'lsa kamroq token, kichik id)."""
+        qtoks = tokens(query)
+        if not qtoks:
+            return []
+        with self._lock:
+            matches = [self._match_token(q) for q in qtoks]
+            if not all(matches) and len(matches) > 1:
+                matches = [m for m in matches if m] or matches
+            best: Dict[Sig, float] = {}
+            if len(matches) == 1:
+                # bitta token: imzo bahosi = token bahosi − uzunlik jarimasi, eng qisqa imzolar yetarli;
+                # qolgan so'rov tokenlari hech kimga mos kelmagan bo'lsa — baho ular soniga bo'linadi
+                for t, ts in matches[0].items():
+                    for sig in heapq.nsmallest(2 * limit, self._postings[t], key=len):
+                        s = (ts - 0.01 * (len(sig) - 1)) / len(qtoks)
+                        best[sig] = max(best.get(sig, 0.0), s)
+            else:
+                # hamma so'rov tokeniga mos imzolar (set kesishmasi C'da); bo'lmasa — eng kichik to'plam
+                groups = [set().union(*(self._postings[t] for t in m)) for m in matches]
+                cands = set.intersection(*groups) or min(groups, key=len)
+                for sig in cands:
+                    s = sum(max((m.get(x, 0.0) for x in sig), default=0.0) for m in matches) / len(qtoks)
+                    best[sig] = s - 0.01 * max(0, len(sig) - len(qtoks))    # ortiqcha tokenlar — biroz past
+            # Foydalanuvchida 2 tagacha imzo (ism, username): 2*limit imzo kamida limit kishini qamraydi
+            ranked = heapq.nlargest(2 * limit, ((s, sig) for sig, s in best.items() if s >= min_score),
+                                    key=lambda x: (x[0], -len(x[1])))
+            out: Dict[int, float] = {}
+            for s, sig in ranked:
+                for uid in sorted(self._sigs[sig]):
+                    out.setdefault(uid, round(s, 3))
+                    if len(out) >= limit:
+                        return list(out.items())
+        return list(out.items())
@@ -0,0 +1,73 @@
+# roles.py — rol aniqlash: config (MANAGER_IDS / MANAGER_USERNAMES) + DB'dagi role='MANAGER'
+import os, threading
+from typing import FrozenSet, Iterable, NamedTuple, Optional, Tuple
+
+MANAGER, EMPLOYEE = "MANAGER", "EMPLOYEE"
+
+
+def parse_ids(csv: Optional[str]) -> FrozenSet[int]:
+    return frozenset(int(x) for x in (csv or "").split(",") if x.strip().isdigit())
+
+
+def parse_usernames(csv: Optional[str]) -> FrozenSet[str]:
+    return frozenset(u.strip().lstrip("@").lower() for u in (csv or "").split(",") if u.strip().lstrip("@"))
+
+
+class Principal(NamedTuple):
+    """Bitta update uchun foydalanuvchi: rol, til, tasdiq holati va DB qatori (handlerlar zanjiri bo'ylab bitta)."""
+    user_id: int
+    role: str
+    lang: str
+    approved: bool
+    user: dict
+
+    @property
+    def is_manager(self) -> bool:
+        return self.role == MANAGER
+
+
+class RoleResolver:
+    """
+    Config bir marta frozenset'larga o'qiladi, DB'da role='MANAGER' bo'lganlar qo'shiladi.
+    load_config()/set_db_managers() — SIGHUP yoki /reload: to'plamlar bitta atomik almashtirish bilan
+    yangilanadi (o'quvchilar lock olmaydi).
+    """
+    def __init__(self, ids_csv: str = "", usernames_csv: str = ""):
+        self._sets: Tuple[FrozenSet[int], FrozenSet[str], FrozenSet[int]] = (
+            parse_ids(ids_csv), parse_usernames(usernames_csv), frozenset())
+        self._lock = threading.Lock()
+
+    @property
+    def config_ids(self) -> FrozenSet[int]:
+        return self._sets[0]
+
+    @property
+    def config_usernames(self) -> FrozenSet[str]:
+        return self._sets[1]
+
+    def is_manager(self, user) -> bool:
+        """Telegram User (yoki id, username atributli obyekt) — config yoki DB bo'yicha manager."""
+        if not user:
+            return False
+        ids, unames, db_ids = self._sets
+        return user.id in ids or user.id in db_ids or (user.username or "").lower() in unames
+
+    def set_db_managers(self, ids: Iterable[int]) -> None:
+        with self._lock:
+            cfg_ids, unames, _ = self._sets
+            self._sets = (cfg_ids, unames, frozenset(ids))
+
+    def load_config(self) -> None:
+        """MANAGER_IDS / MANAGER_USERNAMES'ni qayta o'qish (.env — python-dotenv o'rnatilgan bo'lsa)."""
+        try:
+            from dotenv import load_dotenv
+            load_dotenv(override=True)
+        except ImportError:
+            pass
+        ids, unames = parse_ids(os.getenv("MANAGER_IDS", "")), parse_usernames(os.getenv("MANAGER_USERNAMES", ""))
+        with self._lock:
+            self._sets = (ids, unames, self._sets[2])
+
+    def counts(self) -> Tuple[int, int, int]:
+        """(config id'lari, config username'lari, DB'dagi managerlar) soni."""
+        return tuple(len(x) for x in self._sets)
@@ -0,0 +1,75 @@
+# router.py — jadvalga asoslangan dispatch: callback_data uchun prefiks daraxti (typed argumentlar bilan)
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Converter = Callable[[str], Any]
+
+
+class _Node:
+    __slots__ = ("children", "param", "conv", "greedy", "handler")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None      # <tur> segmenti
+        self.conv: Optional[Converter] = None
+        self.greedy = False                       # True — qolgan hamma segmentlar (':' bilan) bitta argument
+        self.handler: Optional[Callable] = None
+
+
+class CallbackRouter:
+    """
+    "task:acc:<int>" kabi shablonlar ':' bo'yicha segmentlarga bo'linib daraxtga yoziladi.
+    Statik segment — dict qidiruv; <tur> — converter bilan argument (ValueError bo'lsa mos kelmaydi).
+    Statik segment <tur>dan ustun. Turlar: int, str, rest (qolgan hammasi) va converter() bilan qo'shilganlar.
+    resolve() — (handler, [argumentlar]) yoki None; handler'ning o'zi chaqiruvchida.
+    """
+    def __init__(self):
+        self._root = _Node()
+        self._convs: Dict[str, Tuple[Converter, bool]] = {"int": (int, False), "str": (str, False), "rest": (str, True)}
+
+    def converter(self, name: str, fn: Converter, greedy: bool = False) -> None:
+        self._convs[name] = (fn, greedy)
+
+    def add(self, pattern: str, handler: Callable) -> None:
+        node = self._root
+        segs = pattern.split(":")
+        for i, seg in enumerate(segs):
+            if seg.startswith("<") and seg.endswith(">"):
+                conv, greedy = self._convs[seg[1:-1]]
+                if greedy and i != len(segs) - 1:
+                    raise ValueError(f"{pattern}: {seg} faqat oxirida bo'lishi mumkin")
+                if node.param is None:
+                    node.param, node.conv, node.greedy = _Node(), conv, greedy
+                elif (node.conv, node.greedy) != (conv, greedy):
+                    raise ValueError(f"{pattern}: {seg} shu joydagi boshqa turdagi argument bilan to'qnashadi")
+                node = node.param
+            else:
+                node = node.children.setdefault(seg, _Node())
+        if node.handler is not None:
+            raise ValueError(f"{pattern}: marshrut allaqachon bor")
+        node.handler = handler
+
+    def route(self, pattern: str):
+        def deco(fn):
+            self.add(pattern, fn)
+            return fn
+        return deco
+
+    def resolve(self, data: str) -> Optional[Tuple[Callable, List[Any]]]:
+        node, args = self._root, []
+        segs = data.split(":")
+        for i, seg in enumerate(segs):
+            nxt = node.children.get(seg)
+            if nxt is None:
+                if node.param is None:
+                    return None
+                greedy = node.greedy
+                try:
+                    args.append(node.conv(":".join(segs[i:]) if greedy else seg))
+                except (ValueError, TypeError):
+                    return None
+                node = node.param
+                if greedy:
+                    break
+            else:
+                node = nxt
+        return (node.handler, args) if node.handler is not None else None
@@ -0,0 +1,150 @@
+# states.py — foydalanuvchi suhbat holati: bitta enum holat + payload, xotirada O(1), SQLite'ga yig'ib yoziladi
+import asyncio, json, logging, time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger("taskbot.states")
+
+
+class State(str, Enum):
+    EMP_ADD = "emp_add"              # menejer: yangi xodim @username'ini kutyapmiz
+    EMP_REMOVE = "emp_remove"        # menejer: o'chiriladigan @username
+    TASK_WIZARD = "task_wizard"      # menejer: vazifa matni (tabiiy til)
+    TASK_REJECT = "task_reject"      # xodim: rad etish sababi; payload — task_id
+    TASK_DONE = "task_done"          # xodim: hisobot; payload — task_id (0 — umumiy kunlik hisobot)
+    USER_REJECT = "user_reject"      # menejer: so'rovni rad etish sababi; payload — user_id
+
+
+class Conversation(NamedTuple):
+    state: State
+    payload: Any
+    expires_at: float
+
+
+Row = Tuple[int, str, Optional[str], float]
+
+
+class ConversationStore:
+    """
+    Haqiqat manbai — xotiradagi dict (user_id → Conversation); DB — restart'dan keyin tiklash uchun nusxa.
+    set/pop/clear faqat dict'ni o'zgartirib user_id'ni "dirty" qiladi. Fon sikli har `interval` soniyada
+    (yoki dirty `max_dirty` ga yetsa darhol) har foydalanuvchining oxirgi qiymatini bitta tranzaksiyada
+    yozadi: oraliqdagi bir nechta o'zgarish bitta yozuvga aylanadi. stop() qolganini yozib chiqadi;
+    jarayon to'satdan o'lsa, oxirgi `interval` ichidagi o'zgarishlar yo'qolishi mumkin.
+    Muddati (ttl) o'tgan holat get/pop'da yo'q hisoblanadi, DB'dan esa flush'da o'chiriladi.
+    """
+    def __init__(self, load: Callable[[float], Awaitable[List[Dict[str, Any]]]],
+                 save: Callable[[List[Row], List[int], float], Awaitable[None]],
+                 ttl: float = 3600.0, interval: float = 2.0, max_dirty: int = 500,
+                 clock: Callable[[], float] = time.time):
+        self.load = load
+        self.save = save
+        self.ttl = ttl
+        self.interval = interval
+        self.max_dirty = max_dirty
+        self.clock = clock
+        self._data: Dict[int, Conversation] = {}
+        self._dirty: Set[int] = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._swept = 0.0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    async def start(self) -> None:
+        if self._task:
+            return
+        now = self.clock()
+        for r in await self.load(now):
+            try:
+                state = State(r["state"])
+            except ValueError:
+                continue   # eski versiyadagi noma'lum holat
+            payload = json.loads(r["payload"]) if r["payload"] is not None else None
+            self._data[r["user_id"]] = Conversation(state, payload, r["expires_at"])
+        self._swept = now
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="conversation-flush")
+        logger.info("Conversation states restored: %d", len(self._data))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    # ---- O(1) amallar (handlerlardan, sinxron) ----
+    def get(self, user_id: int) -> Optional[Conversation]:
+        conv = self._data.get(user_id)
+        if conv is not None and conv.expires_at <= self.clock():
+            del self._data[user_id]   # DB'dagi nusxani flush'dagi TTL tozalash o'chiradi
+            return None
+        return conv
+
+    def set(self, user_id: int, state: State, payload: Any = None) -> None:
+        """Yangi holat avvalgisini almashtiradi (foydalanuvchida bitta faol oqim)."""
+        self._data[user_id] = Conversation(state, payload, self.clock() + self.ttl)
+        self._touch(user_id)
+
+    def pop(self, user_id: int) -> Optional[Conversation]:
+        conv = self.get(user_id)
+        if conv is not None:
+            del self._data[user_id]
+            self._touch(user_id)
+        return conv
+
+    def clear(self, user_id: int) -> None:
+        if self._data.pop(user_id, None) is not None:
+            self._touch(user_id)
+
+    def _touch(self, user_id: int) -> None:
+        self._dirty.add(user_id)
+        if len(self._dirty) >= self.max_dirty and self._wake:
+            self._wake.set()
+
+    # ---- persist ----
+    async def flush(self) -> int:
+        """Dirty foydalanuvchilarning joriy qiymati: bor bo'lsa upsert, yo'q bo'lsa delete. Yozilganlar soni."""
+        now = self.clock()
+        sweep = now - self._swept >= max(60.0, self.ttl / 10)
+        if sweep:
+            self._sweep(now)   # save() DB'dagi muddati o'tganlarni ham o'chiradi — dirty bo'lmasa ham chaqiriladi
+        if not self._dirty and not sweep:
+            return 0
+        dirty, self._dirty = self._dirty, set()
+        upserts: List[Row] = []
+        deletes: List[int] = []
+        for uid in dirty:
+            conv = self._data.get(uid)
+            if conv is None or conv.expires_at <= now:
+                deletes.append(uid)
+            else:
+                upserts.append((uid, conv.state.value, json.dumps(conv.payload), conv.expires_at))
+        try:
+            await self.save(upserts, deletes, now)
+        except Exception as e:
+            self._dirty |= dirty   # keyingi flush'da qayta urinamiz (qiymatlar dict'dan qayta olinadi)
+            logger.warning("Conversation flush failed (%d pending): %s", len(self._dirty), e)
+            return 0
+        self.flushes += 1
+        self.rows_written += len(upserts) + len(deletes)
+        return len(upserts) + len(deletes)
+
+    def _sweep(self, now: float) -> None:
+        """Qaytib kelmagan foydalanuvchilarning muddati o'tgan holatlari xotiradan (DB — flush'da)."""
+        for uid in [u for u, c in self._data.items() if c.expires_at <= now]:
+            del self._data[uid]
+        self._swept = now
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
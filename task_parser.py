@@ -0,0 +1,145 @@
+# task_parser.py — LLM'siz lokal vazifa parseri (/task grammatikasi + tabiiy sana + ustuvorlik so'zlari)
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from utils import DMY_RE, SHEVA_OFFSETS, TIME_RE, YMD_RE, parse_human_or_natural, to_db_str
+
+PRIORITIES = {"Low", "Medium", "High", "Urgent"}
+
+# uz / ru / kk (+ en) ustuvorlik kalit so'zlari → Priority (uzunroq iboralar oldin tekshiriladi)
+PRIORITY_WORDS = {
+    "Low": ("muhim emas", "shoshilmasdan", "shoshilmang", "не срочно", "несрочно", "не важно", "асықпай", "low"),
+    "Urgent": ("shoshilinch", "tezkor", "zudlik bilan", "darhol", "срочно", "срочная", "немедленно",
+               "жедел", "шұғыл", "urgent", "asap"),
+    "High": ("juda muhim", "muhim", "важно", "важная", "маңызды", "high"),
+}
+
+
+def _words_re(words) -> "re.Pattern":
+    alt = "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alt})(?!\w)", re.IGNORECASE)
+
+
+PRIORITY_RES = [(pr, _words_re(words)) for pr, words in PRIORITY_WORDS.items()]
+RELATIVE_DAY_RE = _words_re(SHEVA_OFFSETS)
+
+USERNAME_RE = re.compile(r"@([A-Za-z0-9_]{3,32})")
+BRACKET_RE = re.compile(r"\[([^\]]*)\]")
+QUOTE_RE = re.compile(r"[\"“«](.+?)[\"”»]")
+ASSIGNEES_RE = re.compile(r"(?:@[^\s,]+[\s,]*)+")
+
+# known_usernames'da yo'q @handle: saqlanadi, lekin ishonch LLM chegarasidan (LOCAL_PARSE_THRESHOLD) past
+UNKNOWN_ASSIGNEE_CAP = 0.5
+
+
+def split_task_command(payload: str) -> Tuple[str, str, str, str]:
+    """
+    /task argumentlari: @user "title" 10:00 24.09.2025 [High]
+    → (assigned, title, priority, qolgan_matn). Qolgan matnda odatda muddat bo'ladi.
+    Bir nechta ijrochi: @ali @vali, @sardor "..." → assigned = "@ali @vali @sardor".
+    """
+    assigned = ""
+    title = ""
+    priority = "Medium"
+    payload = (payload or "").strip()
+
+    if payload.startswith("@"):
+        m = ASSIGNEES_RE.match(payload)
+        assigned = " ".join(h for h in re.split(r"[\s,]+", m.group(0)) if h)
+        payload = payload[m.end():]
+
+    if '"' in payload:
+        try:
+            i = payload.index('"'); j = payload.index('"', i+1)
+            title = payload[i+1:j].strip()
+            payload = (payload[:i] + payload[j+1:]).strip()
+        except ValueError:
+            title = payload; payload = ""
+    else:
+        title = payload; payload = ""
+
+    if "[" in payload and "]" in payload:
+        pr = payload[payload.index("[")+1:payload.index("]")].strip().title()
+        if pr in PRIORITIES: priority = pr
+        payload = (payload[:payload.index("[")] + payload[payload.index("]")+1:]).strip()
+
+    return assigned, title, priority, payload
+
+
+def parse_deadline(text: str, now: datetime) -> str:
+    """utils.parse_human_or_natural + yolg'iz HH:MM (bugun). Natija: DB formatidagi satr yoki ''."""
+    dt = parse_human_or_natural(text, now, now.tzinfo)
+    if dt is None:
+        m = TIME_RE.search(text or "")
+        if m:
+            try:
+                dt = now.replace(hour=int(m.group(1)), minute=int(m.group(2)), second=0, microsecond=0)
+            except ValueError:
+                dt = None
+    return to_db_str(dt) if dt else ""
+
+
+def detect_priority(text: str) -> Tuple[str, Optional[str]]:
+    """(priority, topilgan so'z). [High] kabi qavsli yozuv kalit so'zdan ustun."""
+    m = BRACKET_RE.search(text)
+    if m and m.group(1).strip().title() in PRIORITIES:
+        return m.group(1).strip().title(), m.group(0)
+    for pr, rx in PRIORITY_RES:
+        m = rx.search(text)
+        if m:
+            return pr, m.group(0)
+    return "Medium", None
+
+
+def parse_task_local(text: str, now: datetime, known_usernames: List[str]) -> Dict:
+    """
+    {assignee, title, deadline, priority, confidence}. confidence 0..1:
+    assignee (0.4) + title (0.3) + deadline (0.3); qo'shtirnoqli aniq sarlavha bo'lsa va tashqarida
+    boshqa so'z qolmasa muddat ixtiyoriy.
+    Tanish bo'lmagan @handle ball bermaydi va natija UNKNOWN_ASSIGNEE_CAP bilan cheklanadi (LLM tekshiradi).
+    """
+    raw = (text or "").strip()
+    known = {u.lower(): u for u in known_usernames if u}
+
+    assignee, verified = "", False
+    m = USERNAME_RE.search(raw)
+    if m:
+        verified = m.group(1).lower() in known
+        assignee = "@" + known.get(m.group(1).lower(), m.group(1))
+    else:
+        first = raw.split()[0].strip(",.:;") if raw.split() else ""
+        if first.lower() in known:
+            assignee, verified = "@" + known[first.lower()], True
+
+    deadline = parse_deadline(raw, now)
+    priority, pr_word = detect_priority(raw)
+
+    q = QUOTE_RE.search(raw)
+    rest = QUOTE_RE.sub(" ", raw, count=1) if q else raw
+    if assignee and not m:
+        rest = rest.replace(raw.split()[0], " ", 1)
+    rest = BRACKET_RE.sub(" ", USERNAME_RE.sub(" ", rest))
+    for rx in (DMY_RE, YMD_RE, TIME_RE):
+        rest = rx.sub(" ", rest)
+    rest = RELATIVE_DAY_RE.sub(" ", rest)
+    if pr_word and not pr_word.startswith("["):
+        rest = rest.replace(pr_word, " ", 1)
+    rest = " ".join(rest.replace(",", " ").split()).strip(" -—:;.")
+    title = q.group(1).strip() if q else rest
+
+    score = 0.0
+    if verified: score += 0.4
+    if title: score += 0.3
+    # qo'shtirnoqdan tashqarida tushunilmagan so'z qolsa ("juma kuni") — u muddat bo'lishi mumkin, LLM hal qiladi
+    if deadline or (q and not rest): score += 0.3
+    if assignee and not verified:
+        score = min(score, UNKNOWN_ASSIGNEE_CAP)
+
+    return {
+        "assignee": assignee,
+        "title": title or raw or "No title",
+        "deadline": deadline,
+        "priority": priority,
+        "confidence": round(score, 2),
+    }
@@ -0,0 +1,12 @@
+# tests/conftest.py — repo ildizi sys.path'da; bot.py import qilinsa vaqtinchalik DB va soxta token bilan
+import os, sys, tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="taskbot-tests-")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "1:test")
+os.environ["DATABASE_PATH"] = os.path.join(_tmp, "bot.db")
+os.environ["AI_CACHE_PATH"] = os.path.join(_tmp, "ai_cache.db")
+os.environ["OPENAI_API_KEY"] = ""
+os.environ.setdefault("LOG_LEVEL", "WARNING")
@@ -0,0 +1,33 @@
+# ai.parse_cache_bucket: parse keshi kaliti kunga faqat nisbiy sana bo'lganda bog'lanadi
+import pytest
+
+import ai
+from ai_cache import AICache
+
+NOW = "2025-09-20T08:00:00+05:00"
+
+
+@pytest.mark.parametrize("text,bucket", [
+    ("@ali kassani yopish ertaga 10:00", "2025-09-20"),
+    ("@ali убрать кухню завтра", "2025-09-20"),
+    ("@ali асхананы жинау ертең", "2025-09-20"),
+    ("@ali hisobot juma kuni", "2025-09-20"),
+    ("@ali отчёт до пятницы", "2025-09-20"),
+    ("@ali zalni tayyorlash 17:30", "2025-09-20"),            # sanasiz vaqt = bugun
+    ('@ali "clean fryer" 10:00 24.09.2025', ""),
+    ("@ali menyuni yangilash", ""),
+    ("@ali qo'ng'iroq qilish 2 soatdan keyin", None),
+    ("@ali позвонить через час", None),
+])
+def test_bucket(text, bucket):
+    assert ai.parse_cache_bucket(text, NOW) == bucket
+
+
+def _key(text, now):
+    return AICache.make_key("parse", "m", text, ["ali"], ai.parse_cache_bucket(text, now))
+
+
+def test_absolute_text_shares_key_across_days():
+    later = "2025-09-23T09:00:00+05:00"
+    assert _key("@ali menyuni yangilash", NOW) == _key("@ali  Menyuni yangilash.", later)
+    assert _key("@ali hisobot ertaga", NOW) != _key("@ali hisobot ertaga", later)
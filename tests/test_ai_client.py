@@ -0,0 +1,66 @@
+# ai.py: umumiy AsyncOpenAI klienti soxta HTTP serverga — parallellik chegarasi, timeout va undan keyin tiklanish
+import asyncio, time
+
+import openai
+import pytest
+
+import ai
+from bench import StubOpenAI
+
+MSGS = [{"role": "user", "content": "salom"}]
+
+
+@pytest.fixture
+def stub_ai(monkeypatch):
+    """Har test o'z event loop'ida: klient va semafor qaytadan yaratiladi."""
+    monkeypatch.setattr(ai, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(ai, "OPENAI_MAX_CONCURRENCY", 3)
+    monkeypatch.setattr(ai, "OPENAI_TIMEOUT", 0.3)
+    monkeypatch.setattr(ai, "OPENAI_MAX_RETRIES", 0)
+    monkeypatch.setattr(ai, "_client", None)
+    monkeypatch.setattr(ai, "_limiter", None)
+
+    def run(body, **stub_kw):
+        async def main():
+            stub = StubOpenAI(**stub_kw)
+            monkeypatch.setenv("OPENAI_BASE_URL", await stub.start())
+            try:
+                return await body(stub)
+            finally:
+                if ai._client is not None:
+                    await ai._client.close()
+                    ai._client = None
+                await stub.stop()
+        return asyncio.run(main())
+    return run
+
+
+def test_concurrency_is_capped(stub_ai):
+    async def body(stub):
+        out = await asyncio.gather(*(ai.chat_completion(model="stub", messages=MSGS) for _ in range(12)))
+        return stub, out
+
+    stub, out = stub_ai(body, delay=0.05)
+    assert [r.choices[0].message.content for r in out] == ["ok"] * 12
+    assert stub.requests == 12 and stub.peak == 3
+
+
+def test_timeout_raises_and_releases_slot(stub_ai):
+    async def body(stub):
+        t0 = time.perf_counter()
+        with pytest.raises(openai.APITimeoutError):
+            await ai.chat_completion(model="stub", messages=[{"role": "user", "content": "slow"}])
+        elapsed = time.perf_counter() - t0
+        # slot qaytarildi: keyingi 3 ta parallel chaqiruv kutmasdan o'tadi
+        ok = await asyncio.gather(*(ai.chat_completion(model="stub", messages=MSGS) for _ in range(3)))
+        return elapsed, ok
+
+    elapsed, ok = stub_ai(body, delay=0.0, slow_delay=2.0)
+    assert elapsed < 1.0 and len(ok) == 3
+
+
+def test_callers_fall_back_on_timeout(stub_ai):
+    async def body(stub):
+        return await ai.pm_assistant_answer("slow")
+
+    assert stub_ai(body, slow_delay=2.0).startswith("AI xatolik")
@@ -0,0 +1,54 @@
+# Broadcaster: RetryAfter bir marta kutiladi, chat limiter holati yig'ilib qolmaydi
+import asyncio, time
+
+from telegram.error import Forbidden, RetryAfter
+
+from broadcast import Broadcaster
+
+
+class FakeBot:
+    def __init__(self, fail=None):
+        self.sent = []
+        self.fail = fail or {}
+
+    async def send_message(self, chat_id, text, **kwargs):
+        err = self.fail.pop(chat_id, None)
+        if err:
+            raise err
+        self.sent.append((chat_id, time.monotonic()))
+
+
+def test_retry_after_waits_once():
+    bot = FakeBot({1: RetryAfter(1)})
+    b = Broadcaster(rate=100, per_chat_interval=0.0)
+    t0 = time.monotonic()
+    report = asyncio.run(b.send(bot, [(1, "x", {})], "t"))
+    elapsed = time.monotonic() - t0
+    assert report.sent == 1 and report.retries == 1
+    assert 1.0 <= elapsed < 1.5     # ikki marta (pause + sleep) kutilsa ~2 s bo'lardi
+
+
+def test_blocked_chat_reported():
+    blocked = []
+
+    async def on_blocked(chat_id, reason):
+        blocked.append(chat_id)
+
+    bot = FakeBot({2: Forbidden("bot was blocked by the user")})
+    b = Broadcaster(rate=1000, per_chat_interval=0.0, on_blocked=on_blocked)
+    report = asyncio.run(b.send(bot, [(1, "a", {}), (2, "b", {})], "t"))
+    assert report.sent == 1 and report.blocked == [2] and blocked == [2]
+
+
+def test_chat_state_pruned():
+    b = Broadcaster(rate=1000, per_chat_interval=0.0)
+    asyncio.run(b.send(FakeBot(), [(i, "x", {}) for i in range(500)], "t"))
+    assert b._chats == {}
+
+
+def test_per_chat_interval_kept_within_broadcast():
+    bot = FakeBot()
+    b = Broadcaster(rate=1000, per_chat_interval=0.1)
+    asyncio.run(b.send(bot, [(7, "a", {}), (7, "b", {}), (7, "c", {})], "t"))
+    times = [t for _, t in bot.sent]
+    assert all(b2 - a >= 0.09 for a, b2 in zip(times, times[1:]))
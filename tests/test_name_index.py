@@ -0,0 +1,101 @@
+# NameIndex: lotin/kirill, qozoq harflari, imlo xatolari — kichik qo'lda yozilgan korpus (bench.py names — 100k)
+import pytest
+
+from database import Database
+from name_index import AUTO_SCORE, NameIndex, fold
+
+STAFF = {
+    1: ("Alisher Karimov", "alisher_k"),
+    2: ("Жамшид Тошматов", None),
+    3: ("Xurshid Xasanov", None),
+    4: ("Ўткир Жўраев", None),
+    5: ("Ғайрат Қодиров", None),
+    6: ("Айгерім Нұрланова", None),
+    7: ("Dilnoza Rahimova", "dilnoza"),
+    8: ("Sergey Kuznetsov", None),
+    9: ("Alisher Karimovich Yusupov", None),
+    10: ("Shahnoza Ergasheva", None),
+}
+
+CORPUS = [
+    ("Alisher Karimov", 1),
+    ("Алишер Каримов", 1),           # kirill → lotin
+    ("Jamshid Toshmatov", 2),        # lotin → kirill
+    ("Khurshid Khasanov", 3),        # kh / x
+    ("Хуршид", 3),
+    ("O'tkir Jo'rayev", 4),          # apostrof / ў
+    ("Otkir Jurayev", 4),
+    ("G'ayrat Qodirov", 5),          # ғ / қ
+    ("Gayrat Kodirov", 5),
+    ("Aigerim Nurlanova", 6),        # qozoq і / ұ
+    ("Rahimova Dilnoza", 7),         # so'z tartibi
+    ("Dilnozа Rahimva", 7),          # imlo xatosi
+    ("Сергей Кузнецов", 8),
+    ("Yusupov", 9),
+    ("Shahnoza Ergash", 10),         # prefiks
+    ("alisher_k", 1),                # username
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    idx = NameIndex()
+    idx.add_many((uid, name, un) for uid, (name, un) in STAFF.items())
+    return idx
+
+
+@pytest.mark.parametrize("query,expected", CORPUS)
+def test_top1(index, query, expected):
+    found = index.search(query, limit=3)
+    assert found and found[0][0] == expected, found
+
+
+def test_fold_is_script_neutral():
+    assert fold("Ўткир Жўраев") == fold("O‘tkir Jo'rayev") == fold("Otkir Jorayev")
+
+
+def test_incremental_add_and_remove(index):
+    index.add(11, "Бекзод Умаров")
+    assert index.search("Bekzod Umarov", 1)[0][0] == 11
+    index.remove(11)
+    assert not index.search("Bekzod Umarov", 1) or index.search("Bekzod Umarov", 1)[0][0] != 11
+
+
+def test_unmatched_token_lowers_score(index):
+    # "Ҳасан" hech kimga mos emas — faqat familiya bo'yicha topilgan nomzod ishonchli hisoblanmaydi
+    found = index.search("Ҳасан Жўраев", 2)
+    assert found and found[0][0] == 4 and found[0][1] < AUTO_SCORE
+
+
+@pytest.fixture
+def staff_db(tmp_path):
+    d = Database(str(tmp_path / "names.db"))
+    for uid, name, un in ((1, "Ali Valiyev", "ali_v"), (2, "Ali Karimov", "ali_k"), (3, "Ўткир Жўраев", "otkir"),
+                          (4, "Dilnoza Rahimova", None), (5, "Dilnoza Rahimova", None)):
+        d.upsert_user(uid, un, name)
+    yield d
+    d.close()
+
+
+@pytest.mark.parametrize("query,expected", [
+    ("@ali_v", 1), ("ALI_K", 2),                 # username — @ bilan yoki usiz
+    ("Али Валиев", 1), ("Otkir Jorayev", 3),     # boshqa yozuv: baho yuqori, ikkinchi nomzod uzoq
+    ("Ali", None),                               # ikki Ali — menejer tanlaydi
+    ("Hasan Jo'rayev", None),                    # familiya mos, ism yo'q
+    ("Dilnoza Rahimova", None),                  # aniq ism, lekin ikki kishi
+    ("@nobody", None),
+])
+def test_resolve_assignee_is_strict(staff_db, query, expected):
+    u = staff_db.resolve_assignee(query)
+    assert (u and u["telegram_id"]) == expected
+
+
+def test_ambiguous_name_has_suggestions(staff_db):
+    assert {u["telegram_id"] for u in staff_db.suggest_assignees("Ali")} == {1, 2}
+    assert [u["telegram_id"] for u in staff_db.suggest_assignees("Hasan Jo'rayev")][:1] == [3]
+
+
+def test_assign_task_only_once(staff_db):
+    tid = staff_db.create_task("Kassa", "", 1, None, None, "Medium")
+    assert staff_db.assign_task(tid, 2) and not staff_db.assign_task(tid, 1)
+    assert staff_db.get_task(tid)["assigned_to"] == 2
@@ -0,0 +1,59 @@
+# st:/mt: birinchi sahifasi 50k vazifada butun natijani o'qimasdan chiqadi (bench.py pages — kengroq o'lchov)
+import pytest
+
+from bench import measure, seed_tasks
+from database import Database
+from utils import TG_MESSAGE_LIMIT, chunk_lines
+
+
+@pytest.fixture(scope="module")
+def big_db(tmp_path_factory):
+    d = Database(str(tmp_path_factory.mktemp("pages") / "big.db"))
+    ids = seed_tasks(d, 50_000, 500)
+    yield d, ids[0]
+    d.close()
+
+
+def test_mytasks_first_page_is_bounded(big_db):
+    from bot import fmt_task
+    d, heavy = big_db
+    d.list_tasks_page(heavy, limit=20)
+    (rows, prev, nxt), ms, kb = measure(lambda: d.list_tasks_page(heavy, limit=20))
+    _, _, full_kb = measure(lambda: d.list_tasks_for_user(heavy))     # 25k qator — taqqoslash uchun
+    assert len(rows) == 20 and prev is None and nxt is not None
+    assert kb * 50 < full_kb and ms < 100
+    first = next(chunk_lines(fmt_task(t) for t in rows))
+    assert len(first) <= TG_MESSAGE_LIMIT and f"#{rows[0]['id']}" in first
+
+
+def test_status_first_page_is_bounded(big_db):
+    d, _ = big_db
+    d.get_status_page(limit=10, tasks_per_employee=11)
+    (items, prev, nxt), ms, kb = measure(lambda: d.get_status_page(limit=10, tasks_per_employee=11))
+    _, _, full_kb = measure(lambda: d.get_status_overview())
+    assert len(items) == 10 and prev is None and nxt is not None
+    assert all(len(i["tasks"]) <= 11 for i in items)
+    assert kb * 50 < full_kb and ms < 100
+
+
+def test_history_pages_merge_archive(tmp_path):
+    d = Database(str(tmp_path / "hist.db"))
+    heavy = seed_tasks(d, 300, 3, done_every=2)[0]
+    with d._conn() as c:   # eski yopilganlari arxivga ko'chadi
+        c.execute("UPDATE tasks SET created_at=datetime('now', printf('-%d days', 400 - id)), "
+                  "completed_at=datetime('now', printf('-%d days', 399 - id))")
+    while d.archive_tasks(90, 50):
+        pass
+    every = sorted(d.list_tasks_for_user(heavy, include_archived=True),
+                   key=lambda t: (t["created_at"], t["id"]), reverse=True)
+    want = [t["id"] for t in sorted(every, key=lambda t: t["status"] == "done")]
+    got, nxt = [], None
+    while True:
+        rows, _, nxt = d.list_tasks_page(heavy, after=nxt, limit=7, include_archived=True)
+        got += [r["id"] for r in rows]
+        if nxt is None:
+            break
+    archived = [i for i in want if d.get_task(i) is None]
+    d.close()
+    assert archived and len(archived) < len(want)
+    assert got == want
@@ -0,0 +1,23 @@
+# EXPLAIN QUERY PLAN: Database'ning har bir so'rovi migratsiya qilingan :memory: bazada (manage.py check-plans)
+import pytest
+
+import manage
+
+PLANS, MISSING = manage.collect_plans()
+HOT = sorted(name for name in PLANS if name not in manage.FULL_SCAN_OK)
+
+
+def test_every_public_method_is_planned():
+    assert MISSING == []
+
+
+@pytest.mark.parametrize("name", HOT)
+def test_no_full_scan(name):
+    bad = [(sql, scans) for sql, plan in PLANS[name] if (scans := manage.full_scans(plan))]
+    assert bad == []
+
+
+def test_allowlist_is_not_stale():
+    # FULL_SCAN_OK'dagi metod endi skan qilmasa — ro'yxatdan olib tashlash kerak
+    assert [n for n in manage.FULL_SCAN_OK
+            if not any(manage.full_scans(plan) for _, plan in PLANS.get(n, ()))] == []
@@ -0,0 +1,102 @@
+# Suhbat holati restart'dan omon qoladi: oqim o'rtasida flush → yangi ConversationStore/Database → keyingi xabar
+import asyncio
+
+from telegram import Update
+
+from database import AsyncDatabase, Database
+from states import ConversationStore, State
+
+EMP = 8_100_001
+
+
+def _user(uid):
+    return {"id": uid, "is_bot": False, "first_name": "Ali", "username": f"u{uid}"}
+
+
+def _text(uid, n, text):
+    return {"update_id": n, "message": {"message_id": n, "date": 0, "chat": {"id": uid, "type": "private"},
+                                        "from": _user(uid), "text": text}}
+
+
+def _callback(uid, n, data):
+    return {"update_id": n, "callback_query": {
+        "id": str(n), "from": _user(uid), "chat_instance": "1", "data": data,
+        "message": {"message_id": n, "date": 0, "chat": {"id": uid, "type": "private"}, "text": "task"}}}
+
+
+def test_flow_survives_restart():
+    import bot, loadtest
+
+    async def run():
+        app = bot.build_application(loadtest._fake_request_cls()(0))
+        await app.initialize()
+        await bot.on_start(app)
+        await app.start()
+        try:
+            await bot.db.upsert_user(EMP, f"u{EMP}", "Ali")
+            await bot.db.set_user_role(EMP, "EMPLOYEE")
+            rej = await bot.db.create_task("Ombor", "", 1, f"u{EMP}", None, "Medium")
+            done = await bot.db.create_task("Kassa", "", 1, f"u{EMP}", None, "Medium")
+
+            async def send(raw):
+                await app.process_update(Update.de_json(raw, app.bot))
+
+            async def restart():
+                """Jarayon o'ldi: faqat DB'dagi nusxa qoladi, xotiradagi dict yangidan tiklanadi."""
+                await bot.conversations.flush()
+                await bot.conversations.stop()
+                bot.conversations = ConversationStore(bot.db.load_conversation_states,
+                                                      bot.db.save_conversation_states, ttl=3600)
+                await bot.conversations.start()
+
+            await send(_callback(EMP, 1, f"task:rej:{rej}"))
+            await restart()
+            assert bot.conversations.get(EMP).state is State.TASK_REJECT
+            await send(_text(EMP, 2, "Mahsulot yo'q"))
+            t = await bot.db.get_task(rej)
+            assert (t["status"], t["reject_reason"]) == ("rejected", "Mahsulot yo'q")
+            assert bot.conversations.get(EMP) is None
+
+            await send(_callback(EMP, 3, f"task:done:{done}"))
+            await restart()
+            await send(_text(EMP, 4, "Kassa topshirildi"))
+            t = await bot.db.get_task(done)
+            assert (t["status"], t["report_text"]) == ("done", "Kassa topshirildi")
+        finally:
+            await app.stop()
+            await app.shutdown()
+            await bot.on_stop(app)
+
+    asyncio.run(run())
+
+
+def test_new_database_restores_and_expires(tmp_path):
+    path = str(tmp_path / "states.db")
+    now = [1000.0]
+
+    def store(db):
+        return ConversationStore(db.load_conversation_states, db.save_conversation_states,
+                                 ttl=60, clock=lambda: now[0])
+
+    async def run():
+        db1 = AsyncDatabase(Database(path))
+        s1 = store(db1)
+        await s1.start()
+        s1.set(1, State.TASK_DONE, 42)
+        s1.set(2, State.USER_REJECT, 7)
+        await s1.stop()                    # flush
+        await db1.close()
+
+        db2 = AsyncDatabase(Database(path))  # yangi jarayon: yangi ulanishlar
+        s2 = store(db2)
+        await s2.start()
+        assert s2.get(1) == (State.TASK_DONE, 42, 1060.0)
+        now[0] += 61                       # TTL (va tozalash oralig'i) o'tdi
+        assert s2.get(1) is None and s2.pop(2) is None
+        await s2.flush()
+        rows = await db2.load_conversation_states(0)
+        await s2.stop()
+        await db2.close()
+        assert rows == []
+
+    asyncio.run(run())
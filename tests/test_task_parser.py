@@ -0,0 +1,46 @@
+# task_parser.parse_task_local: belgilangan uz/ru/kk korpus va tanish bo'lmagan @handle
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from task_parser import UNKNOWN_ASSIGNEE_CAP, parse_task_local
+
+NOW = datetime(2025, 9, 20, 8, 0, tzinfo=ZoneInfo("Asia/Tashkent"))
+KNOWN = ["ali", "vali", "sardor", "dilnoza"]
+THRESHOLD = 0.9   # Config.LOCAL_PARSE_THRESHOLD default
+
+# (matn, assignee, title, deadline, priority, lokal hal qilinadimi)
+CORPUS = [
+    ('@ali "clean fryer" 10:00 24.09.2025 [High]', "@ali", "clean fryer", "2025-09-24 10:00:00", "High", True),
+    ("@vali ombordagi mahsulotlarni sanash ertaga 09:00 shoshilinch", "@vali", "ombordagi mahsulotlarni sanash",
+     "2025-09-21 09:00:00", "Urgent", True),
+    ("@sardor убрать кухню завтра 18:00 срочно", "@sardor", "убрать кухню", "2025-09-21 18:00:00", "Urgent", True),
+    ("@dilnoza тоңазытқышты тазалау ертең 10:00 маңызды", "@dilnoza", "тоңазытқышты тазалау",
+     "2025-09-21 10:00:00", "High", True),
+    ("ali kassa hisobotini topshirish indin", "@ali", "kassa hisobotini topshirish", "2025-09-22 18:00:00",
+     "Medium", True),
+    ("@vali zalni tayyorlash bugun 17:30 muhim emas", "@vali", "zalni tayyorlash", "2025-09-20 17:30:00", "Low", True),
+    ('@ali "Menyu"', "@ali", "Menyu", "", "Medium", True),
+    ("oshxonani tozalash ertaga", "", "oshxonani tozalash", "2025-09-21 18:00:00", "Medium", False),
+    ('@ali "Menyu" juma kuni', "@ali", "Menyu", "", "Medium", False),
+    ('@nobody "clean fryer" 10:00 24.09.2025', "@nobody", "clean fryer", "2025-09-24 10:00:00", "Medium", False),
+]
+
+
+@pytest.mark.parametrize("text,assignee,title,deadline,priority,local", CORPUS)
+def test_corpus(text, assignee, title, deadline, priority, local):
+    r = parse_task_local(text, NOW, KNOWN)
+    assert (r["assignee"], r["title"], r["deadline"], r["priority"]) == (assignee, title, deadline, priority)
+    assert (r["confidence"] >= THRESHOLD) is local
+
+
+def test_unknown_handle_never_skips_llm():
+    r = parse_task_local('@ghost "Yopish" 22:00 [Urgent]', NOW, KNOWN)
+    assert r["assignee"] == "@ghost"
+    assert r["confidence"] <= UNKNOWN_ASSIGNEE_CAP < THRESHOLD
+
+
+def test_known_handle_is_case_insensitive():
+    r = parse_task_local('@ALI "Yopish" 22:00', NOW, KNOWN)
+    assert r["assignee"] == "@ali" and r["confidence"] == 1.0
@@ -0,0 +1,33 @@
+# updates.UpdateRecorder: yozuv fon thread'ida, record() event loop'ni bloklamaydi, stop() navbatni yozib tugatadi
+import asyncio, json, threading
+
+from updates import UpdateRecorder
+
+
+def test_records_everything_in_order(tmp_path):
+    path = tmp_path / "updates.jsonl"
+
+    async def main():
+        rec = UpdateRecorder(str(path))
+        await rec.start()
+        for i in range(2000):
+            rec.record({"update_id": i, "message": {"text": "salom"}})
+            if i % 500 == 0:
+                await asyncio.sleep(0)
+        await rec.stop()
+        return rec
+
+    rec = asyncio.run(main())
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["update_id"] for r in rows] == list(range(2000))
+    assert rec.written == 2000 and rec.dropped == 0
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    rec = UpdateRecorder(str(tmp_path / "u.jsonl"), maxsize=3)
+    for i in range(5):      # thread ishga tushmagan — navbat bo'shamaydi
+        rec.record({"update_id": i})
+    assert rec.dropped == 2
+    asyncio.run(rec.start())
+    asyncio.run(rec.stop())
+    assert rec.written == 3 and not any(t.name == "update-recorder" for t in threading.enumerate())
@@ -0,0 +1,58 @@
+# UserCache: invalidate va o'qish orasidagi poyga, upsert_user'ning writer'siz yo'li
+import asyncio
+
+from database import AsyncDatabase, Database
+
+
+def make_db(tmp_path) -> Database:
+    d = Database(str(tmp_path / "t.db"))
+    d.upsert_user(5, "ali", "Ali")
+    d.set_user_role(5, "EMPLOYEE")
+    return d
+
+
+def test_stale_read_is_not_cached_after_invalidate(tmp_path):
+    d = make_db(tmp_path)
+    gen = d.users.generation(5)                 # o'quvchi SELECT'dan oldin
+    stale = {"telegram_id": 5, "username": "ali", "full_name": "Ali", "role": None}
+    d.set_user_role(5, "MANAGER")               # yozuv oraliqda invalidate qiladi
+    assert d.users.put(5, stale, gen=gen) is False
+    assert d.get_user(5)["role"] == "MANAGER"
+
+
+def test_writer_put_supersedes_inflight_reader(tmp_path):
+    d = make_db(tmp_path)
+    gen = d.users.generation(5)
+    d.upsert_user(5, "ali2", "Ali")             # yozuvchi put'i generation'ni oshiradi
+    assert d.users.put(5, {"telegram_id": 5, "username": "ali"}, gen=gen) is False
+    assert d.get_user(5)["username"] == "ali2"
+
+
+def test_approval_read_respects_generation(tmp_path):
+    d = make_db(tmp_path)
+    d.create_invite_request(5, "ali", "Ali")
+    assert d.user_is_approved(5) is False
+    d.approve_pending_user(5)
+    assert d.user_is_approved(5) is True
+
+
+def test_unchanged_upsert_skips_writer_queue(tmp_path):
+    d = make_db(tmp_path)
+
+    async def run():
+        a = AsyncDatabase(d)
+        await a.start()
+        try:
+            await a.upsert_user(5, "ali", "Ali")          # keshni to'ldiradi
+            writes = []
+            orig = a._write
+            a._write = lambda *args, **kw: writes.append(args) or orig(*args, **kw)
+            row = await a.upsert_user(5, "ali", "Ali")
+            assert row["username"] == "ali" and writes == []
+            await a.upsert_user(5, "ali", "Ali Valiyev")   # o'zgargan — writer orqali
+            assert len(writes) == 1
+            assert (await a.get_user(5))["full_name"] == "Ali Valiyev"
+        finally:
+            await a.close()
+
+    asyncio.run(run())
@@ -0,0 +1,88 @@
+# VoicePipeline: soxta (uxlaydigan) Whisper bilan navbat chegarasi, bosqich vaqtlari, timeout va xato yo'li
+import asyncio
+
+from voice import VoiceJob, VoicePipeline
+
+
+class FakeTranscriber:
+    """ai.transcription o'rnida: `delay` soniya uxlaydi; `fail` — matn o'rniga xato."""
+    def __init__(self, delay=0.05, fail=None):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self, data):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise self.fail
+        return "Alisher ertaga soat 10 gacha omborni sanasin"
+
+
+def make_process(transcriber, done):
+    async def process(app, job):
+        with job.stage("download"):
+            await asyncio.sleep(0.01)
+        with job.stage("transcribe"):
+            text = await transcriber(b"ogg")
+        with job.stage("parse"):
+            title = text.split()[0]
+        done.append((job.chat_id, title))
+    return process
+
+
+def job(i):
+    return VoiceJob(i, i, f"file{i}", "uz")
+
+
+def test_queue_bound_and_stage_timings():
+    async def run():
+        done = []
+        fake = FakeTranscriber(delay=0.1)
+        p = VoicePipeline(make_process(fake, done), workers=2, maxsize=3)
+        assert not p.submit(job(0))             # start()dan oldin qabul qilinmaydi
+        await p.start(None)
+        jobs = [job(i) for i in range(1, 9)]
+        accepted = [p.submit(j) for j in jobs]
+        # event loop hali workerlarga o'tmagan: navbatga faqat maxsize sig'adi, qolgani darhol rad
+        assert accepted == [True] * 3 + [False] * 5
+        assert p.pending == 3
+        await asyncio.sleep(0)                  # workerlar 2 ta ishni oldi — navbatda joy ochildi
+        assert p.submit(jobs[3]) and p.pending == 2
+        await p.stop()
+        return p, done, fake, jobs
+
+    p, done, fake, jobs = asyncio.run(run())
+    assert fake.calls == 4 and p.done == 4 and p.failed == p.timed_out == 0
+    assert sorted(c for c, _ in done) == [1, 2, 3, 4]
+    for j in jobs[:4]:
+        assert set(j.timings) == {"queued", "download", "transcribe", "parse"}
+        assert j.timings["transcribe"] >= 100
+    # 2 worker: 3- va 4-ish birinchi juftlik tugashini navbatda kutgan
+    assert min(jobs[2].timings["queued"], jobs[3].timings["queued"]) >= 100
+
+
+def test_timeout_and_error_reported_worker_survives():
+    async def run():
+        done, errors = [], []
+
+        async def on_error(app, j, exc):
+            errors.append((j.chat_id, type(exc).__name__))
+
+        transcribers = {1: FakeTranscriber(delay=1.0), 2: FakeTranscriber(fail=RuntimeError("whisper 500")),
+                        3: FakeTranscriber()}
+
+        async def process(app, j):
+            await make_process(transcribers[j.chat_id], done)(app, j)
+
+        p = VoicePipeline(process, workers=1, maxsize=5, timeout=0.2, on_error=on_error)
+        await p.start(None)
+        for i in (1, 2, 3):
+            assert p.submit(job(i))
+        await p.stop()
+        return p, done, errors
+
+    p, done, errors = asyncio.run(run())
+    assert errors == [(1, "TimeoutError"), (2, "RuntimeError")]
+    assert done == [(3, "Alisher")]             # bitta worker osilib qolmadi
+    assert (p.done, p.failed, p.timed_out, p.in_flight) == (1, 1, 1, 0)
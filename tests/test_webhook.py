@@ -0,0 +1,88 @@
+# webhook.py: /metrics faqat WEBHOOK_SECRET sarlavhasi yoki METRICS_TOKEN bilan, /healthz ochiq
+import asyncio
+from types import SimpleNamespace
+
+from webhook import WebhookServer
+
+METRICS = "/metrics"
+
+
+def server(secret="", metrics_token=""):
+    app = SimpleNamespace(running=True, update_queue=asyncio.Queue(), bot=None)
+    return WebhookServer(app, "hook", secret, metrics_token=metrics_token)
+
+
+def get(s, path, **headers):
+    return asyncio.run(s._dispatch("GET", path, headers, b""))[0]
+
+
+def test_healthz_is_open():
+    assert get(server(secret="s"), "/healthz") == 200
+
+
+def test_metrics_closed_without_credentials_configured():
+    s = server()
+    assert get(s, METRICS) == 403
+    assert get(s, METRICS, authorization="Bearer ") == 403
+
+
+def test_metrics_accepts_webhook_secret_header():
+    s = server(secret="s3cret")
+    assert get(s, METRICS) == 403
+    assert get(s, METRICS, **{"x-telegram-bot-api-secret-token": "wrong"}) == 403
+    assert get(s, METRICS, **{"x-telegram-bot-api-secret-token": "s3cret"}) == 200
+
+
+def test_metrics_accepts_bearer_token():
+    s = server(secret="s3cret", metrics_token="m-tok")
+    assert get(s, METRICS, authorization="Bearer m-tok") == 200
+    assert get(s, METRICS, authorization="bearer m-tok") == 200
+    assert get(s, METRICS, authorization="Bearer s3cret") == 403
+    assert get(s, METRICS, authorization="Basic m-tok") == 403
+
+
+class StuckApp:
+    """stop() — PTB kabi ishlayotgan update task'larini kutadi."""
+    def __init__(self, processor):
+        self.update_processor = processor
+        self.tasks = []
+
+    def handle(self, coroutine):
+        self.tasks.append(asyncio.ensure_future(self.update_processor.process_update(object(), coroutine)))
+
+    async def stop(self):
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+def test_stop_app_cancels_stuck_handlers_before_returning():
+    from updates import PerUserUpdateProcessor
+    from webhook import stop_app
+
+    async def main():
+        app = StuckApp(PerUserUpdateProcessor(1))
+        app.handle(asyncio.sleep(3600))
+        app.handle(asyncio.sleep(3600))   # slot kutayotgan
+        await asyncio.sleep(0)
+        await stop_app(app, drain_timeout=0.05, grace=1)
+        return app
+
+    app = asyncio.run(main())
+    assert all(t.cancelled() for t in app.tasks)
+    assert app.update_processor.stats()["active"] == 0
+
+
+def test_stop_app_cancels_hanging_stop():
+    from webhook import stop_app
+    stopped = []
+
+    class HangingApp:
+        update_processor = None
+
+        async def stop(self):
+            try:
+                await asyncio.sleep(3600)
+            finally:
+                stopped.append(True)
+
+    asyncio.run(stop_app(HangingApp(), drain_timeout=0.01, grace=0.01))
+    assert stopped == [True]
@@ -0,0 +1,157 @@
+# updates.py — update'larni parallel qayta ishlash: bitta foydalanuvchi ketma-ket, global parallellik chegaralangan
+import asyncio, json, logging, queue, threading
+from typing import Any, Awaitable, Dict, Hashable, Optional, Set
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger("taskbot.updates")
+
+
+def update_key(update: object) -> Optional[Hashable]:
+    """Ketma-ketlik kaliti: foydalanuvchi id'si (yo'q bo'lsa — chat). None — tartib shart emas."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user:
+        return update.effective_user.id
+    if update.effective_chat:
+        return ("chat", update.effective_chat.id)
+    return None
+
+
+class _Slot:
+    __slots__ = ("lock", "refs")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.refs = 0
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Application.concurrent_updates() uchun: turli foydalanuvchilarning update'lari parallel,
+    bitta foydalanuvchiniki esa kelgan tartibda birma-bir (holat oqimlari — states.py — buzilmaydi).
+    Ikki bosqichli chegara: PTB'ning semafori (`max_pending`) — qabul qilingan update'lar soni,
+    ichkisi (`max_concurrent_updates`) — bir vaqtda ishlayotgan handlerlar. Ichki slot foydalanuvchi
+    lock'idan KEYIN olinadi: bitta foydalanuvchining uzun navbati boshqalarning slotlarini band qilmaydi.
+    Lock'lar faqat kutayotgan/ishlayotgan update bor paytda dict'da turadi.
+    cancel_running() — drain timeout'dan keyin: kutayotgan va ishlayotgan update task'larini bekor qiladi.
+    """
+    def __init__(self, max_concurrent_updates: int, max_pending: Optional[int] = None):
+        super().__init__(max(max_pending or max_concurrent_updates * 8, max_concurrent_updates))
+        self.limit = max_concurrent_updates
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._slots: Dict[Hashable, _Slot] = {}
+        self.active = 0
+        self.peak = 0
+        self.processed = 0
+        self.serialized = 0   # o'sha foydalanuvchining oldingi update'ini kutganlar
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            await self._process(update, coroutine)
+        except asyncio.CancelledError:
+            if asyncio.iscoroutine(coroutine):
+                coroutine.close()   # navbatda bekor bo'lgan — "never awaited" ogohlantirishisiz
+            raise
+        finally:
+            self._tasks.discard(task)
+
+    def cancel_running(self) -> int:
+        for task in self._tasks:
+            task.cancel()
+        return len(self._tasks)
+
+    async def _process(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = update_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _Slot()
+        slot.refs += 1
+        try:
+            if slot.lock.locked():
+                self.serialized += 1
+            async with slot.lock:
+                await self._run(coroutine)
+        finally:
+            slot.refs -= 1
+            if not slot.refs:
+                del self._slots[key]
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        async with self._running:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                await coroutine
+            finally:
+                self.active -= 1
+                self.processed += 1
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"limit": self.limit, "active": self.active, "peak": self.peak, "processed": self.processed,
+                "serialized": self.serialized, "users_waiting": len(self._slots)}
+
+
+class UpdateRecorder:
+    """
+    RECORD_UPDATES_PATH: update'lar JSONL'ga (loadtest.py --updates) fon thread'ida yoziladi.
+    Handler faqat navbatga qo'yadi — event loop'da fayl I/O va json.dumps yo'q. Thread navbatdagi
+    hamma narsani bitta write bilan yozadi. Navbat to'lsa yozuv tashlanadi (dropped), bot sekinlashmaydi.
+    """
+    def __init__(self, path: str, maxsize: int = 10_000):
+        self.path = path
+        self._q: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0
+
+    async def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="update-recorder", daemon=True)
+            self._thread.start()
+
+    def record(self, data: dict) -> None:
+        try:
+            self._q.put_nowait(data)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            done = False
+            while not done:
+                batch = [self._q.get()]
+                while True:
+                    try:
+                        batch.append(self._q.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in batch:
+                    done, batch = True, batch[:batch.index(None)]
+                if batch:
+                    f.write("".join(json.dumps(x, ensure_ascii=False) + "\n" for x in batch))
+                    f.flush()
+                    self.written += len(batch)
+
+    async def stop(self) -> None:
+        """Navbatdagilar yozib bo'linguncha kutadi."""
+        if self._thread is None:
+            return
+        await asyncio.to_thread(self._q.put, None)
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+        if self.dropped:
+            logger.warning("Update recorder: %d updates dropped (queue full)", self.dropped)
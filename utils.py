@@ -2,21 +2,23 @@
 import re
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 # Asosiy formatlar
 FMT_DB = "%Y-%m-%d %H:%M:%S"      # DB (ISO-ish)
 FMT_HUMAN = "%H:%M %d.%m.%Y"      # UI talabi
 
+TG_MESSAGE_LIMIT = 4096           # Telegram: bitta xabar matni (belgi)
+
 TIME_RE = re.compile(r"\b(\d{1,2}):(\d{2})\b")
 DMY_RE  = re.compile(r"\b(\d{1,2})[./-](\d{1,2})[./-](\d{2,4})\b")
 YMD_RE  = re.compile(r"\b(\d{4})[./-](\d{1,2})[./-](\d{1,2})\b")
 
 SHEVA_OFFSETS = {
-    # sheva & sinonimlar → kun offset
-    "indin": 2, "indinga": 2, "послезавтра": 2,
-    "ertaga": 1, "завтра": 1,
-    "bugun": 0, "сегодня": 0, "today": 0,
+    # sheva & sinonimlar → kun offset (uz lotin/kirill, ru, kk)
+    "indin": 2, "indinga": 2, "индин": 2, "индинга": 2, "послезавтра": 2, "бүрсігүні": 2,
+    "ertaga": 1, "эртага": 1, "завтра": 1, "ертең": 1, "tomorrow": 1,
+    "bugun": 0, "бугун": 0, "сегодня": 0, "бүгін": 0, "today": 0,
 }
 
 def to_db_str(dt: datetime) -> str:
@@ -80,3 +82,24 @@ def parse_human_or_natural(text: str, base_dt: datetime, tz: ZoneInfo) -> Option
                 return None
 
     return None
+
+def chunk_lines(lines: Iterable[str], limit: int = TG_MESSAGE_LIMIT) -> Iterator[str]:
+    """Qatorlarni limitdan oshmaydigan xabarlarga yig'ish (generator, qatorlar "\n" bilan).
+    Qator limitdan uzun bo'lsa, o'zi bo'laklarga bo'linadi; bo'sh xabar chiqmaydi."""
+    buf, size = [], -1
+    for line in lines:
+        while len(line) > limit:
+            if buf and "".join(buf).strip():
+                yield "\n".join(buf)
+            buf, size = [], -1
+            if line[:limit].strip():
+                yield line[:limit]
+            line = line[limit:]
+        if size + 1 + len(line) > limit:
+            if "".join(buf).strip():
+                yield "\n".join(buf)
+            buf, size = [], -1
+        size += 1 + len(line)
+        buf.append(line)
+    if "".join(buf).strip():
+        yield "\n".join(buf)
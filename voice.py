@@ -0,0 +1,112 @@
+# voice.py — ovozli xabarlar navbati: bounded queue + N ta async worker
+import asyncio, logging, time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger("taskbot.voice")
+
+
+class VoiceJob:
+    """Bitta ovozli xabar: kim yubordi, qaysi fayl va bosqichlar vaqti (ms)."""
+    __slots__ = ("chat_id", "user_id", "file_id", "lang", "enqueued_at", "timings")
+
+    def __init__(self, chat_id: int, user_id: int, file_id: str, lang: str):
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.file_id = file_id
+        self.lang = lang
+        self.enqueued_at = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+
+
+class VoicePipeline:
+    """
+    submit() navbat to'lsa darhol False qaytaradi (backpressure) — handler foydalanuvchiga
+    "band" javobini beradi. Workerlar process(app, job) ni chaqiradi, event loop bloklanmaydi.
+    `timeout` soniyadan oshgan yoki xato bilan tugagan ish on_error(app, job, exc) ga beriladi
+    (foydalanuvchi "qayta ishlanmoqda" xabaridan keyin javobsiz qolmasin); worker keyingi ishga o'tadi.
+    """
+    def __init__(self, process: Callable[..., Awaitable[None]], workers: int = 2, maxsize: int = 20,
+                 timeout: Optional[float] = None,
+                 on_error: Optional[Callable[[Any, VoiceJob, BaseException], Awaitable[None]]] = None):
+        self.process = process
+        self.workers = max(1, workers)
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.on_error = on_error
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._app = None
+        self.in_flight = 0
+        self.done = 0
+        self.failed = 0
+        self.timed_out = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self, app) -> None:
+        if self._tasks:
+            return
+        self._app = app
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker(i), name=f"voice-{i}") for i in range(self.workers)]
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Voice queue drain timed out (%s pending)", self.pending)
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job: VoiceJob) -> bool:
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _worker(self, idx: int) -> None:
+        while True:
+            job = await self._queue.get()
+            self.in_flight += 1
+            job.timings["queued"] = round((time.perf_counter() - job.enqueued_at) * 1000, 1)
+            try:
+                await asyncio.wait_for(self.process(self._app, job), self.timeout)
+                self.done += 1
+            except asyncio.TimeoutError as e:
+                self.timed_out += 1
+                job.timings["timeout"] = self.timeout
+                logger.warning("Voice job timed out after %ss (chat %s)", self.timeout, job.chat_id)
+                await self._report(job, e)
+            except Exception as e:
+                self.failed += 1
+                logger.exception("Voice job failed (chat %s): %s", job.chat_id, e)
+                await self._report(job, e)
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+                logger.info("Voice job chat=%s timings(ms)=%s", job.chat_id, job.timings)
+
+    async def _report(self, job: VoiceJob, exc: BaseException) -> None:
+        if self.on_error:
+            try:
+                await self.on_error(self._app, job, exc)
+            except Exception as e:
+                logger.warning("Voice on_error failed (chat %s): %s", job.chat_id, e)
@@ -0,0 +1,220 @@
+# webhook.py — stdlib asyncio HTTP server: Telegram webhook + /healthz + /metrics, SIGTERM'da drain
+import asyncio, hmac, json, logging, signal, time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger("taskbot.webhook")
+
+MAX_BODY = 1 << 20          # Telegram update'i bundan ancha kichik
+MAX_HEADER = 16 << 10
+READ_TIMEOUT = 30.0         # bo'sh keep-alive ulanish shuncha kutiladi
+STOP_GRACE = 5.0            # drain timeout'dan keyin: bekor qilingan handlerlar va stop() uchun
+
+Metrics = Callable[[], Awaitable[Dict[str, float]]]
+
+REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+           503: "Service Unavailable"}
+
+
+class WebhookServer:
+    """
+    POST <path> — JSON update Application.update_queue'ga qo'yiladi va darhol 200 (qayta ishlashni
+    Application.start() ishga tushirgan fetcher + updates.py processor bajaradi). X-Telegram-Bot-Api-Secret-Token
+    `secret` bilan solishtiriladi. GET /healthz — 200 "ok" (drain paytida 503, autentifikatsiyasiz),
+    GET /metrics — Prometheus matni: shu secret sarlavhasi yoki `Authorization: Bearer <metrics_token>` bilan,
+    ikkalasi ham sozlanmagan bo'lsa yopiq (403).
+    drain(): yangi ulanishlar to'xtaydi, ochiq ulanishlardagi POST'larga 503 — Telegram ularni keyinroq
+    qayta yuboradi (yangi instance yoki restartdan keyin shu instance), hech narsa tashlab yuborilmaydi.
+    """
+    def __init__(self, app: Application, path: str, secret: str = "", metrics: Optional[Metrics] = None,
+                 metrics_token: str = ""):
+        self.app = app
+        self.path = "/" + path.strip("/")
+        self.secret = secret.encode()
+        self.metrics_token = metrics_token.encode()
+        self.metrics = metrics
+        self.draining = False
+        self.started = time.time()
+        self.received = 0
+        self.rejected = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str, port: int) -> None:
+        self._server = await asyncio.start_server(self._serve, host, port, limit=MAX_HEADER)
+        self.started = time.time()
+        logger.info("Webhook server listening on %s:%d%s", host, port, self.path)
+
+    async def drain(self) -> None:
+        self.draining = True
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    # ---- HTTP/1.1 (keep-alive, Content-Length) ----
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    req = await asyncio.wait_for(self._read_request(reader), READ_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                if req is None:
+                    await self._respond(writer, 400, b"bad request", close=True)
+                    return
+                method, path, headers, body = req
+                status, ctype, payload = await self._dispatch(method, path, headers, body)
+                close = self.draining or headers.get("connection", "").lower() == "close"
+                await self._respond(writer, status, payload, ctype, close)
+                if close:
+                    return
+        except Exception as e:
+            logger.warning("Webhook connection error: %s", e)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        if len(parts) != 3:
+            return None
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            return None
+        if length < 0 or length > MAX_BODY:
+            return None
+        body = await reader.readexactly(length) if length else b""
+        return parts[0].upper(), parts[1].split("?", 1)[0], headers, body
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: bytes,
+                       ctype: str = "text/plain; charset=utf-8", close: bool = False) -> None:
+        writer.write((f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: {ctype}\r\n"
+                      f"Content-Length: {len(payload)}\r\nConnection: {'close' if close else 'keep-alive'}\r\n\r\n"
+                      ).encode() + payload)
+        await writer.drain()
+
+    async def _dispatch(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, str, bytes]:
+        text = "text/plain; charset=utf-8"
+        if path == "/healthz":
+            ok = not self.draining and self.app.running
+            return (200 if ok else 503), text, (b"ok" if ok else b"draining")
+        if path == "/metrics":
+            if not self._metrics_allowed(headers):
+                return 403, text, b"forbidden"
+            return 200, "text/plain; version=0.0.4; charset=utf-8", (await self.render_metrics()).encode()
+        if path != self.path:
+            return 404, text, b"not found"
+        if method != "POST":
+            return 405, text, b"method not allowed"
+        if self.secret and not hmac.compare_digest(
+                headers.get("x-telegram-bot-api-secret-token", "").encode(), self.secret):
+            self.rejected += 1
+            return 403, text, b"forbidden"
+        if self.draining or not self.app.running:
+            return 503, text, b"draining"   # Telegram qayta yuboradi
+        try:
+            update = Update.de_json(json.loads(body), self.app.bot)
+        except Exception as e:
+            self.rejected += 1
+            logger.warning("Bad webhook payload: %s", e)
+            return 400, text, b"bad update"
+        await self.app.update_queue.put(update)
+        self.received += 1
+        return 200, text, b"ok"
+
+    def _metrics_allowed(self, headers: Dict[str, str]) -> bool:
+        if self.secret and hmac.compare_digest(headers.get("x-telegram-bot-api-secret-token", "").encode(),
+                                               self.secret):
+            return True
+        auth = headers.get("authorization", "")
+        return bool(self.metrics_token) and auth[:7].lower() == "bearer " and hmac.compare_digest(
+            auth[7:].strip().encode(), self.metrics_token)
+
+    async def render_metrics(self) -> str:
+        values: Dict[str, float] = {
+            "webhook_updates_received_total": self.received,
+            "webhook_updates_rejected_total": self.rejected,
+            "update_queue_size": self.app.update_queue.qsize(),
+            "draining": int(self.draining),
+            "uptime_seconds": round(time.time() - self.started, 1),
+        }
+        if self.metrics:
+            try:
+                values.update(await self.metrics())
+            except Exception as e:
+                logger.warning("Metrics collection failed: %s", e)
+        return "".join(f"taskbot_{k} {v}\n" for k, v in values.items())
+
+
+async def stop_app(app: Application, drain_timeout: float, grace: float = STOP_GRACE) -> None:
+    """
+    Application.stop() `drain_timeout` gacha kutiladi; ulgurmasa ishlayotgan handlerlar bekor qilinadi
+    (update_processor.cancel_running) va stop() yana `grace` kutiladi, baribir osilsa — o'zi bekor qilinadi.
+    Qaytganda stop task'i albatta tugagan: shutdown() bot/DB'ni handlerlar ostidan yopib qo'ymaydi.
+    """
+    stopping = asyncio.ensure_future(app.stop())
+    try:
+        done, _ = await asyncio.wait({stopping}, timeout=drain_timeout)
+        if not done:
+            cancel = getattr(app.update_processor, "cancel_running", None)
+            logger.warning("Drain timeout (%.0fs): cancelling %d running handlers", drain_timeout,
+                           cancel() if cancel else 0)
+            done, _ = await asyncio.wait({stopping}, timeout=grace)
+        if not done:
+            logger.error("Application.stop() did not finish in %.0fs after cancel, cancelling it", grace)
+    finally:
+        stopping.cancel()
+        await asyncio.gather(stopping, return_exceptions=True)
+
+
+async def serve(app: Application, host: str, port: int, path: str, webhook_url: str = "", secret: str = "",
+                max_connections: int = 40, drain_timeout: float = 25.0, metrics: Optional[Metrics] = None,
+                metrics_token: str = "") -> None:
+    """
+    run_webhook o'rniga: initialize → post_init → start → setWebhook (pending update'lar TASHLANMAYDI) →
+    SIGTERM/SIGINT'gacha xizmat → drain → Application.stop() (navbatdagi va ishlayotgan handlerlar, fon
+    create_task'lar tugaydi, `drain_timeout` gacha, so'ng bekor qilinadi — stop_app) → shutdown → post_shutdown.
+    webhook_url bo'sh — setWebhook chaqirilmaydi (lokal: update JSON'ni curl bilan POST qilish).
+    """
+    server = WebhookServer(app, path, secret, metrics, metrics_token)
+    if not (secret or metrics_token):
+        logger.warning("/metrics is disabled: set WEBHOOK_SECRET or METRICS_TOKEN")
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    try:
+        await app.start()
+        await server.start(host, port)
+        if webhook_url:
+            await app.bot.set_webhook(webhook_url, secret_token=secret or None, max_connections=max_connections,
+                                      allowed_updates=Update.ALL_TYPES, drop_pending_updates=False)
+            logger.info("Webhook set: %s", webhook_url)
+        await stop.wait()
+        logger.info("Shutdown signal: draining (queue=%d)", app.update_queue.qsize())
+        await server.drain()
+        await stop_app(app, drain_timeout)
+    finally:
+        await server.drain()
+        if app.running:
+            await stop_app(app, drain_timeout)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+    logger.info("Webhook server stopped")